@@ -1,38 +1,106 @@
-try:
-    import cv2
-except Exception:
-    cv2 = None
+import time
+_INICIO_IMPORTACAO = time.perf_counter()
 
-try:
-    import mediapipe as mp
-except Exception:
-    mp = None
+import os
+import json
+import math
+import struct
+import uuid
+import datetime
+import importlib.util
+
+CLOUD_MODE = os.getenv("VERCEL") == "1" and bool(os.getenv("VERCEL_URL"))
+
+# Pilha de visão: o MediaPipe (~1 s de import, puxa o matplotlib) só é
+# importado por _carregar_cv() quando o primeiro par de modelos é criado.
+# No deploy cloud o OpenCV também espera o primeiro /inferir, e câmera,
+# microfone e fontes de frames (locais) nunca são importados.
+mp = None
+if CLOUD_MODE:
+    cv2 = sd = fontes_frames = None
+else:
+    try:
+        import cv2
+    except Exception:
+        cv2 = None
+    try:
+        import sounddevice as sd
+    except Exception:
+        sd = None
+    import fontes_frames
 
 try:
     import numpy as np
 except Exception:
     np = None
-import os
-import json
-import datetime
+
 try:
-    import sounddevice as sd
+    import caracteristicas_mao
+    import gravacao_landmarks
 except Exception:
-    sd = None
-import time
+    caracteristicas_mao = None
+    gravacao_landmarks = None
+try:
+    import linha_tempo
+    import predicao_maos
+    import tracos_pintura
+except Exception:
+    linha_tempo = None
+    predicao_maos = None
+    tracos_pintura = None
+import capturas
+import classificadores
+import metricas
+import pool_instancias
+import copy
 import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
 from flask import Flask, render_template, Response, jsonify, request, redirect, url_for
 from werkzeug.utils import secure_filename
 
 app = Flask(__name__)
-CLOUD_MODE = os.getenv("VERCEL") == "1" and bool(os.getenv("VERCEL_URL"))
-CV_AVAILABLE = cv2 is not None and mp is not None and np is not None
+
+def _modulo_instalado(nome):
+    """Verifica se o módulo existe sem importá-lo."""
+    try:
+        return importlib.util.find_spec(nome) is not None
+    except (ImportError, ValueError):
+        return False
+
+CV_AVAILABLE = (np is not None and _modulo_instalado("mediapipe")
+                and (cv2 is not None or (CLOUD_MODE and _modulo_instalado("cv2"))))
 
 # --- Locks para thread safety ---
-camera_lock = threading.Lock()
-estado_lock = threading.Lock()
-pintura_lock = threading.Lock()
-musica_lock = threading.Lock()
+# LockMedido: mesmo comportamento do threading.Lock, com o tempo de espera em /metrics
+camera_lock = metricas.LockMedido("camera_lock")
+estado_lock = metricas.LockMedido("estado_lock")
+pintura_lock = metricas.LockMedido("pintura_lock")
+musica_lock = metricas.LockMedido("musica_lock")
+
+# --- Métricas (/metrics) ---
+# Latência de cada estágio do loop de frames; os streams registram as suas
+# (processar, desenho, imencode) em _registrar_pipeline.
+def _histograma_estagio(estagio):
+    return metricas.histograma("vision_estagio_segundos", "Latência de cada estágio do loop de frames", estagio=estagio)
+
+_m_cap_read = _histograma_estagio("cap_read")
+_m_flip = _histograma_estagio("flip")
+_m_preprocessamento = _histograma_estagio("resize_cvtcolor")
+_m_maos = _histograma_estagio("maos_process")
+_m_rosto = _histograma_estagio("rosto_process")
+_m_caracteristicas = _histograma_estagio("caracteristicas")
+_m_inferencia = _histograma_estagio("inferencia_total")
+_m_frames_capturados = metricas.contador("vision_frames_capturados_total", "Frames lidos da câmera")
+_m_falhas_leitura = metricas.contador("vision_camera_falhas_leitura_total", "Leituras da câmera que falharam")
+_m_aberturas = {
+    resultado: metricas.contador("vision_camera_aberturas_total", "Tentativas de (re)abrir a câmera", resultado=resultado)
+    for resultado in ("ok", "falha")
+}
+_m_frames_inferidos = metricas.contador("vision_frames_inferidos_total", "Frames processados pelo estágio de inferência")
+_m_rosto_mantido = metricas.contador("vision_rosto_mantido_total", "Frames em que o FaceMesh foi pulado e o último rosto mantido")
 
 # --- Cache de listagem de câmeras ---
 _cameras_cache = []
@@ -40,19 +108,39 @@ _cameras_cache_ts = 0
 _CAMERAS_CACHE_TTL = 10  # segundos
 
 # --- Configurações MediaPipe ---
-try:
-    mp_maos = mp.solutions.hands if mp is not None else None
-    mp_rosto = mp.solutions.face_mesh if mp is not None else None
-    mp_desenho = mp.solutions.drawing_utils if mp is not None else None
-    mp_drawing_styles = mp.solutions.drawing_styles if mp is not None else None
-except AttributeError:
-    mp_maos = mp_rosto = mp_desenho = mp_drawing_styles = None
-    CV_AVAILABLE = False
-
-def inicializar_mediapipe():
-    if not CV_AVAILABLE or CLOUD_MODE:
-        return None, None
-
+mp_maos = mp_rosto = mp_desenho = mp_drawing_styles = None
+_cv_lock = threading.Lock()
+_m_importacao_cv = metricas.medidor("vision_importacao_segundos", "Tempo de importação na partida",
+                                    modulo="opencv_mediapipe")
+
+def _carregar_cv():
+    """Importa o que falta da pilha de visão (OpenCV, MediaPipe). Retorna CV_AVAILABLE."""
+    global cv2, mp, mp_maos, mp_rosto, mp_desenho, mp_drawing_styles, CV_AVAILABLE
+    if mp is not None or not CV_AVAILABLE:
+        return CV_AVAILABLE
+    with _cv_lock:
+        if mp is None and CV_AVAILABLE:
+            inicio = time.perf_counter()
+            try:
+                import cv2 as modulo_cv2
+                import mediapipe as modulo_mp
+                solucoes = modulo_mp.solutions
+                mp_maos, mp_rosto = solucoes.hands, solucoes.face_mesh
+                mp_desenho, mp_drawing_styles = solucoes.drawing_utils, solucoes.drawing_styles
+            except Exception as erro:
+                print(f"[ERRO] OpenCV/MediaPipe indisponível: {erro}")
+                CV_AVAILABLE = False
+                return False
+            cv2, mp = modulo_cv2, modulo_mp
+            duracao = time.perf_counter() - inicio
+            _m_importacao_cv.definir(duracao)
+            print(f"\U0001f4e6 OpenCV/MediaPipe importados em {duracao * 1000:.0f} ms")
+    return CV_AVAILABLE
+
+def criar_mediapipe():
+    """Cria um par (Hands, FaceMesh) para o fluxo de vídeo de uma fonte."""
+    if not _carregar_cv():
+        raise RuntimeError("OpenCV/MediaPipe indisponível.")
     try:
         maos_local = mp_maos.Hands(
             static_image_mode=False,
@@ -82,51 +170,8 @@ def inicializar_mediapipe():
         raise RuntimeError(mensagem) from erro
 
 
-maos, rosto = inicializar_mediapipe()
-
-# Instância separada do MediaPipe para Pintura Virtual (thread safety)
-def _inicializar_maos_pintura():
-    if not CV_AVAILABLE or CLOUD_MODE or mp_maos is None:
-        return None
-    try:
-        return mp_maos.Hands(
-            static_image_mode=False,
-            max_num_hands=1,
-            model_complexity=0,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
-    except Exception:
-        return None
-
-maos_pintura = _inicializar_maos_pintura()
-
-# Instância separada do MediaPipe para Música Virtual (thread safety)
-def _inicializar_maos_musica():
-    if not CV_AVAILABLE or CLOUD_MODE or mp_maos is None:
-        return None, None
-    try:
-        m = mp_maos.Hands(
-            static_image_mode=False,
-            max_num_hands=2,
-            model_complexity=0,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
-        r = mp_rosto.FaceMesh(
-            max_num_faces=1,
-            refine_landmarks=True,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        ) if mp_rosto is not None else None
-        return m, r
-    except Exception:
-        return None, None
-
-maos_musica, rosto_musica = _inicializar_maos_musica()
-
-# Estado Global
-estado_atual = {
+# Estado inicial de cada sessão (ver SessaoVisao)
+_ESTADO_PRINCIPAL_INICIAL = {
     "gesto": "Nenhum",
     "gesto_principal": "Nenhuma mao",
     "expressao": "Neutro",
@@ -135,10 +180,20 @@ estado_atual = {
 
 config_dispositivos = {
     "camera_index": 0,
-    "microfone_index": None
+    "microfone_index": None,
+    # Fonte de frames no lugar da câmera (ver fontes_frames.py), ex.:
+    # "video:/caminho/clip.mp4", "imagens:/caminho/pasta", "sintetica"
+    "fonte": os.getenv("VISION_FONTE") or None,
+    "ritmo": os.getenv("VISION_FONTE_RITMO", "tempo_real")  # ou "maximo"
 }
-
-estado_musica = {
+# FPS das fontes de imagens/sintética (vídeos usam o próprio FPS); 0 = padrão
+_FPS_FONTE = float(os.getenv("VISION_FONTE_FPS", "0")) or None
+# Vídeos e pastas de imagens escolhidos por /set_devices ficam restritos a esta
+# pasta (caminhos relativos partem dela); VISION_FONTE não tem restrição
+PASTA_FONTES = os.path.abspath(os.getenv(
+    "VISION_PASTA_FONTES", os.path.join(os.path.dirname(os.path.abspath(__file__)), "midia")))
+
+_ESTADO_MUSICA_INICIAL = {
     "gesto_direita": "Nenhum",
     "gesto_esquerda": "Nenhum",
     "pos_direita": {"x": 0.5, "y": 0.5},
@@ -153,12 +208,153 @@ estado_musica = {
     "velocidade_esquerda": 0.0
 }
 
-# Histórico de posições para detecção de movimento (últimas N posições do pulso)
-_HIST_MAX = 8
-_historico_pos = {
-    "Right": [],   # lista de (x, y, timestamp)
-    "Left": []
-}
+# --- Canal de estado (push) ---
+# Os pipelines publicam o estado assim que o atualizam; /status_stream
+# empurra só as chaves que mudaram (deltas numerados), e o cliente retoma
+# do último id recebido ao reconectar.
+_CANAL_HISTORICO = 256  # deltas guardados para retomada
+_CANAL_KEEPALIVE = 15.0  # segundos entre comentários de keep-alive
+
+class CanalEstado:
+    """Estado versionado com histórico curto de deltas.
+
+    A cada mudança o estado completo é serializado uma vez num instantâneo
+    imutável (versão, JSON em bytes) trocado de uma vez só; quem lê
+    (/current_status, /musica_status) não pega o lock.
+    """
+
+    def __init__(self, estado_inicial, historico=_CANAL_HISTORICO):
+        self._estado = dict(estado_inicial)
+        self._seq = 0
+        self._deltas = deque(maxlen=historico)  # (seq, delta)
+        self._cond = threading.Condition()
+        self._instantaneo = (0, self._serializar())
+
+    def _serializar(self):
+        # Mesmo formato do jsonify (chaves ordenadas, ASCII)
+        return json.dumps(self._estado, sort_keys=True, separators=(",", ":")).encode()
+
+    def publicar(self, novo_estado):
+        """Registra as chaves que mudaram. Retorna a sequência atual."""
+        with self._cond:
+            delta = {k: v for k, v in novo_estado.items() if self._estado.get(k) != v}
+            if not delta:
+                return self._seq
+            self._estado.update(delta)
+            self._seq += 1
+            self._deltas.append((self._seq, delta))
+            self._instantaneo = (self._seq, self._serializar())
+            self._cond.notify_all()
+            return self._seq
+
+    def snapshot(self):
+        with self._cond:
+            return self._seq, dict(self._estado)
+
+    def instantaneo(self):
+        """(versão, JSON em bytes) do estado atual, sem lock."""
+        return self._instantaneo
+
+    def aguardar(self, versao, timeout):
+        """Espera uma versão posterior a `versao` (até timeout). Retorna o instantâneo atual.
+
+        Uma versão maior que a atual (o app reiniciou) volta na hora.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq != versao, timeout)
+            return self._instantaneo
+
+    def deltas_desde(self, seq, timeout=None):
+        """Deltas posteriores a seq (espera até timeout se não houver).
+
+        Retorna None se seq é antigo demais para o histórico (o cliente
+        precisa de um snapshot completo) ou uma lista, vazia no timeout.
+        """
+        with self._cond:
+            if timeout is not None:
+                self._cond.wait_for(lambda: self._seq > seq, timeout)
+            if seq > self._seq:
+                return None
+            if seq == self._seq:
+                return []
+            if not self._deltas or self._deltas[0][0] > seq + 1:
+                return None
+            return [item for item in self._deltas if item[0] > seq]
+
+# --- Sessões ---
+# Cada sessão tem o próprio estado de pipelines: a câmera local é a sessão
+# padrão (rotas sem ?sessao=) e cada aba que captura no navegador
+# (/inferir?sessao=<id>) tem a sua, com histórico de movimento, canvas de
+# pintura e canais de estado separados. As instâncias do MediaPipe vêm de
+# um pool com teto (_pool_mediapipe); sessões e instâncias paradas são
+# descartadas pela faxina.
+COR_PINCEL_INICIAL = (255, 0, 0)  # Azul BGR (OpenCV usa BGR)
+MAX_SESSOES = int(os.getenv("VISION_MAX_SESSOES", "32"))
+SESSAO_OCIOSA_MAX = float(os.getenv("VISION_SESSAO_OCIOSA", "600"))  # segundos
+JANELA_MOVIMENTO = int(os.getenv("VISION_JANELA_MOVIMENTO", str(classificadores.HIST_MAX)))  # amostras
+
+class SessaoVisao:
+    """Estado dos pipelines principal, música e pintura de uma sessão."""
+
+    def __init__(self, id_sessao):
+        self.id = id_sessao
+        self.estado_atual = copy.deepcopy(_ESTADO_PRINCIPAL_INICIAL)
+        self.estado_musica = copy.deepcopy(_ESTADO_MUSICA_INICIAL)
+        # Rastreador de movimento por mão (últimas JANELA_MOVIMENTO posições filtradas do pulso)
+        self.historico_pos = classificadores.novo_historico_movimento(JANELA_MOVIMENTO)
+        self.estado_pintura = {"cor": "Azul", "tracos": 0, "pode_desfazer": False, "pode_refazer": False}
+        self.cor_pincel = COR_PINCEL_INICIAL
+        # Traços vetoriais + canvas BGRA 640x480 (alfa 255 onde há tinta) rasterizado a partir deles
+        self.desenho = tracos_pintura.DesenhoVetorial(640, 480) if tracos_pintura is not None else None
+        self.ultimo_print = 0
+        self.ultimo_seq = -1  # último frame do navegador inferido (/inferir)
+        self.ultimo_uso = time.monotonic()
+        self.trilhas_abertas = {}  # (categoria, lado) -> (valor, início) na linha do tempo
+        self.canais = {
+            "principal": CanalEstado(self.estado_atual),
+            "musica": CanalEstado(self.estado_musica),
+            "pintura": CanalEstado(self.estado_pintura),
+        }
+
+_sessao_local = SessaoVisao(None)
+# Estado da câmera local (nomes mantidos para scripts que leem o app)
+estado_atual = _sessao_local.estado_atual
+estado_musica = _sessao_local.estado_musica
+
+_sessoes = OrderedDict()  # id -> SessaoVisao, da menos para a mais recente
+_sessoes_lock = threading.Lock()
+
+# Estado inicial servido a uma sessão que ainda não enviou frames (a página
+# abre o status antes do primeiro /inferir); nunca é publicado
+_sessao_sem_frames = SessaoVisao("")
+
+def _obter_sessao(id_sessao, criar=False):
+    """Sessão pelo id; sem id, a câmera local.
+
+    Só /inferir cria sessões (criar=True); nas outras rotas um id ainda
+    desconhecido dá None, então um GET qualquer não ocupa nem despeja vagas.
+    """
+    if not id_sessao:
+        return _sessao_local
+    descartada = None
+    with _sessoes_lock:
+        sessao = _sessoes.pop(id_sessao, None)
+        if sessao is None:
+            if not criar:
+                return None
+            if len(_sessoes) >= MAX_SESSOES:
+                _, descartada = _sessoes.popitem(last=False)
+            sessao = SessaoVisao(id_sessao)
+        _sessoes[id_sessao] = sessao
+        sessao.ultimo_uso = time.monotonic()
+    if descartada is not None:
+        _pool_mediapipe.liberar(descartada)
+        _fechar_trilhas(descartada)
+    _garantir_faxina()
+    return sessao
+
+def _sessao_da_requisicao(criar=False):
+    return _obter_sessao(request.args.get("sessao"), criar)
 
 # --- Mapeamento Gesto → Imagem (configurável) ---
 GESTURE_CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gesture_config.json")
@@ -282,11 +478,7 @@ def _tentar_abrir_camera_por_indice(index):
     if index is None:
         return None
 
-    tentativa = cv2.VideoCapture(index, cv2.CAP_DSHOW)
-    if not tentativa.isOpened():
-        tentativa.release()
-        tentativa = cv2.VideoCapture(index)
-
+    tentativa = fontes_frames.FonteCamera(index)
     if not tentativa.isOpened():
         tentativa.release()
         return None
@@ -309,18 +501,22 @@ def listar_microfones():
     return microfones
 
 def abrir_camera(index, fallback=True):
-    global cap
+    """Abre a câmera e a entrega para a thread de captura.
 
+    A abertura (lenta) acontece fora do camera_lock; o lock só protege a troca
+    da referência global, então leitores e a thread de captura não travam.
+    """
     if cv2 is None or CLOUD_MODE:
         return False
 
-    with camera_lock:
-        # Se a mesma câmera já está aberta e funcionando, não re-abrir
-        if (index == config_dispositivos["camera_index"]
-                and cap is not None and cap.isOpened()):
-            return True
+    with _abertura_lock:
+        with camera_lock:
+            # Se a mesma câmera já está aberta e funcionando, não re-abrir
+            if (index == config_dispositivos["camera_index"]
+                    and config_dispositivos["fonte"] is None
+                    and cap is not None and cap.isOpened()):
+                return True
 
-        camera_anterior = cap
         nova_cap = _tentar_abrir_camera_por_indice(index)
         indice_em_uso = index
 
@@ -335,13 +531,78 @@ def abrir_camera(index, fallback=True):
         if nova_cap is None:
             return False
 
-        cap = nova_cap
-        config_dispositivos["camera_index"] = indice_em_uso
+        _trocar_captura(nova_cap, camera_index=indice_em_uso, fonte=None)
+        return True
+
+def abrir_fonte(especificacao, ritmo=None):
+    """Abre uma fonte de frames (vídeo, imagens, sintética ou câmera) no lugar da atual.
+
+    Levanta ValueError se a especificação ou o ritmo forem inválidos.
+    """
+    if cv2 is None or CLOUD_MODE:
+        return False
+
+    tipo, argumento = fontes_frames.interpretar(especificacao)
+    if tipo == "camera":
+        return abrir_camera(argumento, fallback=False)
+
+    ritmo = ritmo or config_dispositivos["ritmo"]
+    with _abertura_lock:
+        nova_fonte = fontes_frames.criar_fonte(especificacao, ritmo=ritmo, fps=_FPS_FONTE)
+        if not nova_fonte.isOpened():
+            nova_fonte.release()
+            return False
+        _trocar_captura(nova_fonte, fonte=especificacao, ritmo=ritmo)
+    return True
+
+def _fonte_permitida(especificacao):
+    """Fonte pedida pela rede → especificação com caminho absoluto dentro de PASTA_FONTES.
 
-        if camera_anterior is not None and camera_anterior is not cap:
+    A fonte de VISION_FONTE é aceita como está. Levanta ValueError.
+    """
+    tipo, argumento = fontes_frames.interpretar(especificacao)
+    if tipo not in ("video", "imagens") or especificacao == os.getenv("VISION_FONTE"):
+        return especificacao
+    raiz = os.path.realpath(PASTA_FONTES)
+    caminho = os.path.realpath(os.path.join(raiz, argumento))
+    if os.path.commonpath([raiz, caminho]) != raiz:
+        raise ValueError(f"Fontes de vídeo e imagens devem ficar em {PASTA_FONTES} (VISION_PASTA_FONTES).")
+    return f"{tipo}:{caminho}"
+
+def _trocar_captura(nova_cap, **config):
+    """Entrega nova_cap à thread de captura (chamar com _abertura_lock)."""
+    global cap
+
+    with camera_lock:
+        camera_anterior = cap
+        cap = nova_cap
+        config_dispositivos.update(config)
+
+    captura_ativa = _captura_thread is not None and _captura_thread.is_alive()
+    if camera_anterior is not None and camera_anterior is not nova_cap:
+        # A thread de captura pode estar no meio de um read() da câmera
+        # antiga: ela mesma libera no início da próxima iteração.
+        if captura_ativa:
+            _caps_pendentes.append(camera_anterior)
+        else:
             camera_anterior.release()
+    if not captura_ativa:
+        # Sem streams a abertura só validou a fonte: a thread de captura a
+        # reabre pela configuração quando alguém pedir frames
+        with camera_lock:
+            if cap is nova_cap:
+                cap = None
+        nova_cap.release()
 
-        return True
+def _abrir_fonte_configurada():
+    """(Re)abre a fonte escolhida: a fonte configurada ou, sem ela, a câmera."""
+    if config_dispositivos["fonte"]:
+        try:
+            return abrir_fonte(config_dispositivos["fonte"])
+        except ValueError as erro:
+            print(f"[ERRO] Fonte de frames inválida: {erro}")
+            return False
+    return abrir_camera(config_dispositivos["camera_index"], fallback=True)
 
 def aplicar_microfone(index):
     microfones = listar_microfones()
@@ -357,865 +618,1889 @@ def aplicar_microfone(index):
 
     return False
 
-def contar_dedos(landmarks, lateralidade="Right", orientacao="Palma"):
-    pontas_dedos = [8, 12, 16, 20]
-    dedos_levantados = []
-
-    # Polegar
-    # A lógica do polegar inverte dependendo se é Palma ou Costas
-    if lateralidade == "Right":
-        if orientacao == "Palma":
-            # Palma: Polegar à esquerda (x menor)
-            if landmarks[4].x < landmarks[3].x: 
-                dedos_levantados.append(1)
-            else:
-                dedos_levantados.append(0)
-        else: # Costas
-            # Costas: Polegar à direita (x maior)
-            if landmarks[4].x > landmarks[3].x: 
-                dedos_levantados.append(1)
-            else:
-                dedos_levantados.append(0)
-    else: # Left
-        if orientacao == "Palma":
-            # Palma: Polegar à direita (x maior)
-            if landmarks[4].x > landmarks[3].x:
-                dedos_levantados.append(1)
-            else:
-                dedos_levantados.append(0)
-        else: # Costas
-            # Costas: Polegar à esquerda (x menor)
-            if landmarks[4].x < landmarks[3].x:
-                dedos_levantados.append(1)
-            else:
-                dedos_levantados.append(0)
+# --- Captura compartilhada ---
+# Uma única thread é dona da câmera: lê os frames, reconecta com backoff e
+# publica cada frame (já espelhado) num ring buffer numerado. Os geradores
+# MJPEG só consomem o frame mais recente, sem disputar cap.read().
+_BUFFER_FRAMES_TAMANHO = 4
+_CAPTURA_BACKOFF_INICIAL = 0.5  # segundos
+_CAPTURA_BACKOFF_MAX = 8.0
+_CAPTURA_TIMEOUT_FRAME = 1.0  # sem frame novo nesse tempo = câmera indisponível
+# Sem ninguém pedindo frames por esse tempo, a thread libera a câmera e
+# termina; o próximo stream a reabre
+CAPTURA_OCIOSA_MAX = float(os.getenv("VISION_CAPTURA_OCIOSA", "5"))  # segundos
+
+class BufferFrames:
+    """Ring buffer de frames com número de sequência.
+
+    Um único produtor publica; leitores pegam o item mais recente sem lock
+    (trocar a referência de um slot é atômico no CPython). A Condition serve
+    apenas para acordar quem está esperando um frame novo.
+    """
 
-    # Outros dedos
-    for ponta in pontas_dedos:
-        if landmarks[ponta].y < landmarks[ponta - 2].y:
-            dedos_levantados.append(1)
-        else:
-            dedos_levantados.append(0)
+    def __init__(self, tamanho=_BUFFER_FRAMES_TAMANHO):
+        self._slots = [None] * tamanho
+        self._seq = 0
+        self._cond = threading.Condition()
+
+    @property
+    def seq(self):
+        return self._seq
+
+    def publicar(self, frame, timestamp=None):
+        seq = self._seq + 1
+        self._slots[seq % len(self._slots)] = (seq, timestamp if timestamp is not None else time.time(), frame)
+        self._seq = seq
+        with self._cond:
+            self._cond.notify_all()
+        return seq
+
+    def ultimo(self):
+        """Retorna (seq, timestamp, frame) mais recente ou None."""
+        seq = self._seq
+        if seq == 0:
+            return None
+        return self._slots[seq % len(self._slots)]
+
+    def aguardar(self, seq_anterior, timeout=_CAPTURA_TIMEOUT_FRAME):
+        """Espera um item com seq maior que seq_anterior. Retorna None no timeout."""
+        item = self.ultimo()
+        if item is not None and item[0] > seq_anterior:
+            return item
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > seq_anterior, timeout)
+        item = self.ultimo()
+        if item is None or item[0] <= seq_anterior:
+            return None
+        return item
+
+_buffer_camera = BufferFrames()
+_abertura_lock = threading.Lock()
+_caps_pendentes = []  # câmeras substituídas, liberadas pela thread de captura
+_captura_thread = None
+_captura_thread_lock = threading.Lock()
+_ultima_demanda_captura = 0.0  # monotonic do último pedido de frame
+
+def _liberar_caps_pendentes():
+    while _caps_pendentes:
+        try:
+            _caps_pendentes.pop().release()
+        except Exception:
+            pass
 
-    return sum(dedos_levantados), dedos_levantados
+def _captura_ociosa():
+    """Nenhum pedido de frame recente nem cliente inscrito (a inferência pode demorar entre pedidos)."""
+    return time.monotonic() - _ultima_demanda_captura > CAPTURA_OCIOSA_MAX and not _pipelines_ativos()
 
-def _calcular_ear(p, pontos_olho):
-    """Calcula Eye Aspect Ratio (EAR) para detectar olhos fechados.
-    pontos_olho: lista de 6 índices [p1, p2, p3, p4, p5, p6]
-    p1-p4 = cantos horizontais, p2-p6 e p3-p5 = pares verticais
-    """
-    # Distâncias verticais
-    v1 = ((p[pontos_olho[1]].x - p[pontos_olho[5]].x)**2 +
-          (p[pontos_olho[1]].y - p[pontos_olho[5]].y)**2)**0.5
-    v2 = ((p[pontos_olho[2]].x - p[pontos_olho[4]].x)**2 +
-          (p[pontos_olho[2]].y - p[pontos_olho[4]].y)**2)**0.5
-    # Distância horizontal
-    h = ((p[pontos_olho[0]].x - p[pontos_olho[3]].x)**2 +
-         (p[pontos_olho[0]].y - p[pontos_olho[3]].y)**2)**0.5
-    if h == 0:
-        return 0.3  # valor neutro para evitar divisão por zero
-    return (v1 + v2) / (2.0 * h)
-
-# Landmarks do Face Mesh para os olhos (índices MediaPipe 468+)
-# Olho direito: [33, 160, 158, 133, 153, 144]
-# Olho esquerdo: [362, 385, 387, 263, 373, 380]
-_OLHO_DIREITO = [33, 160, 158, 133, 153, 144]
-_OLHO_ESQUERDO = [362, 385, 387, 263, 373, 380]
-_EAR_LIMIAR = 0.18  # abaixo deste valor, olhos estão fechados
+def _encerrar_captura_ociosa():
+    """Libera a câmera e encerra a thread se ninguém pediu frames. Retorna True se encerrou."""
+    global cap, _captura_thread
 
-def detectar_expressao(face_landmarks):
-    # Pontos chave do rosto (MediaPipe Face Mesh)
-    # Lábio superior: 13, Lábio inferior: 14
-    # Canto esquerdo boca: 61, Canto direito boca: 291
-    # Topo rosto: 10, Queixo: 152 (para normalização vertical)
-    # Maçã do rosto esq: 234, Maçã do rosto dir: 454 (para normalização horizontal)
-    
-    p = face_landmarks.landmark
-    
-    # Altura do rosto (Vertical)
-    altura_rosto = p[152].y - p[10].y
-    
-    # Largura do rosto (Horizontal)
-    largura_rosto = p[454].x - p[234].x
-    
-    # 1. Abertura da boca (Surpresa) - Normalizado pela altura
-    abertura_boca = (p[14].y - p[13].y) / altura_rosto
-    
-    # 2. Largura da boca (Sorriso) - Normalizado pela largura do rosto
-    largura_boca = (p[291].x - p[61].x) / largura_rosto
-    
-    # 3. Detecção de olhos fechados via EAR (Eye Aspect Ratio)
-    ear_direito = _calcular_ear(p, _OLHO_DIREITO)
-    ear_esquerdo = _calcular_ear(p, _OLHO_ESQUERDO)
-    ear_medio = (ear_direito + ear_esquerdo) / 2.0
-    
-    if abertura_boca > 0.15: 
-        return "Surpresa", mapeamento_gestos.get("Surpresa", "surpresa.jpg")
-    elif ear_medio < _EAR_LIMIAR:
-        return "Olhos Fechados", mapeamento_gestos.get("Olhos Fechados", "olhos_fechados.jpg")
-    elif largura_boca > 0.40: # Ajustado: > 40% da largura do rosto
-        return "Sorriso", mapeamento_gestos.get("Sorriso", "sorriso.jpg")
-    
-    return "Neutro", None
-
-def gerar_frames():
-    global cap, estado_atual
-    
-    ultimo_print = 0
-    COOLDOWN_PRINT = 3.0 # 3 segundos de intervalo entre prints
+    with _captura_thread_lock:
+        if not _captura_ociosa():
+            return False
+        # Sob o lock: um stream que chegar agora só cria a thread nova com a câmera já solta
+        with _abertura_lock:
+            with camera_lock:
+                camera, cap = cap, None
+            if camera is not None:
+                camera.release()
+            _liberar_caps_pendentes()
+        _captura_thread = None
+    print("\U0001f4f7 Câmera liberada: nenhum stream ativo")
+    return True
+
+def _loop_captura():
+    """Thread dona da câmera: lê, espelha e publica frames no buffer."""
+    global cap
 
+    backoff = _CAPTURA_BACKOFF_INICIAL
+    seq_inferencia = None
     while True:
-        # Verificar câmera sob lock
+        if _captura_ociosa() and _encerrar_captura_ociosa():
+            return
+        _liberar_caps_pendentes()
+
         with camera_lock:
-            cam_ok = cap is not None and cap.isOpened()
+            camera = cap
 
-        if not cam_ok:
+        if camera is None or not camera.isOpened():
             print("Tentando abrir a camera...")
-            if not abrir_camera(config_dispositivos["camera_index"], fallback=True):
-                frame = np.zeros((480, 640, 3), dtype=np.uint8)
-                cv2.putText(frame, "CAMERA NAO ENCONTRADA", (50, 240), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-                with estado_lock:
-                    estado_atual["gesto"] = "Erro na Camera"
-                    estado_atual["imagem"] = "neutro.jpg"
-
-                ret, buffer = cv2.imencode('.jpg', frame)
-                frame_bytes = buffer.tobytes()
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-
-                time.sleep(1)
-                continue
-
-            time.sleep(0.5) # Esperar câmera inicializar
+            aberta = _abrir_fonte_configurada()
+            _m_aberturas["ok" if aberta else "falha"].inc()
+            if not aberta:
+                time.sleep(backoff)
+                backoff = min(backoff * 2, _CAPTURA_BACKOFF_MAX)
             continue
 
-        # Ler frame sob lock
-        with camera_lock:
-            if cap is not None:
-                sucesso, frame = cap.read()
-            else:
-                sucesso, frame = False, None
+        with _m_cap_read.medir():
+            sucesso, frame = camera.read()
 
         if not sucesso:
-            # Se falhar, envia um frame preto com aviso
-            frame = np.zeros((480, 640, 3), dtype=np.uint8)
-            cv2.putText(frame, "CAMERA NAO ENCONTRADA", (50, 240), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-            cv2.putText(frame, "Verifique se outra app esta usando a camera", (35, 280), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
-            
-            with estado_lock:
-                estado_atual["gesto"] = "Erro na Camera"
-                estado_atual["imagem"] = "neutro.jpg"
-
+            _m_falhas_leitura.inc()
             with camera_lock:
-                if cap is not None:
-                    cap.release()
+                if cap is camera:
                     cap = None
-            
-            ret, buffer = cv2.imencode('.jpg', frame)
-            frame_bytes = buffer.tobytes()
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-            time.sleep(1)
+            camera.release()
+            time.sleep(backoff)
+            backoff = min(backoff * 2, _CAPTURA_BACKOFF_MAX)
             continue
 
-        # Espelhar frame
-        frame = cv2.flip(frame, 1)
-        
-        # Reduzir para processamento
-        frame_small = cv2.resize(frame, (320, 240))
-        frame_rgb = cv2.cvtColor(frame_small, cv2.COLOR_BGR2RGB)
-        
-        # Processar mãos e rosto
-        resultados_maos = maos.process(frame_rgb)
-        resultados_rosto = rosto.process(frame_rgb)
-        
-        gesto_detectado = "Nenhuma mao"
-        expressao_detectada = "Neutro"
-        imagem_nome = "neutro.jpg"
-        
-        gestos_lista = []
-        maior_prioridade = -1
-        gesto_principal = "Nenhuma mao"
-
-        # --- Lógica de Mãos ---
-        if resultados_maos.multi_hand_landmarks:
-            for idx, hand_landmarks in enumerate(resultados_maos.multi_hand_landmarks):
-                mp_desenho.draw_landmarks(frame, hand_landmarks, mp_maos.HAND_CONNECTIONS)
-                
-                # Obter lateralidade (Right/Left)
-                lateralidade = "Right"
-                if resultados_maos.multi_handedness:
-                    # Proteção contra índice fora do alcance (embora raro)
-                    if idx < len(resultados_maos.multi_handedness):
-                        lateralidade = resultados_maos.multi_handedness[idx].classification[0].label
-
-                # --- Detecção de Orientação (Palma vs Costas) ---
-                # P0: Pulso, P5: Base Indicador, P17: Base Mindinho
-                p0 = hand_landmarks.landmark[0]
-                p5 = hand_landmarks.landmark[5]
-                p17 = hand_landmarks.landmark[17]
-                
-                # Produto vetorial (Cross Product) 2D para determinar a direção
-                # V1 = P5 - P0, V2 = P17 - P0
-                val_cross = (p5.x - p0.x) * (p17.y - p0.y) - (p5.y - p0.y) * (p17.x - p0.x)
-                
-                orientacao = ""
-                if lateralidade == "Right":
-                    orientacao = "Palma" if val_cross > 0 else "Costas"
-                else: # Left
-                    orientacao = "Palma" if val_cross < 0 else "Costas"
-
-                total_dedos, lista_dedos = contar_dedos(hand_landmarks.landmark, lateralidade, orientacao)
-
-                # Distância OK (Normalizada pelo tamanho da mão aprox)
-                escala_mao = ((hand_landmarks.landmark[0].y - hand_landmarks.landmark[9].y)**2 + (hand_landmarks.landmark[0].x - hand_landmarks.landmark[9].x)**2)**0.5
-                
-                x4, y4 = hand_landmarks.landmark[4].x, hand_landmarks.landmark[4].y
-                x8, y8 = hand_landmarks.landmark[8].x, hand_landmarks.landmark[8].y
-                distancia_ok = ((x4 - x8)**2 + (y4 - y8)**2)**0.5
-                
-                # Lógica Like melhorada
-                # Polegar para cima: ponta (4) SIGNIFICATIVAMENTE acima da base (2)
-                # Usar margem para evitar falsos positivos
-                margem_polegar = 0.04  # margem vertical normalizada
-                polegar_pra_cima = (hand_landmarks.landmark[4].y < hand_landmarks.landmark[3].y - margem_polegar
-                                     and hand_landmarks.landmark[4].y < hand_landmarks.landmark[2].y - margem_polegar)
-                
-                indicador_fechado = hand_landmarks.landmark[8].y > hand_landmarks.landmark[6].y
-                medio_fechado = hand_landmarks.landmark[12].y > hand_landmarks.landmark[10].y
-                anelar_fechado = hand_landmarks.landmark[16].y > hand_landmarks.landmark[14].y
-                minimo_fechado = hand_landmarks.landmark[20].y > hand_landmarks.landmark[18].y
-                
-                outros_dedos_fechados = indicador_fechado and medio_fechado and anelar_fechado and minimo_fechado
-                
-                # Detectar indicador levantado sozinho (Apontar)
-                indicador_levantado = lista_dedos[1] == 1
-                medio_levantado = lista_dedos[2] == 1
-                anelar_levantado = lista_dedos[3] == 1 if len(lista_dedos) > 3 else False
-                minimo_levantado = lista_dedos[4] == 1 if len(lista_dedos) > 4 else False
-
-                gesto_temp = f"Dedos: {total_dedos}"
-                img_temp = "neutro.jpg"
-                prioridade = 0
-
-                # --- Detecção de gestos (ordem de prioridade) ---
-
-                if distancia_ok < (0.18 * escala_mao) and (lista_dedos[2] == 1 or lista_dedos[3] == 1):
-                    # OK: polegar e indicador formam círculo
-                    gesto_temp = "OK"
-                    img_temp = mapeamento_gestos.get("OK", "ok.jpg")
-                    prioridade = 6
-
-                    # Funcionalidade: Print ao fazer OK com as Costas da Mão Direita
-                    if lateralidade == "Right" and orientacao == "Costas":
-                        agora = time.time()
-                        if agora - ultimo_print > COOLDOWN_PRINT:
-                            if not os.path.exists("screenshots"):
-                                os.makedirs("screenshots")
-                            
-                            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-                            filename = f"screenshots/print_{timestamp}.jpg"
-                            cv2.imwrite(filename, frame)
-                            print(f"\U0001f4f8 Screenshot salvo: {filename}")
-                            ultimo_print = agora
-
-                elif polegar_pra_cima and outros_dedos_fechados:
-                    # LIKE: polegar para cima, outros fechados
-                    gesto_temp = "LIKE"
-                    img_temp = mapeamento_gestos.get("LIKE", "like.jpg")
-                    prioridade = 5
-
-                elif total_dedos == 2 and indicador_levantado and medio_levantado and not anelar_levantado and not minimo_levantado:
-                    # Paz e Amor: indicador + médio levantados
-                    gesto_temp = "Paz e Amor"
-                    img_temp = mapeamento_gestos.get("Paz e Amor", "paz.jpg")
-                    prioridade = 4
-
-                elif indicador_levantado and minimo_levantado and not medio_levantado and not anelar_levantado:
-                    # Rock: indicador + mindinho levantados
-                    gesto_temp = "Rock"
-                    img_temp = mapeamento_gestos.get("Rock", "like.jpg")
-                    prioridade = 4
-
-                elif total_dedos == 1 and indicador_levantado:
-                    # Apontar: só indicador levantado
-                    gesto_temp = "Apontando"
-                    img_temp = mapeamento_gestos.get("Apontando", "neutro.jpg")
-                    prioridade = 2
-
-                elif total_dedos == 5:
-                    # Mão Aberta: todos os dedos levantados
-                    gesto_temp = "Mao Aberta"
-                    img_temp = mapeamento_gestos.get("Mao Aberta", "sol.jpg")
-                    prioridade = 3
-
-                elif outros_dedos_fechados and not polegar_pra_cima:
-                    # Punho Fechado: todos os dedos fechados (sem polegar pra cima)
-                    gesto_temp = "Punho Fechado"
-                    img_temp = mapeamento_gestos.get("Punho Fechado", "lua.jpg")
-                    prioridade = 1
-                
-                gestos_lista.append(f"{lateralidade} ({orientacao}): {gesto_temp}")
-                
-                if prioridade > maior_prioridade:
-                    maior_prioridade = prioridade
-                    imagem_nome = img_temp
-                    gesto_principal = gesto_temp
-
-        if gestos_lista:
-            gesto_detectado = " | ".join(gestos_lista)
-        
-        # --- Lógica de Rosto (Prioridade sobre Mãos se detectar expressão forte) ---
-        if resultados_rosto.multi_face_landmarks:
-            for face_landmarks in resultados_rosto.multi_face_landmarks:
-                exp, img_exp = detectar_expressao(face_landmarks)
-                expressao_detectada = exp
-
-                # Prioriza expressão facial quando não há gesto de mão forte
-                if img_exp and gesto_principal in ["Nenhuma mao", "Punho Fechado", "Mao Aberta"] and "Dedos" not in gesto_principal:
-                    imagem_nome = img_exp
-
-        # Atualizar estado global
-        with estado_lock:
-            estado_atual["gesto"] = gesto_detectado
-            estado_atual["gesto_principal"] = gesto_principal
-            estado_atual["expressao"] = expressao_detectada
-            estado_atual["imagem"] = imagem_nome
-
-        # Codificar frame para JPEG
-        ret, buffer = cv2.imencode('.jpg', frame)
-        frame_bytes = buffer.tobytes()
-
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-        time.sleep(0.033)  # ~30 FPS limiter
+        backoff = _CAPTURA_BACKOFF_INICIAL
+        with _m_flip.medir():
+            frame = cv2.flip(frame, 1)
+        if getattr(camera, "ritmo", None) == "maximo":
+            # Fonte sem relógio: o próximo frame sai quando a inferência termina
+            # o anterior (a leitura acontece enquanto ela trabalha, sem girar em falso)
+            if seq_inferencia is not None:
+                _buffer_inferencia.aguardar(seq_inferencia, timeout=_CAPTURA_TIMEOUT_FRAME)
+            seq_inferencia = _buffer_inferencia.seq
+
+        # Fontes gravadas trazem o relógio da mídia; câmeras usam o horário da captura
+        _buffer_camera.publicar(frame, getattr(camera, "timestamp_frame", None))
+        _m_frames_capturados.inc()
+        _taxa_captura.aguardar()
+
+def _garantir_captura():
+    """Inicia a thread de captura na primeira vez que um stream precisa dela."""
+    global _captura_thread
+
+    with _captura_thread_lock:
+        if _captura_thread is None or not _captura_thread.is_alive():
+            _captura_thread = threading.Thread(target=_loop_captura, daemon=True)
+            _captura_thread.start()
+
+def _aguardar_frame_camera(seq_anterior):
+    """Retorna (seq, timestamp, frame) mais novo que seq_anterior ou None se a câmera não entregou nada.
+
+    O frame é compartilhado entre todos os streams: quem for desenhar nele
+    precisa trabalhar numa cópia.
+    """
+    global _ultima_demanda_captura
+    _ultima_demanda_captura = time.monotonic()
+    _garantir_captura()
+    return _buffer_camera.aguardar(seq_anterior)
+
+# --- Transmissão MJPEG ---
+# Cada frame anotado é codificado em JPEG uma única vez por perfil (largura
+# + qualidade) e os bytes são entregues a todos os clientes daquele perfil.
+# Cada cliente tem uma fila de um slot: se ele não consumiu o frame
+# anterior, o novo substitui o antigo (cliente lento pula frames em vez de
+# acumular atraso).
+
+def _parte_mjpeg(frame_bytes):
+    return (b'--frame\r\n'
+            b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+
+@dataclass(frozen=True)
+class PerfilMJPEG:
+    """Camada de codificação compartilhada pelos clientes que pedem o mesmo."""
+    largura: int = None  # None = largura original (só reduz, nunca amplia)
+    qualidade: int = None  # None = padrão do OpenCV (95)
+
+PERFIL_PADRAO = PerfilMJPEG()
+
+@dataclass(frozen=True)
+class OpcoesStream:
+    """Parâmetros de um cliente MJPEG (?w=320&q=60&fps=15, q=auto = adaptativo).
+
+    overlay=cliente entrega o frame sem anotações: o navegador desenha o
+    esqueleto e o HUD a partir de /landmarks_stream.
+    """
+    perfil: PerfilMJPEG = PERFIL_PADRAO
+    fps: float = None  # teto de FPS do cliente (None = o do stream)
+    adaptativo: bool = False
+    limpo: bool = False
+
+_LARGURA_MIN, _LARGURA_MAX = 64, 1920
+_QUALIDADE_MIN, _QUALIDADE_MAX = 10, 100
+
+def _opcoes_stream(args):
+    """Lê w, q e fps da query string. Levanta ValueError se inválidos."""
+    def inteiro(nome, minimo, maximo):
+        valor = args.get(nome)
+        if valor in (None, ""):
+            return None
+        try:
+            valor = int(valor)
+        except ValueError:
+            raise ValueError(f"Parâmetro '{nome}' inválido: {args.get(nome)}")
+        return max(minimo, min(maximo, valor))
+
+    largura = inteiro("w", _LARGURA_MIN, _LARGURA_MAX)
+    adaptativo = args.get("q") == "auto"
+    qualidade = None if adaptativo else inteiro("q", _QUALIDADE_MIN, _QUALIDADE_MAX)
+    fps = None
+    if args.get("fps") not in (None, ""):
+        try:
+            fps = float(args["fps"])
+        except ValueError:
+            raise ValueError(f"Parâmetro 'fps' inválido: {args['fps']}")
+        if fps <= 0:
+            fps = None
+    overlay = args.get("overlay", "servidor")
+    if overlay not in ("servidor", "cliente"):
+        raise ValueError(f"Parâmetro 'overlay' inválido: {overlay} (use servidor ou cliente)")
+    return OpcoesStream(PerfilMJPEG(largura, qualidade), fps, adaptativo, overlay == "cliente")
+
+def _codificar_jpeg(frame, perfil, redimensionados=None):
+    """Codifica o frame no perfil. redimensionados: cache largura → frame reduzido."""
+    if perfil.largura is not None and perfil.largura < frame.shape[1]:
+        reduzido = redimensionados.get(perfil.largura) if redimensionados is not None else None
+        if reduzido is None:
+            altura = max(1, round(frame.shape[0] * perfil.largura / frame.shape[1]))
+            reduzido = cv2.resize(frame, (perfil.largura, altura), interpolation=cv2.INTER_AREA)
+            if redimensionados is not None:
+                redimensionados[perfil.largura] = reduzido
+        frame = reduzido
+    if perfil.qualidade is None:
+        ok, buffer = cv2.imencode('.jpg', frame)
+    else:
+        ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, perfil.qualidade])
+    return buffer.tobytes() if ok else None
+
+class AdaptadorBanda:
+    """Escolhe a qualidade JPEG de um cliente pela vazão com que ele drena o stream.
+
+    O gerador mede quanto tempo cada yield leva para voltar (o servidor só
+    pede a próxima parte depois de escrever a anterior no socket). Quando o
+    envio ocupa boa parte do intervalo entre frames, o cliente está a ponto
+    de acumular atraso e a qualidade desce um degrau; com folga sustentada,
+    sobe. Os degraus são fixos para que clientes adaptativos continuem
+    compartilhando camadas.
+    """
+    QUALIDADES = (85, 70, 55, 40, 25)
+    OCUPACAO_ALTA = 0.6  # fração do intervalo gasta enviando
+    OCUPACAO_BAIXA = 0.25
+    ESPERA_DESCER = 0.5  # segundos mínimos entre trocas
+    ESPERA_SUBIR = 3.0
+
+    def __init__(self, largura=None, fps_alvo=0):
+        self.largura = largura
+        self.intervalo = 1.0 / (fps_alvo if fps_alvo and fps_alvo > 0 else _FPS_PADRAO)
+        self.nivel = 0
+        self.ocupacao = 0.0  # média móvel de tempo de envio / intervalo
+        self.vazao = 0.0  # bytes/s estimados durante o envio
+        self._ultima_troca = time.monotonic()
+
+    def perfil(self):
+        return PerfilMJPEG(self.largura, self.QUALIDADES[self.nivel])
+
+    def registrar_envio(self, n_bytes, segundos):
+        self.ocupacao = 0.8 * self.ocupacao + 0.2 * (segundos / self.intervalo)
+        self.vazao = 0.8 * self.vazao + 0.2 * (n_bytes / max(segundos, 1e-3))
+
+        agora = time.monotonic()
+        desde_troca = agora - self._ultima_troca
+        if (self.ocupacao > self.OCUPACAO_ALTA and self.nivel < len(self.QUALIDADES) - 1
+                and desde_troca >= self.ESPERA_DESCER):
+            self.nivel += 1
+            self._ultima_troca = agora
+        elif self.ocupacao < self.OCUPACAO_BAIXA and self.nivel > 0 and desde_troca >= self.ESPERA_SUBIR:
+            self.nivel -= 1
+            self._ultima_troca = agora
+
+class AssinanteMJPEG:
+    """Fila de um slot de um cliente MJPEG (o frame mais recente vence)."""
+
+    def __init__(self, perfil=PERFIL_PADRAO, adaptador=None):
+        self._item = None
+        self._lock = threading.Lock()
+        self._evento = threading.Event()
+        self.descartados = 0  # frames substituídos antes de o cliente consumir
+        self.marcapasso = None
+        self._perfil = perfil
+        self.adaptador = adaptador  # AdaptadorBanda ou None
+
+    @property
+    def perfil(self):
+        if self.adaptador is not None:
+            return self.adaptador.perfil()
+        return self._perfil
+
+    def entregar(self, seq, frame_bytes):
+        """Coloca o frame no slot. Retorna True se substituiu um frame não consumido."""
+        with self._lock:
+            substituiu = self._item is not None
+            if substituiu:
+                self.descartados += 1
+            self._item = (seq, frame_bytes)
+            self._evento.set()
+        return substituiu
+
+    def aguardar(self, timeout):
+        """Retorna (seq, bytes) ou None se nada chegou dentro do timeout."""
+        if not self._evento.wait(timeout):
+            return None
+        with self._lock:
+            item, self._item = self._item, None
+            self._evento.clear()
+        return item
+
+class _Transmissor:
+    """Conjunto de assinantes de um stream (cada um com sua fila de um slot)."""
+
+    def __init__(self):
+        self._assinantes = set()
+        self._lock = threading.Lock()
+
+    @property
+    def n_assinantes(self):
+        return len(self._assinantes)
+
+    def assinantes(self):
+        with self._lock:
+            return list(self._assinantes)
+
+    def assinar(self, perfil=PERFIL_PADRAO, adaptador=None):
+        assinante = AssinanteMJPEG(perfil, adaptador)
+        with self._lock:
+            self._assinantes.add(assinante)
+        return assinante
+
+    def cancelar(self, assinante):
+        with self._lock:
+            self._assinantes.discard(assinante)
+
+class TransmissorMJPEG(_Transmissor):
+    """Codifica cada frame uma vez por perfil e distribui os bytes para os assinantes."""
+
+    def __init__(self, nome=""):
+        super().__init__()
+        self._ultimo = None  # (seq, frame, {perfil: bytes}) do último frame publicado
+        self.anel = None  # capturas.AnelJPEG que recebe cada frame no perfil padrão (replay)
+        self._m_imencode = metricas.histograma(
+            "vision_stream_segundos", "Latência de cada etapa dos pipelines por stream", stream=nome, etapa="imencode")
+        self._m_codificados = metricas.contador(
+            "vision_frames_codificados_total", "Frames anotados codificados em JPEG", stream=nome)
+        self._m_descartados = metricas.contador(
+            "vision_frames_descartados_total", "Frames substituídos antes de o cliente consumir", stream=nome)
+
+    def perfis(self):
+        """Perfis em uso e quantos clientes há em cada um."""
+        contagem = {}
+        for assinante in self.assinantes():
+            contagem[assinante.perfil] = contagem.get(assinante.perfil, 0) + 1
+        return contagem
+
+    def _codificar(self, frame, perfil, redimensionados=None):
+        with self._m_imencode.medir():
+            frame_bytes = _codificar_jpeg(frame, perfil, redimensionados)
+        if frame_bytes is not None:
+            self._m_codificados.inc()
+        return frame_bytes
+
+    def publicar(self, seq, frame):
+        """frame não pode mais ser alterado: fica guardado para /snapshot.jpg."""
+        with self._lock:
+            assinantes = list(self._assinantes)
+        codificados = {}
+        redimensionados = {}
+        for assinante in assinantes:
+            perfil = assinante.perfil
+            if perfil not in codificados:
+                codificados[perfil] = self._codificar(frame, perfil, redimensionados)
+            frame_bytes = codificados[perfil]
+            if frame_bytes is not None and assinante.entregar(seq, frame_bytes):
+                self._m_descartados.inc()
+        if self.anel is not None:
+            # Sempre no perfil padrão, com ou sem clientes (reaproveita os bytes se algum o usa)
+            if PERFIL_PADRAO not in codificados:
+                codificados[PERFIL_PADRAO] = self._codificar(frame, PERFIL_PADRAO, redimensionados)
+            if codificados[PERFIL_PADRAO] is not None:
+                self.anel.guardar(seq, codificados[PERFIL_PADRAO])
+        self._ultimo = (seq, frame, codificados)
+
+    def ultimo(self, perfil=PERFIL_PADRAO):
+        """Retorna (seq, bytes) do último frame no perfil pedido ou None.
+
+        Se nenhum cliente usa o perfil, o frame é codificado agora (uma vez).
+        """
+        item = self._ultimo
+        if item is None:
+            return None
+        seq, frame, codificados = item
+        frame_bytes = codificados.get(perfil)
+        if frame_bytes is None:
+            frame_bytes = codificados[perfil] = self._codificar(frame, perfil)
+        return seq, frame_bytes
+
+# --- Landmarks em binário (overlay no navegador) ---
+# Uma mensagem por frame inferido, little-endian:
+#   u16 tamanho do restante | u8 versão | u8 número de mãos | u32 seq
+#   por mão: u8 lateralidade (0 = Right, 1 = Left) | u8 dedos levantados
+#            (bit 0 = polegar ... bit 4 = mínimo) | 21 × (i16 x, i16 y)
+# As coordenadas são as normalizadas do MediaPipe (frame espelhado)
+# multiplicadas por ESCALA_LANDMARKS. Duas mãos cabem em 180 bytes.
+# seq = 0 é um keep-alive sem mãos. static/js/overlay_landmarks.js lê o formato.
+VERSAO_LANDMARKS = 1
+ESCALA_LANDMARKS = 10000
+_PESOS_DEDOS = np.array([1, 2, 4, 8, 16]) if np is not None else None
+
+def codificar_landmarks(seq, caracteristicas):
+    """Mensagem binária das mãos de um frame (CaracteristicasMaos)."""
+    n = len(caracteristicas)
+    corpo = struct.pack("<BBI", VERSAO_LANDMARKS, n, seq)
+    if n:
+        xy = np.clip(np.rint(caracteristicas.pontos[:, :, :2] * ESCALA_LANDMARKS), -32768, 32767).astype("<i2")
+        dedos = caracteristicas.dedos @ _PESOS_DEDOS
+        for i in range(n):
+            lado = 0 if caracteristicas.lateralidades[i] == "Right" else 1
+            corpo += struct.pack("<BB", lado, int(dedos[i])) + xy[i].tobytes()
+    return struct.pack("<H", len(corpo)) + corpo
+
+_KEEPALIVE_LANDMARKS = struct.pack("<HBBI", 6, VERSAO_LANDMARKS, 0, 0)
+
+class TransmissorLandmarks(_Transmissor):
+    """Distribui as mensagens de landmarks (o mais recente vence, como no MJPEG)."""
+
+    def publicar(self, seq, mensagem):
+        for assinante in self.assinantes():
+            assinante.entregar(seq, mensagem)
+
+# --- Ritmo dos streams ---
+# FPS alvo por stream (0 = sem limite, útil para medir throughput).
+# Sobrescreva com VISION_FPS_PRINCIPAL, VISION_FPS_MUSICA, VISION_FPS_PINTURA.
+_FPS_PADRAO = 30.0
+config_fps = {
+    nome: float(os.getenv(f"VISION_FPS_{nome.upper()}", _FPS_PADRAO))
+    for nome in ("principal", "musica", "pintura")
+}
 
-@app.route('/')
-def index():
-    return render_template('index.html')
+class MarcapassoFrames:
+    """Ritmo por deadline: desconta o tempo de processamento do sleep.
 
-@app.route('/video_feed')
-def video_feed():
-    if CLOUD_MODE or not CV_AVAILABLE:
-        return redirect(url_for('static', filename='images/neutro.jpg'))
-    return Response(gerar_frames(), mimetype='multipart/x-mixed-replace; boundary=frame')
+    Se o envio atrasar mais de um intervalo, o marcapasso não tenta
+    compensar (isso enfileiraria frames velhos): ele pula os deadlines
+    perdidos, conta o atraso e recomeça a partir de agora.
+    """
 
-# --- Lógica de Pintura Virtual ---
-canvas_pintura = np.zeros((480, 640, 3), dtype=np.uint8) if np is not None else None
-canvas_mascara = np.zeros((480, 640), dtype=np.uint8) if np is not None else None
-cor_pincel = (255, 0, 0) # Azul BGR (OpenCV usa BGR)
-ponto_anterior = (0, 0)
-
-def gerar_frames_pintura():
-    global cap, canvas_pintura, canvas_mascara, cor_pincel, ponto_anterior
-    
-    mp_instance = maos_pintura if maos_pintura is not None else maos
-    
-    # Cores disponíveis (BGR)
-    cores = [
-        ((255, 0, 0), "Azul"),    # Azul
-        ((0, 255, 0), "Verde"),   # Verde
-        ((0, 0, 255), "Vermelho"),# Vermelho
-        ((0, 0, 0), "Borracha")   # Preto (Apagar)
-    ]
-    
-    # Áreas dos botões de cor (x, y, w, h)
-    botoes = []
-    largura_botao = 100
-    for i in range(len(cores)):
-        botoes.append( (40 + i * 120, 20, largura_botao, 60) )
+    def __init__(self, fps_alvo, contador_pulados=None):
+        self.fps_alvo = fps_alvo
+        self._contador_pulados = contador_pulados  # metricas.Contador opcional
+        self.intervalo = 1.0 / fps_alvo if fps_alvo > 0 else 0.0
+        self.enviados = 0
+        self.pulados = 0  # deadlines perdidos por atraso
+        self.fps = 0.0  # FPS alcançado na última janela de ~1s
+        self._proximo = None
+        self._janela_inicio = time.monotonic()
+        self._janela_enviados = 0
+
+    def aguardar(self):
+        """Chamar após cada envio; dorme até o próximo deadline."""
+        agora = time.monotonic()
+        self._contar_envio(agora)
+
+        if self.intervalo == 0:
+            return
+
+        if self._proximo is None:
+            self._proximo = agora
+        self._proximo += self.intervalo
+
+        espera = self._proximo - agora
+        if espera > 0:
+            time.sleep(espera)
+        elif -espera >= self.intervalo:
+            pulados = int(-espera // self.intervalo)
+            self.pulados += pulados
+            if self._contador_pulados is not None:
+                self._contador_pulados.inc(pulados)
+            self._proximo = agora
+
+    def _contar_envio(self, agora):
+        self.enviados += 1
+        self._janela_enviados += 1
+        decorrido = agora - self._janela_inicio
+        if decorrido >= 1.0:
+            self.fps = self._janela_enviados / decorrido
+            self._janela_inicio = agora
+            self._janela_enviados = 0
+
+# Sem FPS alvo, o marcapasso só conta: FPS alcançado da captura e da inferência
+_taxa_captura = MarcapassoFrames(0)
+_taxa_inferencia = MarcapassoFrames(0)
+metricas.medidor("vision_fps", "FPS alcançado por estágio", funcao=lambda: _taxa_captura.fps, etapa="captura")
+metricas.medidor("vision_fps", "FPS alcançado por estágio", funcao=lambda: _taxa_inferencia.fps, etapa="inferencia")
+
+def _codificar_placeholder(linhas):
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    for texto, pos, escala, cor, espessura in linhas:
+        cv2.putText(frame, texto, pos, cv2.FONT_HERSHEY_SIMPLEX, escala, cor, espessura)
+    ok, buffer = cv2.imencode('.jpg', frame)
+    return buffer.tobytes()
+
+# Frames de aviso codificados uma vez na inicialização
+_PLACEHOLDERS = {}
+if CV_AVAILABLE and not CLOUD_MODE:
+    _PLACEHOLDERS = {
+        "camera": _codificar_placeholder([
+            ("CAMERA NAO ENCONTRADA", (50, 240), 1, (0, 0, 255), 2),
+            ("Verifique se outra app esta usando a camera", (35, 280), 0.6, (255, 255, 255), 1)
+        ]),
+        "camera_simples": _codificar_placeholder([
+            ("CAMERA NAO ENCONTRADA", (50, 240), 1, (0, 0, 255), 2)
+        ]),
+        "erro": _codificar_placeholder([
+            ("ERRO NA CAMERA", (150, 240), 1, (0, 0, 255), 2)
+        ])
+    }
+
+# --- Inferência compartilhada ---
+# Uma thread roda mãos + rosto uma única vez por frame capturado e entrega o
+# resultado tipado para os pipelines das páginas (principal, música,
+# pintura). Cada pipeline só roda enquanto tem espectadores, e roda uma vez
+# por frame, não uma vez por cliente.
+
+@dataclass(frozen=True)
+class MaoDetectada:
+    landmarks: object  # NormalizedLandmarkList do MediaPipe
+    lateralidade: str  # "Right" / "Left"
+
+@dataclass(frozen=True)
+class ResultadoInferencia:
+    """Resultado do estágio de inferência para um frame capturado."""
+    seq: int
+    timestamp: float
+    frame: object  # BGR espelhado, somente leitura (compartilhado)
+    maos: tuple = ()  # tupla de MaoDetectada
+    rosto: object = None  # landmarks do primeiro rosto ou None
+    rosto_atualizado: bool = True  # False = rosto mantido de um frame anterior
+    caracteristicas: object = None  # CaracteristicasMaos de todas as mãos do frame
+
+# --- Cadência do FaceMesh ---
+# O FaceMesh (refine_landmarks) é a chamada mais cara do frame e a expressão
+# muda devagar. Cada pipeline tem um agendador: no modo "cadencia" o rosto
+# roda a cada N frames; no modo "relevancia" roda a cada N frames só quando
+# o resultado das mãos torna a expressão relevante. Nos frames pulados o
+# último rosto é mantido (e portanto a última expressão).
+# Configurável por VISION_ROSTO_MODO_<PIPELINE> e VISION_ROSTO_INTERVALO_<PIPELINE>.
+config_rosto = {
+    "principal": {
+        "modo": os.getenv("VISION_ROSTO_MODO_PRINCIPAL", "relevancia"),
+        "intervalo": int(os.getenv("VISION_ROSTO_INTERVALO_PRINCIPAL", "2"))
+    },
+    "musica": {
+        "modo": os.getenv("VISION_ROSTO_MODO_MUSICA", "cadencia"),
+        "intervalo": int(os.getenv("VISION_ROSTO_INTERVALO_MUSICA", "2"))
+    }
+}
+
+class AgendadorRosto:
+    """Decide em quais frames um pipeline precisa de um FaceMesh novo."""
+
+    def __init__(self, intervalo=1, relevante=None):
+        self.intervalo = max(1, int(intervalo))
+        self.relevante = relevante  # relevante(maos, sessao) -> bool, ou None
 
+    def devido(self, frames_desde_rosto):
+        return frames_desde_rosto >= self.intervalo
+
+    def precisa_rosto(self, frames_desde_rosto, maos, sessao):
+        if not self.devido(frames_desde_rosto):
+            return False
+        return self.relevante is None or self.relevante(maos, sessao)
+
+def _criar_agendador_rosto(nome, relevante=None):
+    config = config_rosto.get(nome, {})
+    modo = config.get("modo", "cadencia")
+    return AgendadorRosto(
+        intervalo=config.get("intervalo", 1),
+        relevante=relevante if modo == "relevancia" else None
+    )
+
+class ContextoInferencia:
+    """Instâncias do MediaPipe emprestadas a uma sessão e o rosto mantido entre frames."""
+
+    def __init__(self, maos_inst, rosto_inst):
+        self.maos = maos_inst
+        self.rosto = rosto_inst
+        self.lock = threading.Lock()  # um frame por vez (o MediaPipe rastreia entre frames)
+        self.fechado = False
+        self.reiniciar()
+
+    def reiniciar(self, sessao=None):
+        self.sessao = sessao  # SessaoVisao dona das instâncias
+        self.rosto_mantido = None  # último rosto calculado (usado nos frames pulados)
+        self.frames_desde_rosto = 1 << 30
+
+    def reiniciar_grafos(self):
+        """Zera o rastreamento de Hands e FaceMesh (as instâncias mudaram de sessão)."""
+        with self.lock:
+            if not self.fechado:
+                self.maos.reset()
+                self.rosto.reset()
+            self.reiniciar()
+
+    def fechar(self):
+        # Sob o lock: espera o frame em curso; quem pegar o lock depois vê fechado
+        with self.lock:
+            self.fechado = True
+            self.maos.close()
+            self.rosto.close()
+
+# Pool de instâncias do MediaPipe (cada par Hands + FaceMesh ocupa dezenas de MB)
+MAX_MEDIAPIPE = int(os.getenv("VISION_MAX_MEDIAPIPE", "4"))
+MEDIAPIPE_OCIOSO_MAX = float(os.getenv("VISION_MEDIAPIPE_OCIOSO", "60"))  # segundos
+_FAXINA_INTERVALO = 10.0
+
+_pool_mediapipe = pool_instancias.PoolInstancias(
+    lambda: ContextoInferencia(*criar_mediapipe()), MAX_MEDIAPIPE,
+    ocioso_max=MEDIAPIPE_OCIOSO_MAX, fechar=ContextoInferencia.fechar,
+    reiniciar=ContextoInferencia.reiniciar_grafos
+)
+metricas.medidor("vision_mediapipe_instancias", "Pares Hands + FaceMesh vivos no pool",
+                 funcao=lambda: len(_pool_mediapipe))
+metricas.medidor("vision_sessoes", "Sessões de captura no navegador em memória", funcao=lambda: len(_sessoes))
+_m_mediapipe_expiradas = metricas.contador("vision_mediapipe_expiradas_total",
+                                           "Instâncias do MediaPipe fechadas por ociosidade")
+_m_pool_esgotado = metricas.contador("vision_mediapipe_pool_esgotado_total",
+                                     "Pedidos recusados com o pool de MediaPipe cheio")
+_faxina_thread = None
+_faxina_lock = threading.Lock()
+
+@contextmanager
+def _contexto_da_sessao(sessao):
+    """Instâncias do pool para a sessão, com o lock do contexto durante o bloco.
+
+    Se as instâncias vieram de outra sessão, o rastreamento recomeça. Se
+    foram fechadas (sessão despejada, ociosidade) entre o empréstimo e o
+    lock, pede outras ao pool. Levanta PoolEsgotado com o pool cheio de
+    sessões ativas.
+    """
+    _garantir_faxina()
     while True:
-        # Verificar câmera sob lock
-        with camera_lock:
-            cam_ok = cap is not None and cap.isOpened()
-
-        if not cam_ok:
-            if not abrir_camera(config_dispositivos["camera_index"], fallback=True):
-                frame = np.zeros((480, 640, 3), dtype=np.uint8)
-                cv2.putText(frame, "ERRO NA CAMERA", (150, 240), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-                ret, buffer = cv2.imencode('.jpg', frame)
-                frame_bytes = buffer.tobytes()
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-                time.sleep(0.5)
+        try:
+            contexto = _pool_mediapipe.obter(sessao)
+        except pool_instancias.PoolEsgotado:
+            _m_pool_esgotado.inc()
+            raise
+        with contexto.lock:
+            if contexto.fechado:
                 continue
+            if contexto.sessao is not sessao:
+                contexto.reiniciar(sessao)
+            yield contexto
+            return
 
-            time.sleep(0.5)
-            continue
+def _loop_faxina():
+    while True:
+        time.sleep(_FAXINA_INTERVALO)
+        limite = time.monotonic() - SESSAO_OCIOSA_MAX
+        with _sessoes_lock:
+            paradas = [s for s in _sessoes.values() if s.ultimo_uso < limite]
+            for sessao in paradas:
+                del _sessoes[sessao.id]
+        for sessao in paradas:
+            _pool_mediapipe.liberar(sessao)
+            _fechar_trilhas(sessao)
+        _m_mediapipe_expiradas.inc(_pool_mediapipe.expirar())
+
+def _garantir_faxina():
+    global _faxina_thread
+    with _faxina_lock:
+        if _faxina_thread is None or not _faxina_thread.is_alive():
+            _faxina_thread = threading.Thread(target=_loop_faxina, daemon=True)
+            _faxina_thread.start()
+
+# Aquecimento: cria o par de modelos da câmera local e roda uma inferência
+# num frame preto em segundo plano, para que o primeiro frame real não pague
+# o import do MediaPipe nem a criação dos grafos. O par aquecido segue a
+# regra de ociosidade do pool. VISION_AQUECER=0 desliga (padrão no cloud).
+AQUECER_MEDIAPIPE = os.getenv("VISION_AQUECER", "0" if CLOUD_MODE else "1") == "1"
+
+def aquecer_mediapipe():
+    if not _carregar_cv():
+        return
+    inicio = time.perf_counter()
+    frame_rgb = np.zeros((240, 320, 3), dtype=np.uint8)
+    try:
+        with _contexto_da_sessao(_sessao_local) as contexto:
+            # Agendador sem critério de relevância: roda mãos e rosto
+            _inferir(0, 0.0, None, [AgendadorRosto()], contexto, frame_rgb)
+            contexto.reiniciar(_sessao_local)
+    except pool_instancias.PoolEsgotado:
+        return
+    print(f"\U0001f525 MediaPipe aquecido em {(time.perf_counter() - inicio) * 1000:.0f} ms")
 
-        # Ler frame sob lock
-        with camera_lock:
-            if cap is not None:
-                sucesso, frame = cap.read()
-            else:
-                sucesso, frame = False, None
+def iniciar_aquecimento():
+    if AQUECER_MEDIAPIPE and CV_AVAILABLE:
+        threading.Thread(target=aquecer_mediapipe, daemon=True).start()
 
-        if not sucesso:
-            frame = np.zeros((480, 640, 3), dtype=np.uint8)
-            cv2.putText(frame, "ERRO NA CAMERA", (150, 240), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+_buffer_inferencia = BufferFrames()
+_pipelines = {}
+_pipelines_lock = threading.Lock()
+_inferencia_thread = None
+_inferencia_cond = threading.Condition()  # acorda a thread quando surge um espectador
 
-            with camera_lock:
-                if cap is not None:
-                    cap.release()
-                    cap = None
+def _opcoes_overlay_pagina():
+    """?overlay=cliente: a página desenha esqueleto e HUD; ?video=0 dispensa o vídeo.
 
-            ret, buffer = cv2.imencode('.jpg', frame)
-            frame_bytes = buffer.tobytes()
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-            time.sleep(0.5)
-            continue
+    ?captura=navegador (padrão no CLOUD_MODE): a webcam é lida pela página e
+    os frames vão para /inferir numa sessão própria da aba.
+    """
+    overlay_cliente = request.args.get("overlay") == "cliente"
+    captura_navegador = CLOUD_MODE or request.args.get("captura") == "navegador"
+    return {
+        "overlay_cliente": overlay_cliente,
+        "sem_video": overlay_cliente and request.args.get("video") == "0",
+        "captura_navegador": captura_navegador,
+        "sessao": uuid.uuid4().hex[:12] if captura_navegador else None
+    }
+
+def _frame_sem_overlay(resultado, sessao):
+    return resultado.frame
+
+def _registrar_pipeline(nome, processar, agendador_rosto=None, atualizar=None, limpo=_frame_sem_overlay):
+    """Registra um pipeline de página. processar(resultado, sessao) -> frame anotado.
+
+    agendador_rosto=None indica que o pipeline não usa o FaceMesh.
+    atualizar(resultado, sessao) é a parte de processar que só atualiza o
+    estado da sessão (sem frame); pipelines que a informam podem ser
+    reproduzidos a partir de landmarks gravados, recebem frames do
+    navegador e, sem clientes do frame anotado, pulam o desenho.
+    limpo(resultado, sessao) -> frame entregue com overlay=cliente.
+    """
+    transmissor = TransmissorMJPEG(nome)
+    transmissor_limpo = TransmissorMJPEG(f"{nome}_limpo")
+    transmissor_landmarks = TransmissorLandmarks()
+    _pipelines[nome] = {
+        "nome": nome,
+        "processar": processar,
+        "atualizar": atualizar,
+        "limpo": limpo,
+        "agendador_rosto": agendador_rosto,
+        "transmissor": transmissor,
+        "transmissor_limpo": transmissor_limpo,
+        "transmissor_landmarks": transmissor_landmarks,
+        "m_processar": metricas.histograma(
+            "vision_stream_segundos", "Latência de cada etapa dos pipelines por stream", stream=nome, etapa="processar"),
+        "m_desenho": metricas.histograma(
+            "vision_stream_segundos", "Latência de cada etapa dos pipelines por stream", stream=nome, etapa="desenho"),
+        "m_erros": metricas.contador("vision_pipeline_erros_total", "Exceções nos pipelines", stream=nome)
+    }
+    for tipo, transmissor_tipo in (("anotado", transmissor), ("limpo", transmissor_limpo),
+                                   ("landmarks", transmissor_landmarks)):
+        metricas.medidor("vision_assinantes", "Clientes conectados por stream e tipo de entrega",
+                         funcao=lambda t=transmissor_tipo: t.n_assinantes, stream=nome, tipo=tipo)
+    metricas.medidor("vision_stream_fps", "FPS alcançado médio dos clientes do stream",
+                     funcao=lambda: _fps_medio_clientes(transmissor), stream=nome)
+
+def _fps_medio_clientes(transmissor):
+    taxas = [a.marcapasso.fps for a in transmissor.assinantes() if a.marcapasso is not None]
+    return sum(taxas) / len(taxas) if taxas else 0.0
+
+_CHAVES_TRANSMISSORES = ("transmissor", "transmissor_limpo", "transmissor_landmarks")
+
+def _pipelines_ativos():
+    with _pipelines_lock:
+        return [p for p in _pipelines.values()
+                if any(p[chave].n_assinantes > 0 for chave in _CHAVES_TRANSMISSORES)]
+
+# --- Mãos e rosto em paralelo ---
+# O MediaPipe solta o GIL dentro do grafo: quando já se sabe antes das mãos
+# que o rosto vai rodar, o FaceMesh vai para um pool enquanto as mãos rodam
+# na própria thread de inferência, e a latência do frame passa a ser o
+# maior dos dois em vez da soma. Em máquinas de 1 núcleo fica desligado
+# (VISION_INFERENCIA_PARALELA=0/1 força).
+INFERENCIA_PARALELA = os.getenv("VISION_INFERENCIA_PARALELA", "1" if (os.cpu_count() or 1) > 1 else "0") == "1"
+_pool_inferencia = None
+
+def _obter_pool_inferencia():
+    global _pool_inferencia
+    if _pool_inferencia is None:
+        _pool_inferencia = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rosto")
+    return _pool_inferencia
+
+def _extrair_maos(resultados_maos):
+    maos_detectadas = []
+    if resultados_maos.multi_hand_landmarks:
+        for idx, hand_landmarks in enumerate(resultados_maos.multi_hand_landmarks):
+            lateralidade = "Right"
+            # Proteção contra índice fora do alcance (embora raro)
+            if resultados_maos.multi_handedness and idx < len(resultados_maos.multi_handedness):
+                lateralidade = resultados_maos.multi_handedness[idx].classification[0].label
+            maos_detectadas.append(MaoDetectada(hand_landmarks, lateralidade))
+    return tuple(maos_detectadas)
+
+def _primeiro_rosto(resultados_rosto):
+    if resultados_rosto.multi_face_landmarks:
+        return resultados_rosto.multi_face_landmarks[0]
+    return None
+
+def _processar_maos(maos_inst, frame_rgb):
+    with _m_maos.medir():
+        return _extrair_maos(maos_inst.process(frame_rgb))
+
+def _processar_rosto(rosto_inst, frame_rgb):
+    with _m_rosto.medir():
+        return _primeiro_rosto(rosto_inst.process(frame_rgb))
+
+def processar_maos_e_rosto(maos_inst, rosto_inst, frame_rgb, paralelo=None):
+    """Roda mãos e rosto no mesmo frame; em paralelo se habilitado. Retorna (maos, rosto)."""
+    if paralelo is None:
+        paralelo = INFERENCIA_PARALELA
+
+    if not paralelo:
+        return _processar_maos(maos_inst, frame_rgb), _processar_rosto(rosto_inst, frame_rgb)
+
+    futuro_rosto = _obter_pool_inferencia().submit(_processar_rosto, rosto_inst, frame_rgb)
+    maos_detectadas = _processar_maos(maos_inst, frame_rgb)
+    return maos_detectadas, futuro_rosto.result()
+
+def _inferir(seq, timestamp, frame, agendadores_rosto, contexto, frame_rgb=None):
+    """Roda o MediaPipe no frame e monta o ResultadoInferencia.
+
+    O FaceMesh só roda se algum agendador pedir; senão o último rosto é mantido.
+    contexto: instâncias e rosto mantido da sessão (ver _contexto_da_sessao).
+    frame_rgb: frame já reduzido para 320x240 em RGB (frames do navegador);
+    sem ele, é calculado a partir do frame BGR.
+    """
+    if frame_rgb is None:
+        with _m_preprocessamento.medir():
+            frame_small = cv2.resize(frame, (320, 240))
+            frame_rgb = cv2.cvtColor(frame_small, cv2.COLOR_BGR2RGB)
 
-        frame = cv2.flip(frame, 1)
-        # Forçar tamanho 640x480 para bater com o canvas
-        frame = cv2.resize(frame, (640, 480))
-        
-        # Downscale para MediaPipe (coordenadas normalizadas 0-1)
-        frame_small = cv2.resize(frame, (320, 240))
-        frame_rgb = cv2.cvtColor(frame_small, cv2.COLOR_BGR2RGB)
-        resultados = mp_instance.process(frame_rgb)
-        
-        with pintura_lock:
-            # Desenhar interface (botões)
-            for i, (cor, nome) in enumerate(cores):
-                x, y, w, h = botoes[i]
-                cor_botao = cor if cor != (0, 0, 0) else (80, 80, 80)
-                cv2.rectangle(frame, (x, y), (x+w, y+h), cor_botao, -1)
-                cv2.putText(frame, nome, (x+10, y+40), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-                # Borda branca no botão selecionado
-                if cor == cor_pincel:
-                    cv2.rectangle(frame, (x, y), (x+w, y+h), (255, 255, 255), 3)
-
-            if resultados.multi_hand_landmarks:
-                for hand_landmarks in resultados.multi_hand_landmarks:
-                    x8 = int(hand_landmarks.landmark[8].x * 640)
-                    y8 = int(hand_landmarks.landmark[8].y * 480)
-                    
-                    indicador_levantado = hand_landmarks.landmark[8].y < hand_landmarks.landmark[6].y
-                    
-                    dedos_up = 0
-                    if hand_landmarks.landmark[8].y < hand_landmarks.landmark[6].y: dedos_up += 1
-                    if hand_landmarks.landmark[12].y < hand_landmarks.landmark[10].y: dedos_up += 1
-                    if hand_landmarks.landmark[16].y < hand_landmarks.landmark[14].y: dedos_up += 1
-                    if hand_landmarks.landmark[20].y < hand_landmarks.landmark[18].y: dedos_up += 1
-                    
-                    if dedos_up >= 4: # Mão aberta -> Limpar
-                        canvas_pintura = np.zeros((480, 640, 3), dtype=np.uint8)
-                        canvas_mascara = np.zeros((480, 640), dtype=np.uint8)
-                        cv2.putText(frame, "TELA LIMPA", (250, 240), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-                        ponto_anterior = (0, 0)
-                    
-                    elif indicador_levantado:
-                        cor_cursor = cor_pincel if cor_pincel != (0, 0, 0) else (80, 80, 80)
-                        cv2.circle(frame, (x8, y8), 10, cor_cursor, -1)
-                        
-                        if y8 < 100:
-                            for i, (bx, by, bw, bh) in enumerate(botoes):
-                                if bx < x8 < bx+bw and by < y8 < by+bh:
-                                    cor_pincel = cores[i][0]
-                                    ponto_anterior = (0, 0)
-                        else:
-                            if ponto_anterior == (0, 0):
-                                ponto_anterior = (x8, y8)
-                            
-                            if cor_pincel == (0, 0, 0):
-                                # Borracha: limpar canvas e máscara com traço mais grosso
-                                cv2.line(canvas_pintura, ponto_anterior, (x8, y8), (0, 0, 0), 12)
-                                cv2.line(canvas_mascara, ponto_anterior, (x8, y8), 0, 12)
-                            else:
-                                cv2.line(canvas_pintura, ponto_anterior, (x8, y8), cor_pincel, 5)
-                                cv2.line(canvas_mascara, ponto_anterior, (x8, y8), 255, 5)
-                            ponto_anterior = (x8, y8)
-                    else:
-                        ponto_anterior = (0, 0)
+    face = None
+    rosto_atualizado = False
 
-            # Mesclar canvas com frame usando máscara explícita
-            mascara_3c = cv2.cvtColor(canvas_mascara, cv2.COLOR_GRAY2BGR)
-            mascara_inv = cv2.bitwise_not(mascara_3c)
-            frame = cv2.bitwise_and(frame, mascara_inv)
-            frame = cv2.bitwise_or(frame, cv2.bitwise_and(canvas_pintura, mascara_3c))
+    if not agendadores_rosto or contexto.rosto is None:
+        maos_detectadas = _processar_maos(contexto.maos, frame_rgb)
+    else:
+        contexto.frames_desde_rosto += 1
+        devidos = [a for a in agendadores_rosto if a.devido(contexto.frames_desde_rosto)]
 
-        ret, buffer = cv2.imencode('.jpg', frame)
-        frame_bytes = buffer.tobytes()
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-        time.sleep(0.033)  # ~30 FPS limiter
+        if any(a.relevante is None for a in devidos):
+            # Rosto garantido neste frame: mãos e rosto juntos
+            maos_detectadas, contexto.rosto_mantido = processar_maos_e_rosto(contexto.maos, contexto.rosto, frame_rgb)
+            rosto_atualizado = True
+        else:
+            # A decisão depende das mãos: primeiro mãos, depois (talvez) o rosto
+            maos_detectadas = _processar_maos(contexto.maos, frame_rgb)
+            rosto_atualizado = any(a.precisa_rosto(contexto.frames_desde_rosto, maos_detectadas, contexto.sessao) for a in devidos)
+            if rosto_atualizado:
+                contexto.rosto_mantido = _processar_rosto(contexto.rosto, frame_rgb)
+
+        if rosto_atualizado:
+            contexto.frames_desde_rosto = 0
+        else:
+            _m_rosto_mantido.inc()
+        face = contexto.rosto_mantido
+
+    # Características de todas as mãos numa passada só, compartilhadas pelos pipelines
+    with _m_caracteristicas.medir():
+        caracteristicas = caracteristicas_mao.caracteristicas_de_landmarks(
+            [mao.landmarks for mao in maos_detectadas],
+            [mao.lateralidade for mao in maos_detectadas]
+        )
 
-@app.route('/pintura')
-def pintura():
-    return render_template('pintura.html')
+    return ResultadoInferencia(seq, timestamp, frame, maos_detectadas, face, rosto_atualizado, caracteristicas)
+
+# --- Gravação de landmarks ---
+# Com uma gravação ativa, a thread de inferência grava cada resultado (mãos,
+# lateralidade, rosto e o timestamp da captura) no formato binário de
+# gravacao_landmarks; reproduzir_landmarks roda a sessão de novo pelos
+# classificadores sem câmera nem MediaPipe. Só grava enquanto há
+# inferência (algum stream aberto). VISION_GRAVAR_LANDMARKS=arquivo liga
+# a gravação na partida; POST /gravacao liga e desliga.
+PASTA_GRAVACOES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gravacoes")
+_gravador = None
+_gravador_lock = threading.Lock()
+_m_frames_gravados = metricas.contador("vision_landmarks_gravados_total", "Frames gravados em arquivos de landmarks")
+
+def iniciar_gravacao(caminho=None):
+    """Começa (ou troca) a gravação. Sem caminho, cria um arquivo datado em gravacoes/."""
+    global _gravador
+    if caminho is None:
+        nome = datetime.datetime.now().strftime("landmarks_%Y%m%d_%H%M%S.lmk")
+        caminho = os.path.join(PASTA_GRAVACOES, nome)
+    novo = gravacao_landmarks.GravadorLandmarks(caminho)
+    with _gravador_lock:
+        anterior, _gravador = _gravador, novo
+    if anterior is not None:
+        anterior.fechar()
+    print(f"\U0001f534 Gravando landmarks em {caminho}")
+    return novo
+
+def parar_gravacao():
+    """Fecha a gravação ativa. Retorna o gravador encerrado (ou None)."""
+    global _gravador
+    with _gravador_lock:
+        anterior, _gravador = _gravador, None
+    if anterior is not None:
+        anterior.fechar()
+    return anterior
+
+def _gravar_resultado(resultado):
+    if _gravador is None:
+        return
+    with _gravador_lock:
+        if _gravador is None:
+            return
+        _gravador.gravar(
+            resultado.seq, resultado.timestamp,
+            resultado.caracteristicas.pontos, resultado.caracteristicas.lateralidades,
+            resultado.rosto, resultado.rosto_atualizado
+        )
+    _m_frames_gravados.inc()
+
+if os.getenv("VISION_GRAVAR_LANDMARKS") and gravacao_landmarks is not None and not CLOUD_MODE:
+    iniciar_gravacao(os.getenv("VISION_GRAVAR_LANDMARKS"))
+
+# --- Linha do tempo de gestos ---
+# Cada troca de gesto, combo ou expressão de uma sessão fecha um intervalo
+# (valor, início, duração, lado da mão) gravado no log colunar de
+# linha_tempo.py; /linha_tempo agrega contagens, permanência e histograma
+# por minuto sem reler frames. Só os frames inferidos ao vivo entram (a
+# reprodução de gravações não). VISION_LINHA_TEMPO=pasta ("" desliga;
+# desligada no cloud, onde o disco não persiste).
+PASTA_LINHA_TEMPO = os.getenv(
+    "VISION_LINHA_TEMPO", "" if CLOUD_MODE else os.path.join(os.path.dirname(os.path.abspath(__file__)), "linha_tempo")
+)
+_linha_tempo = linha_tempo.LinhaTempo(PASTA_LINHA_TEMPO) if PASTA_LINHA_TEMPO and linha_tempo is not None else None
+# pipeline -> (categoria, lado, chave do estado da sessão)
+_TRILHAS = {
+    "principal": (("gesto_principal", "", "gesto_principal"), ("expressao", "", "expressao")),
+    "musica": (("gesto_musica", "Right", "gesto_direita"), ("gesto_musica", "Left", "gesto_esquerda"),
+               ("combo", "", "gesto_combinado"), ("expressao", "", "expressao")),
+}
+_ESTADO_DO_PIPELINE = {"principal": "estado_atual", "musica": "estado_musica"}
+if _linha_tempo is not None:
+    metricas.medidor("vision_linha_tempo_eventos", "Eventos gravados na linha do tempo desde a partida",
+                     funcao=lambda: _linha_tempo.eventos)
 
-# --- Lógica de Música Virtual ---
+def _registrar_transicoes(sessao, pipelines):
+    """Passa o estado dos pipelines que rodaram no frame para a linha do tempo.
 
-def _classificar_gesto_musica(hand_landmarks, lateralidade):
-    """Classifica gesto para a página de música. Retorna (gesto, prioridade, dados_extra)."""
-    # Orientação
-    p0 = hand_landmarks.landmark[0]
-    p5 = hand_landmarks.landmark[5]
-    p17 = hand_landmarks.landmark[17]
-    val_cross = (p5.x - p0.x) * (p17.y - p0.y) - (p5.y - p0.y) * (p17.x - p0.x)
-    if lateralidade == "Right":
-        orientacao = "Palma" if val_cross > 0 else "Costas"
-    else:
-        orientacao = "Palma" if val_cross < 0 else "Costas"
+    A expressão vem do primeiro pipeline que a tiver; trilhas de pipelines
+    que não rodaram são fechadas (ninguém está olhando aquele gesto).
+    """
+    if _linha_tempo is None:
+        return
+    agora = time.time()
+    vistas = set()
+    for nome in pipelines:
+        estado = getattr(sessao, _ESTADO_DO_PIPELINE.get(nome, ""), None)
+        for categoria, lado, chave in _TRILHAS.get(nome, ()) if estado is not None else ():
+            if (categoria, lado) not in vistas:
+                vistas.add((categoria, lado))
+                _linha_tempo.observar(sessao.trilhas_abertas, categoria, lado, estado[chave], agora)
+    if len(vistas) < len(sessao.trilhas_abertas):
+        _linha_tempo.fechar_trilhas(sessao.trilhas_abertas, agora,
+                                    [chave for chave in sessao.trilhas_abertas if chave not in vistas])
+
+def _fechar_trilhas(sessao):
+    if _linha_tempo is not None:
+        _linha_tempo.fechar_trilhas(sessao.trilhas_abertas)
+
+def reproduzir_landmarks(caminho, pipelines=("principal", "musica"), ao_frame=None, sessao=None):
+    """Reproduz uma gravação pelos pipelines informados (só a atualização de estado).
+
+    O relógio é o timestamp gravado, não time.time(): a mesma gravação gera
+    sempre a mesma sequência de estados. O histórico de movimento começa
+    vazio. ao_frame(resultado) é chamado depois de cada frame. O estado
+    atualizado é o da sessão (padrão: a da câmera local). Retorna o número
+    de frames reproduzidos.
+    """
+    sessao = sessao or _sessao_local
+    atualizadores = []
+    for nome in pipelines:
+        atualizar = _pipelines[nome]["atualizar"] if nome in _pipelines else None
+        if atualizar is None:
+            raise ValueError(f"Pipeline sem reprodução: {nome}")
+        atualizadores.append(atualizar)
+
+    for rastreador in sessao.historico_pos.values():
+        rastreador.limpar()
+
+    frames = 0
+    for gravado in gravacao_landmarks.LeitorLandmarks(caminho):
+        resultado = ResultadoInferencia(
+            gravado.seq, gravado.timestamp, None,
+            tuple(MaoDetectada(mao, lado) for mao, lado in zip(gravado.maos, gravado.lateralidades)),
+            gravado.rosto, gravado.rosto_atualizado, gravado.caracteristicas
+        )
+        for atualizar in atualizadores:
+            atualizar(resultado, sessao)
+        if ao_frame is not None:
+            ao_frame(resultado)
+        frames += 1
+    return frames
+
+# --- Inferência em taxa fixa com predição ---
+# Com VISION_INFERENCIA_HZ > 0 (ex.: 12) o MediaPipe da câmera local roda
+# numa thread própria, no máximo nessa taxa, e todo frame da câmera segue
+# pelos pipelines com as mãos previstas por predicao_maos a partir das
+# últimas inferências: vídeo, desenho das mãos, overlay do cliente e
+# pos_direita/pos_esquerda andam na taxa da câmera. O rosto é o da última
+# inferência. VISION_PREDICAO_MODELO escolhe o modelo (manter, linear,
+# amortecido). 0 (padrão) infere todo frame. relatorio_predicao.py mede o
+# erro de cada taxa contra uma gravação em taxa cheia.
+INFERENCIA_HZ = float(os.getenv("VISION_INFERENCIA_HZ", "0"))
+PREDICAO_MODELO = os.getenv("VISION_PREDICAO_MODELO", "amortecido")
+_m_frames_previstos = metricas.contador(
+    "vision_frames_previstos_total", "Frames publicados com as mãos previstas entre inferências")
+
+def _inferir_sessao_local(seq, timestamp, frame, agendadores_rosto):
+    with _contexto_da_sessao(_sessao_local) as contexto, _m_inferencia.medir():
+        return _inferir(seq, timestamp, frame, agendadores_rosto, contexto)
+
+class LandmarksPrevistos:
+    """Mão prevista; os NormalizedLandmark (desenho do MediaPipe) só são montados se alguém desenhar."""
+    __slots__ = ("pontos", "_landmark")
+
+    def __init__(self, pontos):
+        self.pontos = pontos  # array (21, 3)
+        self._landmark = None
+
+    @property
+    def landmark(self):
+        if self._landmark is None:
+            from mediapipe.framework.formats import landmark_pb2
+            self._landmark = [landmark_pb2.NormalizedLandmark(x=x, y=y, z=z) for x, y, z in self.pontos.tolist()]
+        return self._landmark
+
+class InferenciaPrevista:
+    """Inferência da câmera local a `hz` numa thread; cada frame recebe as mãos previstas."""
+
+    def __init__(self, hz, modelo):
+        self.cadencia = predicao_maos.CadenciaFixa(hz)
+        self.preditor = predicao_maos.PreditorMaos(modelo)
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inferencia")
+        self._futuro = None
+        self._rosto = None
+        self._rosto_atualizado = False
+
+    def resultado(self, seq, timestamp, frame, agendadores_rosto):
+        """ResultadoInferencia do frame com as mãos previstas; dispara a inferência quando devida."""
+        self._colher()
+        if self._futuro is None and self.cadencia.devido(timestamp):
+            self.cadencia.marcar(timestamp)
+            self._futuro = self._pool.submit(_inferir_sessao_local, seq, timestamp, frame, agendadores_rosto)
+
+        pontos, lateralidades = self.preditor.prever(timestamp)
+        with _m_caracteristicas.medir():
+            caracteristicas = caracteristicas_mao.extrair_caracteristicas(pontos, lateralidades)
+        maos = tuple(MaoDetectada(LandmarksPrevistos(p), lado) for p, lado in zip(pontos, lateralidades))
+        rosto_atualizado, self._rosto_atualizado = self._rosto_atualizado, False
+        _m_frames_previstos.inc()
+        return ResultadoInferencia(seq, timestamp, frame, maos, self._rosto, rosto_atualizado, caracteristicas)
+
+    def _colher(self):
+        """Passa ao preditor a inferência que terminou (se terminou)."""
+        if self._futuro is None or not self._futuro.done():
+            return
+        futuro, self._futuro = self._futuro, None
+        try:
+            inferido = futuro.result()
+        except pool_instancias.PoolEsgotado:
+            return  # sessões do navegador com todas as instâncias: a próxima tentativa vem na cadência
+        except Exception as erro:
+            print(f"[ERRO] Inferência falhou: {erro}")
+            return
+        self.preditor.observar(inferido.timestamp, inferido.caracteristicas.pontos,
+                               inferido.caracteristicas.lateralidades)
+        self._rosto = inferido.rosto
+        self._rosto_atualizado = inferido.rosto_atualizado
+        _m_frames_inferidos.inc()
+        _taxa_inferencia.aguardar()
+
+_inferencia_prevista = (InferenciaPrevista(INFERENCIA_HZ, PREDICAO_MODELO)
+                        if INFERENCIA_HZ > 0 and predicao_maos is not None and not CLOUD_MODE else None)
+
+def _loop_inferencia():
+    seq = 0
+    while True:
+        ativos = _pipelines_ativos()
+        if not ativos:
+            if _sessao_local.trilhas_abertas:
+                _fechar_trilhas(_sessao_local)  # sem espectadores, os gestos em curso terminam aqui
+            with _inferencia_cond:
+                _inferencia_cond.wait(timeout=1.0)
+            continue
 
-    total_dedos, lista_dedos = contar_dedos(hand_landmarks.landmark, lateralidade, orientacao)
+        item = _aguardar_frame_camera(seq)
+        if item is None:
+            continue
+        seq, timestamp, frame = item
 
-    escala_mao = ((hand_landmarks.landmark[0].y - hand_landmarks.landmark[9].y)**2 +
-                  (hand_landmarks.landmark[0].x - hand_landmarks.landmark[9].x)**2)**0.5
-    x4, y4 = hand_landmarks.landmark[4].x, hand_landmarks.landmark[4].y
-    x8, y8 = hand_landmarks.landmark[8].x, hand_landmarks.landmark[8].y
-    distancia_ok = ((x4 - x8)**2 + (y4 - y8)**2)**0.5
+        agendadores_rosto = [p["agendador_rosto"] for p in ativos if p["agendador_rosto"] is not None]
+        if _inferencia_prevista is not None:
+            resultado = _inferencia_prevista.resultado(seq, timestamp, frame, agendadores_rosto)
+        else:
+            try:
+                resultado = _inferir_sessao_local(seq, timestamp, frame, agendadores_rosto)
+            except pool_instancias.PoolEsgotado:
+                # Todas as instâncias com sessões do navegador ativas: tentar de novo em breve
+                time.sleep(0.5)
+                continue
+            _m_frames_inferidos.inc()
+            _taxa_inferencia.aguardar()
+        _buffer_inferencia.publicar(resultado, timestamp)
+        _gravar_resultado(resultado)
+
+        mensagem_landmarks = None
+        processados = set()
+        for pipeline in ativos:
+            frame_anotado = frame_limpo = None
+            try:
+                with pipeline["m_processar"].medir():
+                    # Sem clientes do frame anotado (nem anel de replay), só o estado é atualizado
+                    transmissor = pipeline["transmissor"]
+                    if transmissor.n_assinantes > 0 or transmissor.anel is not None or pipeline["atualizar"] is None:
+                        frame_anotado = pipeline["processar"](resultado, _sessao_local)
+                    else:
+                        pipeline["atualizar"](resultado, _sessao_local)
+                    if pipeline["transmissor_limpo"].n_assinantes > 0:
+                        frame_limpo = pipeline["limpo"](resultado, _sessao_local)
+            except Exception as erro:
+                print(f"[ERRO] Pipeline falhou: {erro}")
+                pipeline["m_erros"].inc()
+                continue
+            processados.add(pipeline["nome"])
+            if frame_anotado is not None:
+                pipeline["transmissor"].publicar(seq, frame_anotado)
+            if frame_limpo is not None:
+                pipeline["transmissor_limpo"].publicar(seq, frame_limpo)
+            if pipeline["transmissor_landmarks"].n_assinantes > 0:
+                if mensagem_landmarks is None:
+                    mensagem_landmarks = codificar_landmarks(seq, resultado.caracteristicas)
+                pipeline["transmissor_landmarks"].publicar(seq, mensagem_landmarks)
+        _registrar_transicoes(_sessao_local, processados)
+
+def _garantir_inferencia():
+    global _inferencia_thread
+
+    with _pipelines_lock:
+        if _inferencia_thread is None or not _inferencia_thread.is_alive():
+            _inferencia_thread = threading.Thread(target=_loop_inferencia, daemon=True)
+            _inferencia_thread.start()
+
+@contextmanager
+def _assinatura_pipeline(nome, perfil=PERFIL_PADRAO, adaptador=None, chave="transmissor"):
+    """Inscreve um cliente num transmissor do pipeline enquanto o stream estiver aberto."""
+    transmissor = _pipelines[nome][chave]
+    with _pipelines_lock:
+        assinante = transmissor.assinar(perfil, adaptador)
+    _garantir_inferencia()
+    with _inferencia_cond:
+        _inferencia_cond.notify_all()
+    try:
+        yield assinante
+    finally:
+        transmissor.cancelar(assinante)
+
+def _fps_cliente(nome, fps_pedido):
+    """FPS do cliente: o pedido, limitado ao FPS do stream (0 = sem limite)."""
+    fps_stream = config_fps.get(nome, _FPS_PADRAO)
+    if fps_pedido is None:
+        return fps_stream
+    return fps_pedido if fps_stream <= 0 else min(fps_pedido, fps_stream)
+
+def _gerar_mjpeg(nome, placeholder, ao_falhar=None, opcoes=None):
+    """Gerador MJPEG de um pipeline: entrega os bytes já codificados pelo transmissor."""
+    opcoes = opcoes or OpcoesStream()
+    fps = _fps_cliente(nome, opcoes.fps)
+    adaptador = AdaptadorBanda(opcoes.perfil.largura, fps) if opcoes.adaptativo else None
+    marcapasso = MarcapassoFrames(
+        fps,
+        contador_pulados=metricas.contador(
+            "vision_deadlines_perdidos_total", "Deadlines de envio perdidos por atraso", stream=nome)
+    )
+    m_placeholders = metricas.contador(
+        "vision_placeholders_enviados_total", "Avisos enviados por falta de frame novo", stream=nome)
+
+    chave = "transmissor_limpo" if opcoes.limpo else "transmissor"
+    with _assinatura_pipeline(nome, opcoes.perfil, adaptador, chave) as assinante:
+        assinante.marcapasso = marcapasso
+        while True:
+            item = assinante.aguardar(_CAPTURA_TIMEOUT_FRAME)
+
+            if item is None:
+                # Sem frame novo: envia o aviso pré-codificado
+                if ao_falhar is not None:
+                    ao_falhar()
+                m_placeholders.inc()
+                yield _parte_mjpeg(_PLACEHOLDERS[placeholder])
+                continue
 
-    margem_polegar = 0.04
-    polegar_pra_cima = (hand_landmarks.landmark[4].y < hand_landmarks.landmark[3].y - margem_polegar
-                        and hand_landmarks.landmark[4].y < hand_landmarks.landmark[2].y - margem_polegar)
+            _, frame_bytes = item
+            inicio_envio = time.monotonic()
+            yield _parte_mjpeg(frame_bytes)
+            if adaptador is not None:
+                # O gerador só volta depois que o servidor escreveu a parte
+                adaptador.registrar_envio(len(frame_bytes), time.monotonic() - inicio_envio)
+            marcapasso.aguardar()
+
+def _gerar_landmarks(nome):
+    """Stream binário de landmarks de um pipeline (mensagens de codificar_landmarks)."""
+    with _assinatura_pipeline(nome, chave="transmissor_landmarks") as assinante:
+        while True:
+            item = assinante.aguardar(_CAPTURA_TIMEOUT_FRAME)
+            # Sem frame novo: keep-alive (e o cliente apaga o overlay)
+            yield item[1] if item is not None else _KEEPALIVE_LANDMARKS
+
+# --- Classificadores ---
+# A lógica fica em classificadores.py (compartilhada com o processamento
+# offline); aqui ficam os nomes usados pelo app e a escolha das imagens.
+contar_dedos = classificadores.contar_dedos
+_classificar_gesto_musica = classificadores.classificar_gesto_musica
+_classificar_gesto_combinado = classificadores.classificar_gesto_combinado
+
+# Gestos que deixam a imagem de resposta para a expressão facial
+_GESTOS_FRACOS = classificadores.GESTOS_FRACOS
+
+# Imagem usada quando o gesto/expressão não está no mapeamento
+_IMAGENS_PADRAO = {
+    "OK": "ok.jpg",
+    "LIKE": "like.jpg",
+    "Paz e Amor": "paz.jpg",
+    "Rock": "like.jpg",
+    "Apontando": "neutro.jpg",
+    "Mao Aberta": "sol.jpg",
+    "Punho Fechado": "lua.jpg",
+    "Surpresa": "surpresa.jpg",
+    "Olhos Fechados": "olhos_fechados.jpg",
+    "Sorriso": "sorriso.jpg",
+}
 
-    indicador_fechado = hand_landmarks.landmark[8].y > hand_landmarks.landmark[6].y
-    medio_fechado = hand_landmarks.landmark[12].y > hand_landmarks.landmark[10].y
-    anelar_fechado = hand_landmarks.landmark[16].y > hand_landmarks.landmark[14].y
-    minimo_fechado = hand_landmarks.landmark[20].y > hand_landmarks.landmark[18].y
-    outros_dedos_fechados = indicador_fechado and medio_fechado and anelar_fechado and minimo_fechado
+def _imagem_do_gesto(gesto):
+    """Imagem de resposta do gesto ("Dedos: N" e desconhecidos → neutro.jpg)."""
+    if gesto not in _IMAGENS_PADRAO:
+        return "neutro.jpg"
+    return mapeamento_gestos.get(gesto, _IMAGENS_PADRAO[gesto])
 
-    indicador_levantado = lista_dedos[1] == 1
-    medio_levantado = lista_dedos[2] == 1
-    anelar_levantado = lista_dedos[3] == 1 if len(lista_dedos) > 3 else False
-    minimo_levantado = lista_dedos[4] == 1 if len(lista_dedos) > 4 else False
-    polegar_levantado = lista_dedos[0] == 1
+def detectar_expressao(face_landmarks):
+    """Retorna (expressao, imagem) — imagem None para Neutro."""
+    expressao = classificadores.classificar_expressao(face_landmarks)
+    if expressao == "Neutro":
+        return expressao, None
+    return expressao, _imagem_do_gesto(expressao)
+
+def _detectar_movimento(lateralidade, x, y, agora=None, sessao=None):
+    """Movimento do pulso usando o histórico da sessão (padrão: câmera local)."""
+    if agora is None:
+        agora = time.time()
+    sessao = sessao or _sessao_local
+    return classificadores.detectar_movimento(sessao.historico_pos, lateralidade, x, y, agora)
+
+def _desenhar_maos(frame, maos_detectadas, stream):
+    """Desenha os landmarks das mãos no frame (tempo medido por stream)."""
+    with _pipelines[stream]["m_desenho"].medir():
+        for mao in maos_detectadas:
+            mp_desenho.draw_landmarks(frame, mao.landmarks, mp_maos.HAND_CONNECTIONS)
+
+def _expressao_relevante_principal(maos_detectadas, sessao):
+    """A expressão só decide a imagem quando não há gesto de mão forte.
+
+    Usa o gesto do frame anterior: a decisão acontece antes da classificação.
+    """
+    return not maos_detectadas or sessao.estado_atual["gesto_principal"] in _GESTOS_FRACOS
+
+_COOLDOWN_PRINT = 3.0  # 3 segundos de intervalo entre prints
+
+# O print é gravado pelo escritor de capturas (thread própria, fila
+# limitada), não pelo loop de frames. Na câmera local o gesto também salva
+# um clipe com os últimos VISION_REPLAY_SEGUNDOS (padrão 5; 0 desliga),
+# tirados de um anel alimentado só pelo stream principal anotado, sempre no
+# perfil padrão e mesmo sem clientes no vídeo (os bytes são reaproveitados
+# quando algum cliente usa o perfil padrão).
+PASTA_CAPTURAS = "screenshots"
+REPLAY_SEGUNDOS = float(os.getenv("VISION_REPLAY_SEGUNDOS", "5"))
+_escritor_capturas = capturas.EscritorCapturas(PASTA_CAPTURAS, codificar=lambda frame: _codificar_jpeg(frame, PERFIL_PADRAO))
+_anel_replay = capturas.AnelJPEG(REPLAY_SEGUNDOS) if REPLAY_SEGUNDOS > 0 and not CLOUD_MODE else None
+metricas.medidor("vision_capturas_gravadas", "Fotos e clipes do gesto de print gravados",
+                 funcao=lambda: _escritor_capturas.gravadas)
+metricas.medidor("vision_capturas_descartadas", "Capturas descartadas com a fila do escritor cheia",
+                 funcao=lambda: _escritor_capturas.descartadas)
+
+def _atualizar_principal(resultado, sessao, frame_print=None):
+    """Gestos + expressão → estado da sessão. Retorna os gestos [(lateralidade, orientacao, gesto, prio)].
+
+    O gesto de print salva frame_print (o frame anotado) ou, sem ele, o
+    frame do resultado. Na reprodução de landmarks gravados não há frame e
+    nada é salvo.
+    """
+    expressao_detectada = "Neutro"
 
-    # Dados extras (orientação, ângulo do pulso etc.)
-    dados = {"orientacao": orientacao, "dedos": total_dedos, "lista_dedos": lista_dedos}
+    # --- Lógica de Mãos ---
+    gestos, gesto_detectado, gesto_principal = classificadores.analisar_maos_principal(resultado.caracteristicas)
+    imagem_nome = _imagem_do_gesto(gesto_principal) if gestos else "neutro.jpg"
 
-    # --- Gestos de alta prioridade (comandos) ---
-    if distancia_ok < (0.18 * escala_mao) and (lista_dedos[2] == 1 or lista_dedos[3] == 1):
-        return "OK", 7, dados
+    # --- Lógica de Rosto (Prioridade sobre Mãos se detectar expressão forte) ---
+    if resultado.rosto is not None:
+        exp, img_exp = detectar_expressao(resultado.rosto)
+        expressao_detectada = exp
 
-    if polegar_pra_cima and outros_dedos_fechados:
-        return "LIKE", 6, dados
+        # Prioriza expressão facial quando não há gesto de mão forte
+        if img_exp and gesto_principal in _GESTOS_FRACOS:
+            imagem_nome = img_exp
 
-    # --- Gesto "Hang Loose" / "Telefone" (polegar + mindinho, outros fechados) ---
-    if polegar_levantado and minimo_levantado and indicador_fechado and medio_fechado and anelar_fechado:
-        return "Hang Loose", 5, dados
+    # Atualizar estado da sessão
+    estado = sessao.estado_atual
+    with estado_lock:
+        estado["gesto"] = gesto_detectado
+        estado["gesto_principal"] = gesto_principal
+        estado["expressao"] = expressao_detectada
+        estado["imagem"] = imagem_nome
+        sessao.canais["principal"].publicar(estado)
+
+    if frame_print is None:
+        frame_print = resultado.frame
+    if frame_print is not None:
+        _salvar_print_se_pedido(sessao, gestos, resultado.timestamp, frame_print)
+
+    return gestos
+
+def _processar_principal(resultado, sessao):
+    """Pipeline da página principal: atualiza o estado da sessão e retorna o frame anotado."""
+    # Frame compartilhado entre pipelines: desenhar numa cópia
+    frame = resultado.frame.copy()
+
+    _desenhar_maos(frame, resultado.maos, "principal")
+    _atualizar_principal(resultado, sessao, frame)
+
+    return frame
+
+def _salvar_print_se_pedido(sessao, gestos, agora, frame):
+    for lateralidade, orientacao, gesto, _ in gestos:
+        # Funcionalidade: Print ao fazer OK com as Costas da Mão Direita
+        if gesto == "OK" and lateralidade == "Right" and orientacao == "Costas":
+            if agora - sessao.ultimo_print > _COOLDOWN_PRINT:
+                sessao.ultimo_print = agora
+                timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+                filename = _escritor_capturas.foto(f"print_{timestamp}.jpg", frame)
+                if filename is None:
+                    print("\u26a0\ufe0f Screenshot descartado: escritor de capturas ocupado")
+                    return
+                print(f"\U0001f4f8 Screenshot salvo: {filename}")
+                if _anel_replay is not None and sessao is _sessao_local and len(_anel_replay):
+                    clipe = _escritor_capturas.clipe(f"print_{timestamp}.mjpeg",
+                                                     [frame_bytes for _, _, frame_bytes in _anel_replay.recentes()])
+                    if clipe is not None:
+                        print(f"\U0001f3ac Replay salvo: {clipe}")
+
+def _marcar_erro_camera():
+    with estado_lock:
+        estado_atual["gesto"] = "Erro na Camera"
+        estado_atual["imagem"] = "neutro.jpg"
+        _sessao_local.canais["principal"].publicar(estado_atual)
 
-    # --- Rock: indicador + mindinho ---
-    if indicador_levantado and minimo_levantado and not medio_levantado and not anelar_levantado:
-        return "Rock", 5, dados
+def gerar_frames(opcoes=None):
+    return _gerar_mjpeg("principal", "camera", ao_falhar=_marcar_erro_camera, opcoes=opcoes)
 
-    # --- Paz e Amor: indicador + médio ---
-    if total_dedos == 2 and indicador_levantado and medio_levantado and not anelar_levantado and not minimo_levantado:
-        return "Paz e Amor", 4, dados
+_registrar_pipeline("principal", _processar_principal,
+                    agendador_rosto=_criar_agendador_rosto("principal", _expressao_relevante_principal),
+                    atualizar=_atualizar_principal)
+if _anel_replay is not None:
+    _pipelines["principal"]["transmissor"].anel = _anel_replay
 
-    # --- Três dedos: indicador + médio + anelar ---
-    if indicador_levantado and medio_levantado and anelar_levantado and not minimo_levantado and not polegar_levantado:
-        return "Tres Dedos", 4, dados
+@app.route('/')
+def index():
+    return render_template('index.html', **_opcoes_overlay_pagina())
 
-    # --- Quatro dedos: indicador + médio + anelar + mindinho (sem polegar) ---
-    if indicador_levantado and medio_levantado and anelar_levantado and minimo_levantado and not polegar_levantado:
-        return "Quatro Dedos", 3, dados
+@app.route('/video_feed')
+def video_feed():
+    """MJPEG; ?w=&q=&fps= escolhem largura, qualidade JPEG e FPS máximo (q=auto adapta à banda)."""
+    if CLOUD_MODE or not CV_AVAILABLE:
+        return redirect(url_for('static', filename='images/neutro.jpg'))
+    try:
+        opcoes = _opcoes_stream(request.args)
+    except ValueError as erro:
+        return jsonify({"ok": False, "mensagem": str(erro)}), 400
+    return Response(gerar_frames(opcoes), mimetype='multipart/x-mixed-replace; boundary=frame')
 
-    # --- Números explícitos (1-5) baseados em contagem de dedos ---
-    if total_dedos == 1 and indicador_levantado:
-        return "Num1", 3, dados
+# --- Lógica de Pintura Virtual ---
+# Canvas, máscara e pincel ficam na sessão (SessaoVisao)
+
+# Cores disponíveis (BGR)
+_CORES_PINTURA = [
+    ((255, 0, 0), "Azul"),    # Azul
+    ((0, 255, 0), "Verde"),   # Verde
+    ((0, 0, 255), "Vermelho"),# Vermelho
+    ((0, 0, 0), "Borracha")   # Preto (Apagar)
+]
+
+# Áreas dos botões de cor (x, y, w, h)
+_BOTOES_PINTURA = [(40 + i * 120, 20, 100, 60) for i in range(len(_CORES_PINTURA))]
+
+def _botoes_pintura_js():
+    """Botões de cor para o HUD no navegador (coordenadas do frame 640x480, cor em RGB)."""
+    return [
+        {"x": x, "y": y, "w": w, "h": h, "nome": nome,
+         "cor": "#{:02x}{:02x}{:02x}".format(*(reversed(cor if cor != (0, 0, 0) else (80, 80, 80))))}
+        for (cor, nome), (x, y, w, h) in zip(_CORES_PINTURA, _BOTOES_PINTURA)
+    ]
 
-    if total_dedos == 2 and indicador_levantado and medio_levantado:
-        return "Paz e Amor", 4, dados  # já coberto acima
+def _pintar(resultado, sessao):
+    """Atualiza traços e pincel da sessão com o indicador (chamar com pintura_lock).
 
-    if total_dedos == 3:
-        return "Num3", 3, dados
+    Retorna (cursor, limpou): cursor = (x, y, cor) quando o indicador está
+    levantado, com a cor de antes de uma troca neste frame. A cor do pincel
+    é publicada no canal "pintura" da sessão para o HUD no navegador.
+    """
+    desenho = sessao.desenho
+    cor_pincel = sessao.cor_pincel
+
+    cores = _CORES_PINTURA
+    botoes = _BOTOES_PINTURA
+    cursor = None
+    limpou = False
+
+    # A pintura usa só uma mão (a primeira detectada); sem mão, o traço em curso continua
+    carac = resultado.caracteristicas
+    for i in range(min(len(carac), 1)):
+        ponta_x, ponta_y = carac.ponta_indicador(i)
+        x8 = int(ponta_x * 640)
+        y8 = int(ponta_y * 480)
+        
+        indicador_levantado = carac.dedos[i, 1] == 1
+        # Indicador, médio, anelar e mínimo levantados (sem o polegar)
+        dedos_up = int(carac.dedos[i, 1:].sum())
+        
+        if dedos_up >= 4: # Mão aberta -> Limpar (pode ser desfeito)
+            desenho.limpar()
+            limpou = True
+        
+        elif indicador_levantado:
+            cursor = (x8, y8, cor_pincel)
+            
+            if y8 < 100:
+                for i, (bx, by, bw, bh) in enumerate(botoes):
+                    if bx < x8 < bx+bw and by < y8 < by+bh:
+                        cor_pincel = cores[i][0]
+                        desenho.terminar_traco()
+            elif cor_pincel == (0, 0, 0):
+                # Borracha: traço mais grosso que zera cor e alfa
+                desenho.adicionar_ponto(ponta_x, ponta_y, cor_pincel, 12, borracha=True)
+            else:
+                desenho.adicionar_ponto(ponta_x, ponta_y, cor_pincel, 5)
+        else:
+            desenho.terminar_traco()
 
-    if total_dedos == 4:
-        return "Num4", 3, dados
+    sessao.cor_pincel = cor_pincel
+    sessao.estado_pintura["cor"] = next(nome for cor, nome in cores if cor == cor_pincel)
+    _publicar_pintura(sessao)
+    return cursor, limpou
 
-    if total_dedos == 5:
-        return "Num5", 3, dados
+def _publicar_pintura(sessao):
+    desenho = sessao.desenho
+    sessao.estado_pintura["tracos"] = len(desenho.tracos)
+    sessao.estado_pintura["pode_desfazer"] = desenho.pode_desfazer
+    sessao.estado_pintura["pode_refazer"] = desenho.pode_refazer
+    sessao.canais["pintura"].publicar(sessao.estado_pintura)
 
-    # --- Mão aberta = 5 (coberto por Num5) ---
+def _mesclar_canvas(frame, sessao):
+    """Copia a tinta do canvas da sessão para o frame, no próprio frame (chamar com pintura_lock).
 
-    # --- Punho Fechado ---
-    if outros_dedos_fechados and not polegar_pra_cima:
-        return "Punho Fechado", 1, dados
+    Só o retângulo pintado é tocado: o custo acompanha a área desenhada.
+    """
+    desenho = sessao.desenho
+    if desenho.retangulo is None:
+        return frame
+    x0, y0, x1, y1 = desenho.retangulo
+    camada = desenho.canvas[y0:y1, x0:x1]
+    # Cor e alfa separados pelo OpenCV (fatiar canais no numpy gera vistas lentas)
+    cv2.copyTo(cv2.cvtColor(camada, cv2.COLOR_BGRA2BGR), cv2.extractChannel(camada, 3), frame[y0:y1, x0:x1])
+    return frame
+
+# Barra de botões pré-renderizada, uma por cor selecionada:
+# (x0, y0, pixels BGR, máscara) copiada para o frame com cv2.copyTo
+_SPRITES_BOTOES = {}
+
+def _sprite_botoes(cor_selecionada):
+    sprite = _SPRITES_BOTOES.get(cor_selecionada)
+    if sprite is not None:
+        return sprite
+    x0 = min(x for x, _, _, _ in _BOTOES_PINTURA) - 2
+    y0 = min(y for _, y, _, _ in _BOTOES_PINTURA) - 2
+    x1 = max(x + w for x, _, w, _ in _BOTOES_PINTURA) + 3
+    y1 = max(y + h for _, y, _, h in _BOTOES_PINTURA) + 3
+    pixels = np.zeros((y1 - y0, x1 - x0, 3), dtype=np.uint8)
+    mascara = np.zeros((y1 - y0, x1 - x0), dtype=np.uint8)
+    for (cor, nome), (x, y, w, h) in zip(_CORES_PINTURA, _BOTOES_PINTURA):
+        x, y = x - x0, y - y0
+        cor_botao = cor if cor != (0, 0, 0) else (80, 80, 80)
+        cv2.rectangle(pixels, (x, y), (x+w, y+h), cor_botao, -1)
+        cv2.rectangle(mascara, (x, y), (x+w, y+h), 255, -1)
+        cv2.putText(pixels, nome, (x+10, y+40), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        # Borda branca no botão selecionado
+        if cor == cor_selecionada:
+            cv2.rectangle(pixels, (x, y), (x+w, y+h), (255, 255, 255), 3)
+            cv2.rectangle(mascara, (x, y), (x+w, y+h), 255, 3)
+    sprite = _SPRITES_BOTOES[cor_selecionada] = (x0, y0, pixels, mascara)
+    return sprite
+
+def _frame_pintura(frame):
+    """Cópia 640x480 do frame compartilhado (o canvas tem esse tamanho)."""
+    if frame.shape[:2] == (480, 640):
+        return frame.copy()
+    return cv2.resize(frame, (640, 480))
+
+def _atualizar_pintura(resultado, sessao):
+    with pintura_lock:
+        return _pintar(resultado, sessao)
+
+def _frame_pintura_sem_overlay(resultado, sessao):
+    """Frame + desenho, sem botões nem cursor (overlay=cliente)."""
+    frame = _frame_pintura(resultado.frame)
+    with pintura_lock:
+        return _mesclar_canvas(frame, sessao)
+
+def _processar_pintura(resultado, sessao):
+    """Pipeline da Pintura Virtual: desenha no canvas com o indicador. Retorna o frame composto."""
+    # Cópia 640x480: o frame compartilhado não é alterado
+    frame = _frame_pintura(resultado.frame)
+
+    with pintura_lock:
+        # Interface (botões) com a cor de antes do traço deste frame
+        x0, y0, pixels, mascara = _sprite_botoes(sessao.cor_pincel)
+        cv2.copyTo(pixels, mascara, frame[y0:y0 + pixels.shape[0], x0:x0 + pixels.shape[1]])
+
+        cursor, limpou = _pintar(resultado, sessao)
+        if limpou:
+            cv2.putText(frame, "TELA LIMPA", (250, 240), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+        if cursor is not None:
+            x8, y8, cor = cursor
+            cor_cursor = cor if cor != (0, 0, 0) else (80, 80, 80)
+            cv2.circle(frame, (x8, y8), 10, cor_cursor, -1)
+
+        frame = _mesclar_canvas(frame, sessao)
+
+    return frame
+
+def gerar_frames_pintura(opcoes=None):
+    return _gerar_mjpeg("pintura", "erro", opcoes=opcoes)
+
+_registrar_pipeline("pintura", _processar_pintura, atualizar=_atualizar_pintura,
+                    limpo=_frame_pintura_sem_overlay)
 
-    return "Nenhum", 0, dados
+@app.route('/pintura')
+def pintura():
+    return render_template('pintura.html', botoes_pintura=_botoes_pintura_js(), **_opcoes_overlay_pagina())
 
+_ACOES_PINTURA = {
+    "desfazer": lambda desenho: desenho.desfazer(),
+    "refazer": lambda desenho: desenho.refazer(),
+    "limpar": lambda desenho: desenho.limpar(),
+}
 
-def _detectar_movimento(lateralidade, x, y):
-    """Detecta direção e velocidade do movimento baseado no histórico de posições."""
-    global _historico_pos
-    agora = time.time()
-    hist = _historico_pos.get(lateralidade, [])
-    hist.append((x, y, agora))
-
-    # Manter apenas os últimos N pontos
-    if len(hist) > _HIST_MAX:
-        hist = hist[-_HIST_MAX:]
-    _historico_pos[lateralidade] = hist
-
-    if len(hist) < 3:
-        return "Parado", 0.0
-
-    # Calcular deslocamento e velocidade entre o ponto mais antigo e o mais recente
-    x0, y0, t0 = hist[0]
-    x1, y1, t1 = hist[-1]
-    dt = t1 - t0
-    if dt < 0.05:
-        return "Parado", 0.0
-
-    dx = x1 - x0
-    dy = y1 - y0
-    dist = (dx**2 + dy**2)**0.5
-    velocidade = dist / dt
-
-    # Limiar mínimo de movimento (normalizado 0-1)
-    if dist < 0.06:
-        return "Parado", round(velocidade, 3)
-
-    # Determinar direção dominante
-    if abs(dx) > abs(dy):
-        direcao = "Direita" if dx > 0 else "Esquerda"
+@app.route('/pintura/<acao>', methods=['POST'])
+def pintura_acao(acao):
+    """Desfazer, refazer ou limpar os traços da sessão (?sessao=<id>; padrão: câmera local)."""
+    if acao not in _ACOES_PINTURA:
+        return jsonify({"ok": False, "mensagem": f"Ação desconhecida: {acao}"}), 404
+    sessao = _sessao_da_requisicao()
+    if sessao is None:
+        return jsonify({"ok": False, "mensagem": "Sessão desconhecida."}), 404
+    with pintura_lock:
+        feito = _ACOES_PINTURA[acao](sessao.desenho)
+        _publicar_pintura(sessao)
+        estado = dict(sessao.estado_pintura)
+    return jsonify({"ok": True, "feito": feito, **estado})
+
+PINTURA_EXPORTAR_MAX = 4096  # largura máxima exportada (pixels)
+
+@app.route('/pintura/exportar')
+def pintura_exportar():
+    """Desenho da sessão em PNG (fundo transparente) ou SVG: ?formato=png|svg&largura=1920."""
+    formato = request.args.get("formato", "png")
+    if formato not in ("png", "svg"):
+        return jsonify({"ok": False, "mensagem": "Formato inválido (use png ou svg)."}), 400
+    try:
+        largura = int(request.args.get("largura", 640))
+    except ValueError:
+        return jsonify({"ok": False, "mensagem": "Largura inválida."}), 400
+    if not 16 <= largura <= PINTURA_EXPORTAR_MAX:
+        return jsonify({"ok": False, "mensagem": f"Largura deve estar entre 16 e {PINTURA_EXPORTAR_MAX}."}), 400
+    sessao = _sessao_da_requisicao()
+    if sessao is None:
+        return jsonify({"ok": False, "mensagem": "Sessão desconhecida."}), 404
+    if formato == "png" and not _carregar_cv():
+        return jsonify({"ok": False, "mensagem": "OpenCV indisponível no servidor."}), 503
+    # Só a cópia dos traços fica sob o lock: a rasterização não trava a pintura ao vivo
+    with pintura_lock:
+        desenho = sessao.desenho.copia_tracos()
+    if formato == "svg":
+        dados, tipo = desenho.exportar_svg(largura).encode(), "image/svg+xml"
     else:
-        direcao = "Baixo" if dy > 0 else "Cima"
-
-    # Movimento circular (variância alta em ambos eixos)
-    if dist > 0.1 and abs(dx) > 0.04 and abs(dy) > 0.04:
-        # Verificar se é circular: pontos intermediários devem variar em ambos eixos
-        xs = [p[0] for p in hist]
-        ys = [p[1] for p in hist]
-        var_x = max(xs) - min(xs)
-        var_y = max(ys) - min(ys)
-        if var_x > 0.08 and var_y > 0.08 and abs(var_x - var_y) < 0.15:
-            direcao = "Circular"
-
-    # Movimento rápido (swing/shake)
-    if velocidade > 1.5:
-        direcao = "Rapido " + direcao
-
-    return direcao, round(velocidade, 3)
-
-
-def _classificar_gesto_combinado(gesto_dir, gesto_esq, mov_dir, mov_esq, vel_dir, vel_esq, dedos_dir, dedos_esq):
-    """Detecta gestos combinados de duas mãos."""
-    # Ambas mãos com Punho Fechado = "Double Kick"
-    if gesto_dir == "Punho Fechado" and gesto_esq == "Punho Fechado":
-        return "Double Kick"
-
-    # Ambas mãos abertas (5+5) = "Palmas" (clap)
-    if gesto_dir == "Num5" and gesto_esq == "Num5":
-        return "Palmas"
-
-    # Rock em ambas = "Double Rock"
-    if gesto_dir == "Rock" and gesto_esq == "Rock":
-        return "Double Rock"
-
-    # Ambas mãos com Paz e Amor = "Double Peace"
-    if gesto_dir == "Paz e Amor" and gesto_esq == "Paz e Amor":
-        return "Double Peace"
-
-    # Uma mão Punho + outra Mão Aberta = "Punch Clap"
-    if (gesto_dir == "Punho Fechado" and gesto_esq == "Num5") or \
-       (gesto_dir == "Num5" and gesto_esq == "Punho Fechado"):
-        return "Punch Clap"
-
-    # Ambos apontando = "DJ Mode"
-    if gesto_dir == "Num1" and gesto_esq == "Num1":
-        return "DJ Mode"
-
-    # Ambas mãos se movendo rápido = "Shake"
-    if vel_dir > 1.2 and vel_esq > 1.2:
-        return "Shake"
-
-    # Mãos se movendo em direções opostas horizontalmente = "Scratch"
-    if ("Esquerda" in mov_dir and "Direita" in mov_esq) or \
-       ("Direita" in mov_dir and "Esquerda" in mov_esq):
-        if vel_dir > 0.5 and vel_esq > 0.5:
-            return "Scratch"
-
-    # Ambas para cima = "Rise"
-    if "Cima" in mov_dir and "Cima" in mov_esq and vel_dir > 0.4 and vel_esq > 0.4:
-        return "Rise"
-
-    # Ambas para baixo = "Drop"
-    if "Baixo" in mov_dir and "Baixo" in mov_esq and vel_dir > 0.4 and vel_esq > 0.4:
-        return "Drop"
-
-    # Circular em qualquer mão = "Spin"
-    if "Circular" in mov_dir or "Circular" in mov_esq:
-        return "Spin"
-
-    # Hang Loose em ambas = "Aloha"
-    if gesto_dir == "Hang Loose" and gesto_esq == "Hang Loose":
-        return "Aloha"
-
-    # Soma de dedos como controle
-    total = dedos_dir + dedos_esq
-    if total >= 8 and gesto_dir not in ("OK", "LIKE", "Rock", "Hang Loose") and \
-       gesto_esq not in ("OK", "LIKE", "Rock", "Hang Loose"):
-        return f"Total {total}"
-
-    return "Nenhum"
-
-def gerar_frames_musica():
-    """Gera frames MJPEG para a página de música com detecção de gestos e posição."""
-    global cap, estado_musica
+        dados, tipo = desenho.exportar_png(largura), "image/png"
+    return Response(dados, mimetype=tipo,
+                    headers={"Content-Disposition": f"attachment; filename=pintura.{formato}"})
 
-    mp_m = maos_musica if maos_musica is not None else maos
-    mp_r = rosto_musica if rosto_musica is not None else rosto
+# --- Lógica de Música Virtual ---
 
-    while True:
-        with camera_lock:
-            cam_ok = cap is not None and cap.isOpened()
-
-        if not cam_ok:
-            if not abrir_camera(config_dispositivos["camera_index"], fallback=True):
-                frame = np.zeros((480, 640, 3), dtype=np.uint8)
-                cv2.putText(frame, "CAMERA NAO ENCONTRADA", (50, 240),
-                            cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-                ret, buffer = cv2.imencode('.jpg', frame)
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
-                time.sleep(1)
-                continue
-            time.sleep(0.5)
-            continue
+def _atualizar_musica(resultado, sessao):
+    """Gestos, posição e movimento → estado de música da sessão. Retorna o novo estado.
 
-        with camera_lock:
-            if cap is not None:
-                sucesso, frame = cap.read()
-            else:
-                sucesso, frame = False, None
+    O relógio do movimento é o timestamp do resultado (captura ou gravação).
+    """
+    expressao = "Neutro"
+    if resultado.rosto is not None:
+        expressao, _ = detectar_expressao(resultado.rosto)
 
-        if not sucesso:
-            frame = np.zeros((480, 640, 3), dtype=np.uint8)
-            cv2.putText(frame, "ERRO NA CAMERA", (150, 240),
-                        cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-            with camera_lock:
-                if cap is not None:
-                    cap.release()
-                    cap = None
-            ret, buffer = cv2.imencode('.jpg', frame)
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
-            time.sleep(1)
-            continue
+    novo_estado = classificadores.analisar_musica(
+        resultado.caracteristicas, expressao, sessao.historico_pos, resultado.timestamp
+    )
 
-        frame = cv2.flip(frame, 1)
-        frame_small = cv2.resize(frame, (320, 240))
-        frame_rgb = cv2.cvtColor(frame_small, cv2.COLOR_BGR2RGB)
-
-        resultados_maos = mp_m.process(frame_rgb)
-        resultados_rosto = mp_r.process(frame_rgb) if mp_r is not None else None
-
-        gesto_dir = "Nenhum"
-        gesto_esq = "Nenhum"
-        pos_dir = {"x": 0.5, "y": 0.5}
-        pos_esq = {"x": 0.5, "y": 0.5}
-        dedos_dir = 0
-        dedos_esq = 0
-        expressao = "Neutro"
-        mov_dir = "Parado"
-        mov_esq = "Parado"
-        vel_dir = 0.0
-        vel_esq = 0.0
-
-        if resultados_maos.multi_hand_landmarks:
-            for idx, hand_landmarks in enumerate(resultados_maos.multi_hand_landmarks):
-                # Desenhar landmarks
-                mp_desenho.draw_landmarks(frame, hand_landmarks, mp_maos.HAND_CONNECTIONS)
-
-                lateralidade = "Right"
-                if resultados_maos.multi_handedness and idx < len(resultados_maos.multi_handedness):
-                    lateralidade = resultados_maos.multi_handedness[idx].classification[0].label
-
-                gesto, _, dados = _classificar_gesto_musica(hand_landmarks, lateralidade)
-                total = dados.get("dedos", 0)
-
-                wrist = hand_landmarks.landmark[0]
-                pos = {"x": round(wrist.x, 3), "y": round(wrist.y, 3)}
-
-                # Detectar movimento
-                mov, vel = _detectar_movimento(lateralidade, wrist.x, wrist.y)
-
-                if lateralidade == "Right":
-                    gesto_dir = gesto
-                    pos_dir = pos
-                    dedos_dir = total
-                    mov_dir = mov
-                    vel_dir = vel
-                else:
-                    gesto_esq = gesto
-                    pos_esq = pos
-                    dedos_esq = total
-                    mov_esq = mov
-                    vel_esq = vel
-
-        # Classificar gesto combinado de duas mãos
-        gesto_combinado = _classificar_gesto_combinado(
-            gesto_dir, gesto_esq, mov_dir, mov_esq, vel_dir, vel_esq, dedos_dir, dedos_esq
-        )
+    with musica_lock:
+        sessao.estado_musica.update(novo_estado)
+        sessao.canais["musica"].publicar(sessao.estado_musica)
+
+    return novo_estado
+
+def _processar_musica(resultado, sessao):
+    """Pipeline da página de música: atualiza o estado da sessão e retorna o frame anotado."""
+    # Frame compartilhado entre pipelines: desenhar numa cópia
+    frame = resultado.frame.copy()
+
+    novo_estado = _atualizar_musica(resultado, sessao)
+    expressao = novo_estado["expressao"]
+
+    # Desenhar landmarks
+    _desenhar_maos(frame, resultado.maos, "musica")
+
+    gesto_dir = novo_estado["gesto_direita"]
+    gesto_esq = novo_estado["gesto_esquerda"]
+    mov_dir = novo_estado["movimento_direita"]
+    mov_esq = novo_estado["movimento_esquerda"]
+    gesto_combinado = novo_estado["gesto_combinado"]
+
+    # Overlay de info no frame
+    h, w = frame.shape[:2]
+    overlay = frame.copy()
+    cv2.rectangle(overlay, (0, 0), (w, 52), (0, 0, 0), -1)
+    frame = cv2.addWeighted(overlay, 0.6, frame, 0.4, 0)
+    info1 = f"D: {gesto_dir} | E: {gesto_esq} | {expressao}"
+    info2 = f"Mov D: {mov_dir} | Mov E: {mov_esq}"
+    if gesto_combinado != "Nenhum":
+        info2 += f" | Combo: {gesto_combinado}"
+    cv2.putText(frame, info1, (10, 18), cv2.FONT_HERSHEY_SIMPLEX, 0.48, (0, 255, 200), 1)
+    cv2.putText(frame, info2, (10, 42), cv2.FONT_HERSHEY_SIMPLEX, 0.42, (255, 200, 0), 1)
+
+    return frame
+
+def gerar_frames_musica(opcoes=None):
+    """Gera frames MJPEG para a página de música com detecção de gestos e posição."""
+    return _gerar_mjpeg("musica", "camera_simples", opcoes=opcoes)
 
-        if resultados_rosto and resultados_rosto.multi_face_landmarks:
-            for face_landmarks in resultados_rosto.multi_face_landmarks:
-                exp, _ = detectar_expressao(face_landmarks)
-                expressao = exp
-
-        # Overlay de info no frame
-        h, w = frame.shape[:2]
-        overlay = frame.copy()
-        cv2.rectangle(overlay, (0, 0), (w, 52), (0, 0, 0), -1)
-        frame = cv2.addWeighted(overlay, 0.6, frame, 0.4, 0)
-        info1 = f"D: {gesto_dir} | E: {gesto_esq} | {expressao}"
-        info2 = f"Mov D: {mov_dir} | Mov E: {mov_esq}"
-        if gesto_combinado != "Nenhum":
-            info2 += f" | Combo: {gesto_combinado}"
-        cv2.putText(frame, info1, (10, 18), cv2.FONT_HERSHEY_SIMPLEX, 0.48, (0, 255, 200), 1)
-        cv2.putText(frame, info2, (10, 42), cv2.FONT_HERSHEY_SIMPLEX, 0.42, (255, 200, 0), 1)
-
-        with musica_lock:
-            estado_musica["gesto_direita"] = gesto_dir
-            estado_musica["gesto_esquerda"] = gesto_esq
-            estado_musica["pos_direita"] = pos_dir
-            estado_musica["pos_esquerda"] = pos_esq
-            estado_musica["expressao"] = expressao
-            estado_musica["dedos_direita"] = dedos_dir
-            estado_musica["dedos_esquerda"] = dedos_esq
-            estado_musica["gesto_combinado"] = gesto_combinado
-            estado_musica["movimento_direita"] = mov_dir
-            estado_musica["movimento_esquerda"] = mov_esq
-            estado_musica["velocidade_direita"] = vel_dir
-            estado_musica["velocidade_esquerda"] = vel_esq
-
-        ret, buffer = cv2.imencode('.jpg', frame)
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
-        time.sleep(0.033)
+_registrar_pipeline("musica", _processar_musica, agendador_rosto=_criar_agendador_rosto("musica"),
+                    atualizar=_atualizar_musica)
 
 @app.route('/musica')
 def musica():
-    return render_template('musica.html')
+    return render_template('musica.html', **_opcoes_overlay_pagina())
 
 @app.route('/video_feed_musica')
 def video_feed_musica():
+    """MJPEG; ?w=&q=&fps= escolhem largura, qualidade JPEG e FPS máximo (q=auto adapta à banda)."""
     if CLOUD_MODE or not CV_AVAILABLE:
         return redirect(url_for('static', filename='images/neutro.jpg'))
-    return Response(gerar_frames_musica(), mimetype='multipart/x-mixed-replace; boundary=frame')
+    try:
+        opcoes = _opcoes_stream(request.args)
+    except ValueError as erro:
+        return jsonify({"ok": False, "mensagem": str(erro)}), 400
+    return Response(gerar_frames_musica(opcoes), mimetype='multipart/x-mixed-replace; boundary=frame')
 
 @app.route('/musica_status')
 def musica_status():
-    with musica_lock:
-        data = dict(estado_musica)
-    return jsonify(data)
+    return _resposta_status_sessao("musica")
 
 @app.route('/video_feed_pintura')
 def video_feed_pintura():
+    """MJPEG; ?w=&q=&fps= escolhem largura, qualidade JPEG e FPS máximo (q=auto adapta à banda)."""
     if CLOUD_MODE or not CV_AVAILABLE:
         return redirect(url_for('static', filename='images/neutro.jpg'))
-    return Response(gerar_frames_pintura(), mimetype='multipart/x-mixed-replace; boundary=frame')
+    try:
+        opcoes = _opcoes_stream(request.args)
+    except ValueError as erro:
+        return jsonify({"ok": False, "mensagem": str(erro)}), 400
+    return Response(gerar_frames_pintura(opcoes), mimetype='multipart/x-mixed-replace; boundary=frame')
 
 @app.route('/current_status')
 def current_status():
-    with estado_lock:
-        data = dict(estado_atual)
-    return jsonify(data)
+    return _resposta_status_sessao("principal")
+
+# Long-poll (?since=<versão>&wait=1): espera máxima por uma mudança, abaixo do
+# timeout de proxies e das funções serverless
+STATUS_ESPERA_MAX = float(os.getenv("VISION_STATUS_ESPERA", "8" if CLOUD_MODE else "25"))
+# Sessão que ainda não enviou frames: espera curta, para o cliente voltar logo
+# e pegar a sessão assim que o primeiro /inferir a criar
+STATUS_ESPERA_SESSAO_NOVA = 1.0
+_ID_PARTIDA = uuid.uuid4().hex[:8]  # ETags de outra execução do app nunca coincidem
+
+def _resposta_status_sessao(nome):
+    sessao = _sessao_da_requisicao()
+    if sessao is None:
+        return _resposta_status(_sessao_sem_frames.canais[nome], STATUS_ESPERA_SESSAO_NOVA)
+    return _resposta_status(sessao.canais[nome])
+
+def _resposta_status(canal, espera=None):
+    """Instantâneo do canal com ETag (304 se não mudou); ?since=&wait=1 espera uma mudança."""
+    versao, corpo = canal.instantaneo()
+    desde = request.args.get("since")
+    if desde is not None and request.args.get("wait") == "1":
+        try:
+            desde = int(desde)
+        except ValueError:
+            return jsonify({"ok": False, "mensagem": "since deve ser um inteiro."}), 400
+        if desde == versao:
+            versao, corpo = canal.aguardar(desde, STATUS_ESPERA_MAX if espera is None else espera)
+
+    etag = f"{_ID_PARTIDA}-{versao}"
+    if request.if_none_match.contains(etag):
+        resposta = Response(status=304)
+    else:
+        resposta = Response(corpo, mimetype="application/json")
+    resposta.set_etag(etag)
+    resposta.headers["X-Versao-Estado"] = str(versao)
+    resposta.headers["Cache-Control"] = "no-cache"
+    return resposta
+
+def _evento_sse(seq, tipo, dados):
+    corpo = json.dumps(dados, ensure_ascii=False, separators=(",", ":"))
+    return f"id: {seq}\nevent: {tipo}\ndata: {corpo}\n\n"
+
+def _gerar_eventos_estado(canal, desde):
+    """Stream SSE: snapshot (se necessário) seguido de deltas numerados."""
+    seq = desde
+    deltas = canal.deltas_desde(seq) if seq is not None else None
+    if deltas is None:
+        seq, estado = canal.snapshot()
+        yield _evento_sse(seq, "estado", estado)
+    else:
+        for seq, delta in deltas:
+            yield _evento_sse(seq, "delta", delta)
+
+    while True:
+        deltas = canal.deltas_desde(seq, timeout=_CANAL_KEEPALIVE)
+        if deltas is None:
+            # Cliente ficou para trás do histórico: reenviar o estado completo
+            seq, estado = canal.snapshot()
+            yield _evento_sse(seq, "estado", estado)
+        elif not deltas:
+            yield ": keep-alive\n\n"
+        else:
+            for seq, delta in deltas:
+                yield _evento_sse(seq, "delta", delta)
+
+def _gerar_eventos_sessao_nova(id_sessao, nome, desde):
+    """Stream SSE de uma sessão que ainda não enviou frames: estado inicial até o primeiro /inferir."""
+    seq, estado = _sessao_sem_frames.canais[nome].snapshot()
+    if desde != seq:
+        yield _evento_sse(seq, "estado", estado)
+    espera = 0.0
+    sessao = None
+    while sessao is None:
+        sessao = _obter_sessao(id_sessao)
+        if sessao is not None:
+            break
+        time.sleep(STATUS_ESPERA_SESSAO_NOVA)
+        espera += STATUS_ESPERA_SESSAO_NOVA
+        if espera >= _CANAL_KEEPALIVE:
+            espera = 0.0
+            yield ": keep-alive\n\n"
+    # O estado inicial é o mesmo da sessão recém-criada: segue pelos deltas
+    yield from _gerar_eventos_estado(sessao.canais[nome], seq)
+
+@app.route('/status_stream')
+def status_stream():
+    """Server-Sent Events com o estado de um canal (?canal=principal|musica|pintura).
+
+    Retoma a partir do cabeçalho Last-Event-ID (enviado pelo EventSource ao
+    reconectar) ou de ?desde=<seq>. ?sessao=<id> acompanha uma sessão de
+    captura no navegador em vez da câmera local.
+    """
+    nome = request.args.get("canal", "principal")
+    if nome not in _sessao_local.canais:
+        return jsonify({"ok": False, "mensagem": f"Canal '{nome}' desconhecido."}), 404
+
+    desde = request.headers.get("Last-Event-ID") or request.args.get("desde")
+    try:
+        desde = int(desde) if desde is not None else None
+    except ValueError:
+        desde = None
+
+    sessao = _sessao_da_requisicao()
+    if sessao is None:
+        eventos = _gerar_eventos_sessao_nova(request.args.get("sessao"), nome, desde)
+    else:
+        eventos = _gerar_eventos_estado(sessao.canais[nome], desde)
+    return Response(eventos, mimetype='text/event-stream',
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route('/landmarks_stream')
+def landmarks_stream():
+    """Landmarks das mãos em binário a cada inferência (?stream=principal|musica|pintura).
+
+    Mantém o pipeline ativo mesmo sem o vídeo: o estado continua sendo
+    publicado em /status_stream para o HUD desenhado no navegador.
+    """
+    if CLOUD_MODE or not CV_AVAILABLE:
+        return jsonify({"ok": False, "mensagem": "Landmarks não disponíveis neste ambiente."}), 404
+
+    nome = request.args.get("stream", "principal")
+    if nome not in _pipelines:
+        return jsonify({"ok": False, "mensagem": f"Stream '{nome}' desconhecido."}), 404
+
+    return Response(_gerar_landmarks(nome), mimetype='application/octet-stream',
+                    headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"})
+
+@app.route('/snapshot.jpg')
+def snapshot():
+    """Último frame de um stream (?stream=principal|musica|pintura, aceita w e q como os feeds)."""
+    if CLOUD_MODE or not CV_AVAILABLE:
+        return redirect(url_for('static', filename='images/neutro.jpg'))
+
+    nome = request.args.get("stream", "principal")
+    if nome not in _pipelines:
+        return jsonify({"ok": False, "mensagem": f"Stream '{nome}' desconhecido."}), 404
+
+    try:
+        opcoes = _opcoes_stream(request.args)
+    except ValueError as erro:
+        return jsonify({"ok": False, "mensagem": str(erro)}), 400
+
+    item = _pipelines[nome]["transmissor"].ultimo(opcoes.perfil)
+    frame_bytes = item[1] if item is not None and item[1] is not None else _PLACEHOLDERS["camera"]
+    return Response(frame_bytes, mimetype='image/jpeg', headers={"Cache-Control": "no-store"})
+
+@app.route('/stream_stats')
+def stream_stats():
+    """FPS alvo, FPS alcançado, perfil e frames descartados por stream e por cliente."""
+    dados = {}
+    for nome, pipeline in _pipelines.items():
+        clientes = []
+        for assinante in pipeline["transmissor"].assinantes():
+            marcapasso = assinante.marcapasso
+            perfil = assinante.perfil
+            cliente = {
+                "fps": round(marcapasso.fps, 1) if marcapasso else 0.0,
+                "fps_alvo": marcapasso.fps_alvo if marcapasso else 0.0,
+                "enviados": marcapasso.enviados if marcapasso else 0,
+                "descartados": assinante.descartados,
+                "deadlines_pulados": marcapasso.pulados if marcapasso else 0,
+                "largura": perfil.largura,
+                "qualidade": perfil.qualidade
+            }
+            if assinante.adaptador is not None:
+                cliente["ocupacao_envio"] = round(assinante.adaptador.ocupacao, 2)
+                cliente["vazao_kib_s"] = round(assinante.adaptador.vazao / 1024, 1)
+            clientes.append(cliente)
+        dados[nome] = {
+            "fps_alvo": config_fps.get(nome, _FPS_PADRAO),
+            "clientes": clientes,
+            "clientes_sem_overlay": pipeline["transmissor_limpo"].n_assinantes,
+            "clientes_landmarks": pipeline["transmissor_landmarks"].n_assinantes,
+            "perfis": len(pipeline["transmissor"].perfis()),
+            "descartados": sum(c["descartados"] for c in clientes)
+        }
+    return jsonify(dados)
+
+@app.route('/metrics')
+def metrics():
+    """Métricas no formato texto do Prometheus (latência por estágio, FPS, descartes, locks)."""
+    return Response(metricas.exportar(), content_type=metricas.TIPO_CONTEUDO)
 
 @app.route('/devices')
 def devices():
@@ -1223,9 +2508,12 @@ def devices():
         "cameras": listar_cameras(),
         "microfones": listar_microfones(),
         "cloud_mode": CLOUD_MODE,
+        "ritmos": list(fontes_frames.RITMOS) if fontes_frames is not None else [],
         "selecionado": {
             "camera_index": config_dispositivos["camera_index"],
-            "microfone_index": config_dispositivos["microfone_index"]
+            "microfone_index": config_dispositivos["microfone_index"],
+            "fonte": config_dispositivos["fonte"],
+            "ritmo": config_dispositivos["ritmo"]
         }
     })
 
@@ -1259,8 +2547,24 @@ def set_devices():
     if camera_index is None:
         camera_index = config_dispositivos["camera_index"]
 
-    if not abrir_camera(camera_index, fallback=False):
-        return jsonify({"ok": False, "mensagem": f"Não foi possível abrir a câmera {camera_index}."}), 400
+    # "fonte" (ex.: "video:/clip.mp4") substitui a câmera; "ritmo" = tempo_real | maximo
+    fonte = dados.get("fonte")
+    ritmo = dados.get("ritmo")
+    if ritmo is not None and ritmo not in fontes_frames.RITMOS:
+        return jsonify({"ok": False, "mensagem": f"Ritmo inválido: {ritmo}."}), 400
+
+    if fonte:
+        try:
+            fonte = _fonte_permitida(fonte)
+            fonte_aberta = abrir_fonte(fonte, ritmo)
+        except ValueError as erro:
+            return jsonify({"ok": False, "mensagem": str(erro)}), 400
+        if not fonte_aberta:
+            return jsonify({"ok": False, "mensagem": f"Não foi possível abrir a fonte {fonte}."}), 400
+    elif "camera_index" in dados or not config_dispositivos["fonte"]:
+        # Sem camera_index explícito, uma fonte alternativa ativa é mantida
+        if not abrir_camera(camera_index, fallback=False):
+            return jsonify({"ok": False, "mensagem": f"Não foi possível abrir a câmera {camera_index}."}), 400
 
     if not aplicar_microfone(microfone_index):
         return jsonify({"ok": False, "mensagem": "Microfone selecionado é inválido."}), 400
@@ -1270,8 +2574,212 @@ def set_devices():
         "mensagem": "Dispositivos atualizados com sucesso.",
         "selecionado": {
             "camera_index": config_dispositivos["camera_index"],
-            "microfone_index": config_dispositivos["microfone_index"]
+            "microfone_index": config_dispositivos["microfone_index"],
+            "fonte": config_dispositivos["fonte"],
+            "ritmo": config_dispositivos["ritmo"]
+        }
+    })
+
+@app.route('/gravacao')
+def gravacao_status():
+    gravador = _gravador
+    return jsonify({
+        "ativa": gravador is not None,
+        "arquivo": gravador.caminho if gravador is not None else None,
+        "frames": gravador.frames if gravador is not None else 0
+    })
+
+@app.route('/gravacao', methods=['POST'])
+def gravacao_controle():
+    """{"ativa": true, "nome": "sessao.lmk"} grava em gravacoes/; {"ativa": false} encerra."""
+    if CLOUD_MODE or gravacao_landmarks is None:
+        return jsonify({"ok": False, "mensagem": "Gravação de landmarks não disponível neste ambiente."}), 400
+
+    dados = request.get_json(silent=True) or {}
+    if not dados.get("ativa", True):
+        gravador = parar_gravacao()
+        if gravador is None:
+            return jsonify({"ok": True, "mensagem": "Nenhuma gravação ativa."})
+        return jsonify({"ok": True, "mensagem": "Gravação encerrada.",
+                        "arquivo": gravador.caminho, "frames": gravador.frames})
+
+    caminho = None
+    if dados.get("nome"):
+        nome_seguro = secure_filename(str(dados["nome"]))
+        if not nome_seguro:
+            return jsonify({"ok": False, "mensagem": "Nome de arquivo inválido."}), 400
+        caminho = os.path.join(PASTA_GRAVACOES, nome_seguro)
+    gravador = iniciar_gravacao(caminho)
+    return jsonify({"ok": True, "mensagem": "Gravação iniciada.", "arquivo": gravador.caminho})
+
+@app.route('/linha_tempo')
+def linha_tempo_consulta():
+    """Agregado dos eventos iniciados no intervalo.
+
+    ?inicio=&fim= (epoch em segundos) ou ?ultimos=<segundos> (padrão 3600);
+    filtros categoria, lado e duracao_min; balde do histograma em segundos (padrão 60).
+    """
+    if _linha_tempo is None:
+        return jsonify({"ok": False, "mensagem": "Linha do tempo desligada (VISION_LINHA_TEMPO)."}), 404
+    try:
+        fim = float(request.args.get("fim") or time.time())
+        inicio = float(request.args.get("inicio") or fim - float(request.args.get("ultimos", 3600)))
+        balde = float(request.args.get("balde", 60))
+        duracao_min = float(request.args.get("duracao_min", 0))
+    except ValueError:
+        return jsonify({"ok": False, "mensagem": "inicio, fim, ultimos, balde e duracao_min devem ser números."}), 400
+    categoria = request.args.get("categoria") or None
+    lado = request.args.get("lado") or None
+    if categoria is not None and categoria not in linha_tempo.CATEGORIAS:
+        return jsonify({"ok": False, "mensagem": f"Categoria inválida; use uma de {', '.join(linha_tempo.CATEGORIAS)}."}), 400
+    if lado is not None and lado not in linha_tempo.LADOS:
+        return jsonify({"ok": False, "mensagem": "Lado inválido; use Right ou Left."}), 400
+    if not all(math.isfinite(v) for v in (inicio, fim, balde, duracao_min)):
+        return jsonify({"ok": False, "mensagem": "inicio, fim, ultimos, balde e duracao_min devem ser finitos."}), 400
+    if balde <= 0 or fim < inicio:
+        return jsonify({"ok": False, "mensagem": "Intervalo ou balde inválido."}), 400
+    try:
+        resposta = _linha_tempo.consultar(inicio, fim, categoria, lado, duracao_min, balde)
+    except ValueError as erro:
+        return jsonify({"ok": False, "mensagem": str(erro)}), 400
+    return jsonify({"ok": True, **resposta})
+
+# --- Inferência de frames capturados no navegador (/inferir) ---
+# No deploy cloud não há câmera: a página captura com getUserMedia, reduz e
+# espelha o frame e envia lotes por POST; o servidor roda o mesmo MediaPipe
+# e os mesmos classificadores e responde com os landmarks e o estado. O
+# cliente (static/js/captura_navegador.js) mantém mais de um lote em voo,
+# então envio, inferência e resposta se sobrepõem; os frames de um lote são
+# decodificados antes de entrar na fila do MediaPipe, e frames mais velhos
+# que o último inferido são descartados (o mais recente vence).
+#
+# Lote (little-endian), repetido por frame:
+#   u32 seq | f64 timestamp (s) | u8 formato (0 = JPEG, 1 = RGB cru) |
+#   u16 largura | u16 altura | u32 tamanho | dados
+FORMATOS_FRAME = ("jpeg", "rgb")
+_CABECALHO_FRAME = struct.Struct("<IdBHHI")
+INFERIR_MAX_BYTES = 4 * 1024 * 1024  # limite de corpo das funções da Vercel
+INFERIR_MAX_FRAMES = 32
+
+_m_frames_remotos = {
+    desfecho: metricas.contador("vision_frames_remotos_total", "Frames recebidos em /inferir", desfecho=desfecho)
+    for desfecho in ("inferido", "descartado")
+}
+
+def ler_lote_frames(corpo):
+    """Corpo de /inferir → [(seq, timestamp, formato, largura, altura, dados)]. Levanta ValueError."""
+    frames = []
+    pos = 0
+    while pos < len(corpo):
+        if pos + _CABECALHO_FRAME.size > len(corpo):
+            raise ValueError("Cabeçalho de frame incompleto.")
+        seq, timestamp, formato, largura, altura, tamanho = _CABECALHO_FRAME.unpack_from(corpo, pos)
+        pos += _CABECALHO_FRAME.size
+        if formato >= len(FORMATOS_FRAME):
+            raise ValueError(f"Formato de frame desconhecido: {formato}.")
+        if pos + tamanho > len(corpo):
+            raise ValueError(f"Frame {seq} truncado.")
+        if not largura or not altura or not tamanho:
+            raise ValueError(f"Frame {seq} vazio (largura, altura e tamanho devem ser maiores que zero).")
+        if FORMATOS_FRAME[formato] == "rgb" and tamanho != largura * altura * 3:
+            raise ValueError(f"Frame {seq}: RGB {largura}x{altura} precisa de {largura * altura * 3} bytes.")
+        frames.append((seq, timestamp, FORMATOS_FRAME[formato], largura, altura, corpo[pos:pos + tamanho]))
+        pos += tamanho
+        if len(frames) > INFERIR_MAX_FRAMES:
+            raise ValueError(f"Lote com mais de {INFERIR_MAX_FRAMES} frames.")
+    return frames
+
+def _frame_rgb_remoto(formato, largura, altura, dados):
+    """Frame do navegador → RGB 320x240 (o que _inferir espera). None se não decodificar."""
+    if formato == "jpeg":
+        try:
+            frame = cv2.imdecode(np.frombuffer(dados, dtype=np.uint8), cv2.IMREAD_COLOR)
+        except cv2.error:
+            return None
+        if frame is None:
+            return None
+        return cv2.cvtColor(cv2.resize(frame, (320, 240)), cv2.COLOR_BGR2RGB)
+    frame_rgb = np.frombuffer(dados, dtype=np.uint8).reshape(altura, largura, 3)
+    if (largura, altura) != (320, 240):
+        frame_rgb = cv2.resize(frame_rgb, (320, 240))
+    return frame_rgb
+
+def _resultado_json(resultado):
+    carac = resultado.caracteristicas
+    maos = [
+        {
+            "lateralidade": carac.lateralidades[i],
+            "dedos": carac.lista_dedos(i),
+            "pontos": np.round(carac.pontos[i, :, :2], 4).tolist()
         }
+        for i in range(len(carac))
+    ]
+    return {"seq": resultado.seq, "timestamp": resultado.timestamp, "maos": maos,
+            "rosto": resultado.rosto is not None, "rosto_atualizado": resultado.rosto_atualizado}
+
+@app.route('/inferir', methods=['POST'])
+def inferir():
+    """Infere um lote de frames do navegador (?pipelines=principal,musica&sessao=<id>).
+
+    Responde os landmarks de cada frame inferido e o estado final de cada
+    pipeline na sessão. Cada sessão tem o próprio estado e a própria
+    numeração de frames; as instâncias do MediaPipe vêm do pool (503 se
+    todas estiverem com sessões ativas).
+    """
+    if not _carregar_cv():
+        return jsonify({"ok": False, "mensagem": "OpenCV/MediaPipe indisponível no servidor."}), 503
+    if not request.args.get("sessao"):
+        return jsonify({"ok": False, "mensagem": "Informe ?sessao=<id>."}), 400
+
+    nomes = [n for n in request.args.get("pipelines", "principal").split(",") if n]
+    for nome in nomes:
+        if nome not in _pipelines or _pipelines[nome]["atualizar"] is None:
+            return jsonify({"ok": False, "mensagem": f"Pipeline '{nome}' não aceita frames do navegador."}), 400
+    if (request.content_length or 0) > INFERIR_MAX_BYTES:
+        return jsonify({"ok": False, "mensagem": f"Lote maior que {INFERIR_MAX_BYTES} bytes."}), 413
+
+    try:
+        frames = ler_lote_frames(request.get_data())
+    except ValueError as erro:
+        return jsonify({"ok": False, "mensagem": str(erro)}), 400
+
+    # Decodificação fora do lock: sobrepõe com a inferência de outro lote em voo
+    decodificados = []
+    for seq, timestamp, formato, largura, altura, dados in frames:
+        frame_rgb = _frame_rgb_remoto(formato, largura, altura, dados)
+        if frame_rgb is None:
+            return jsonify({"ok": False, "mensagem": f"Frame {seq}: JPEG inválido."}), 400
+        decodificados.append((seq, timestamp, frame_rgb))
+
+    agendadores_rosto = [_pipelines[n]["agendador_rosto"] for n in nomes if _pipelines[n]["agendador_rosto"] is not None]
+    sessao = _sessao_da_requisicao(criar=True)
+    resultados = []
+    descartados = []
+    inicio = time.perf_counter()
+    try:
+        with _contexto_da_sessao(sessao) as contexto:
+            for seq, timestamp, frame_rgb in decodificados:
+                if seq <= sessao.ultimo_seq:
+                    descartados.append(seq)
+                    _m_frames_remotos["descartado"].inc()
+                    continue
+                with _m_inferencia.medir():
+                    resultado = _inferir(seq, timestamp, None, agendadores_rosto, contexto, frame_rgb)
+                for nome in nomes:
+                    _pipelines[nome]["atualizar"](resultado, sessao)
+                _registrar_transicoes(sessao, nomes)
+                sessao.ultimo_seq = seq
+                _m_frames_remotos["inferido"].inc()
+                resultados.append(_resultado_json(resultado))
+    except pool_instancias.PoolEsgotado:
+        return jsonify({"ok": False, "mensagem": "Servidor ocupado: todas as instâncias do MediaPipe em uso."}), 503
+
+    return jsonify({
+        "ok": True,
+        "resultados": resultados,
+        "descartados": descartados,
+        "estados": {nome: sessao.canais[nome].snapshot()[1] for nome in nomes if nome in sessao.canais},
+        "ms_inferencia": round((time.perf_counter() - inicio) * 1000, 1)
     })
 
 # --- API de Mapeamento Gesto → Imagem ---
@@ -1355,7 +2863,32 @@ def upload_image():
     arquivo.save(caminho_destino)
     return jsonify({"ok": True, "mensagem": f"Imagem '{nome_seguro}' enviada com sucesso.", "filename": nome_seguro})
 
+# --- Partida: tempo de importação e memória ---
+def _memoria_residente():
+    """Memória residente do processo em bytes (None se a plataforma não informar)."""
+    try:
+        with open("/proc/self/statm") as arquivo:
+            return int(arquivo.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss
+
+TEMPO_IMPORTACAO = time.perf_counter() - _INICIO_IMPORTACAO
+metricas.medidor("vision_importacao_segundos", "Tempo de importação na partida",
+                 modulo="app_web").definir(TEMPO_IMPORTACAO)
+metricas.medidor("vision_memoria_residente_bytes", "Memória residente do processo",
+                 funcao=lambda: _memoria_residente() or 0)
+_rss = _memoria_residente()
+print(f"\u23f1\ufe0f app_web importado em {TEMPO_IMPORTACAO * 1000:.0f} ms"
+      + (f", memória residente {_rss / 2**20:.0f} MB" if _rss else "")
+      + (" (modo cloud)" if CLOUD_MODE else ""))
+
 if __name__ == "__main__":
+    iniciar_aquecimento()
     # Host 0.0.0.0 permite acesso de outros dispositivos na rede
     # debug=False é IMPORTANTE no Windows para não abrir a câmera 2 vezes
     # threaded=True permite servir /devices enquanto /video_feed faz streaming
@@ -0,0 +1,308 @@
+"""
+Micro-benchmark e verificação dos classificadores (sem câmera).
+
+Usa duas fontes de landmarks:
+  * poses sintéticas (poses_sinteticas.py) cobrindo todos os gestos do
+    MAPEAMENTO_PADRAO, os gestos só da música (Hang Loose, Tres Dedos...),
+    as expressões, as trajetórias de movimento e os gestos combinados;
+  * o corpus de frames reais em benchmarks/corpus_landmarks.json, com os
+    rótulos esperados.
+
+Mede operações por segundo de cada classificador e termina com código 1 se
+algum rótulo divergir do esperado ou se a vazão cair além da tolerância
+em relação à linha de base salva nesta máquina (--salvar-base).
+
+Uso:
+    python benchmark_classificadores.py
+    python benchmark_classificadores.py --salvar-base
+    python benchmark_classificadores.py --gravar-corpus static/images/pas.jpg static/images/mao_aberta.jpg
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+import numpy as np
+
+import caracteristicas_mao
+import classificadores
+import poses_sinteticas
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CORPUS_PADRAO = os.path.join(BASE_DIR, "benchmarks", "corpus_landmarks.json")
+BASE_PADRAO = os.path.join(BASE_DIR, "benchmarks", "base_classificadores.json")
+
+# Pontos do Face Mesh usados por classificar_expressao (o corpus guarda só estes)
+PONTOS_ROSTO = classificadores.PONTOS_ROSTO_EXPRESSAO
+
+
+# --- Acurácia: poses sintéticas ---
+
+def verificar_sinteticos(n=20, semente=0):
+    """Compara os classificadores com os rótulos das poses sintéticas. Retorna (total, falhas)."""
+    falhas = []
+    total = 0
+
+    for pontos, lateralidade, orientacao, gesto in poses_sinteticas.gerar_maos(n, semente):
+        polegar, esticados, esperado_principal, esperado_musica = poses_sinteticas.GESTOS_MAO[gesto]
+        carac = caracteristicas_mao.extrair_caracteristicas(pontos[None], [lateralidade])
+        obtido = (
+            carac.orientacao(0),
+            classificadores.classificar_gesto_principal(carac, 0)[0],
+            classificadores.classificar_gesto_musica(carac, 0)[0],
+        )
+        if obtido != (orientacao, esperado_principal, esperado_musica):
+            falhas.append(f"mão {gesto} {lateralidade}/{orientacao}: esperado "
+                          f"{(orientacao, esperado_principal, esperado_musica)}, obtido {obtido}")
+
+        # contar_dedos (versão escalar): polegar só é definido nas poses aberto/fechado
+        _, lista = classificadores.contar_dedos(
+            poses_sinteticas.ListaLandmarks(pontos).landmark, lateralidade, orientacao)
+        if tuple(lista[1:]) != esticados or (polegar in ("aberto", "fechado")
+                                             and lista[0] != (polegar == "aberto")):
+            falhas.append(f"contar_dedos {gesto} {lateralidade}/{orientacao}: obtido {lista}")
+        total += 1
+
+    for pontos, esperado in poses_sinteticas.gerar_rostos(n, semente):
+        obtido = classificadores.classificar_expressao(poses_sinteticas.ListaLandmarks(pontos))
+        if obtido != esperado:
+            falhas.append(f"rosto {esperado}: obtido {obtido}")
+        total += 1
+
+    for trajetoria, esperado in poses_sinteticas.gerar_trajetorias(n, semente):
+        historico = classificadores.novo_historico_movimento()
+        for x, y, t in trajetoria:
+            obtido, _ = classificadores.detectar_movimento(historico, "Right", x, y, t)
+        if obtido != esperado:
+            falhas.append(f"movimento {esperado}: obtido {obtido}")
+        total += 1
+
+    for argumentos, esperado in poses_sinteticas.COMBINACOES:
+        obtido = classificadores.classificar_gesto_combinado(*argumentos)
+        if obtido != esperado:
+            falhas.append(f"combinado {argumentos[:2]}: esperado {esperado}, obtido {obtido}")
+        total += 1
+
+    return total, falhas
+
+
+# --- Acurácia: corpus real ---
+
+def _rosto_do_corpus(pontos):
+    """Reconstrói um Face Mesh completo a partir do subconjunto guardado."""
+    completo = np.zeros((poses_sinteticas.N_PONTOS_ROSTO, 3), dtype=np.float64)
+    for indice, (x, y) in pontos.items():
+        completo[int(indice), :2] = (x, y)
+    return poses_sinteticas.ListaLandmarks(completo)
+
+
+def _rotulos(carac, rosto):
+    return {
+        "principal": [classificadores.classificar_gesto_principal(carac, i)[0] for i in range(len(carac))],
+        "musica": [classificadores.classificar_gesto_musica(carac, i)[0] for i in range(len(carac))],
+        "expressao": classificadores.classificar_expressao(rosto) if rosto is not None else None,
+    }
+
+
+def _frame_do_corpus(frame):
+    """(características, rosto) de um frame do corpus."""
+    pontos = np.array([mao["pontos"] for mao in frame["maos"]], dtype=np.float64).reshape(-1, 21, 3)
+    carac = caracteristicas_mao.extrair_caracteristicas(pontos, [mao["lateralidade"] for mao in frame["maos"]])
+    rosto = _rosto_do_corpus(frame["rosto"]) if frame.get("rosto") else None
+    return carac, rosto
+
+
+def carregar_corpus(caminho):
+    if not os.path.exists(caminho):
+        return []
+    with open(caminho, encoding="utf-8") as f:
+        return json.load(f)["frames"]
+
+
+def verificar_corpus(frames):
+    falhas = []
+    for frame in frames:
+        obtido = _rotulos(*_frame_do_corpus(frame))
+        if obtido != frame["esperado"]:
+            falhas.append(f"corpus {frame['fonte']} (espelhado={frame['espelhado']}): "
+                          f"esperado {frame['esperado']}, obtido {obtido}")
+    return falhas
+
+
+def gravar_corpus(caminhos, destino):
+    """Roda o MediaPipe nas imagens (como o app: 320x240) e grava landmarks + rótulos atuais.
+
+    Os rótulos gravados são a saída atual dos classificadores: revise o
+    arquivo (campo "esperado") antes de adotá-lo como referência.
+    """
+    import cv2
+    import mediapipe as mp
+
+    maos = mp.solutions.hands.Hands(static_image_mode=True, max_num_hands=2, model_complexity=0,
+                                    min_detection_confidence=0.5)
+    rosto = mp.solutions.face_mesh.FaceMesh(static_image_mode=True, max_num_faces=1,
+                                            refine_landmarks=True, min_detection_confidence=0.5)
+    frames = []
+    for caminho in caminhos:
+        imagem = cv2.imread(caminho)
+        if imagem is None:
+            print(f"  ⚠️ Não foi possível ler {caminho}")
+            continue
+        for espelhado in (True, False):
+            frame = cv2.flip(imagem, 1) if espelhado else imagem
+            rgb = cv2.cvtColor(cv2.resize(frame, (320, 240)), cv2.COLOR_BGR2RGB)
+            res_maos = maos.process(rgb)
+            res_rosto = rosto.process(rgb)
+
+            registro = {
+                "fonte": os.path.relpath(caminho, BASE_DIR).replace(os.sep, "/"),
+                "espelhado": espelhado,
+                "maos": [
+                    {"lateralidade": lado.classification[0].label,
+                     "pontos": [[p.x, p.y, p.z] for p in landmarks.landmark]}
+                    for landmarks, lado in zip(res_maos.multi_hand_landmarks or [],
+                                               res_maos.multi_handedness or [])
+                ],
+                "rosto": None,
+            }
+            if res_rosto.multi_face_landmarks:
+                pontos = res_rosto.multi_face_landmarks[0].landmark
+                registro["rosto"] = {str(i): [pontos[i].x, pontos[i].y] for i in PONTOS_ROSTO}
+            if not registro["maos"] and registro["rosto"] is None:
+                continue
+
+            registro["esperado"] = _rotulos(*_frame_do_corpus(registro))
+            print(f"  {registro['fonte']} (espelhado={espelhado}): {registro['esperado']}")
+            frames.append(registro)
+
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    with open(destino, "w", encoding="utf-8") as f:
+        json.dump({
+            "descricao": "Landmarks reais (MediaPipe, 320x240) com os rótulos esperados dos classificadores.",
+            "frames": frames,
+        }, f, ensure_ascii=False, indent=1)
+    print(f"📄 {len(frames)} frame(s) → {destino}")
+
+
+# --- Vazão ---
+
+def medir(funcao, entradas, segundos):
+    """Chama funcao(*entrada) em ciclos sobre as entradas por ~segundos. Retorna ops/s."""
+    operacoes = 0
+    inicio = time.perf_counter()
+    limite = inicio + segundos
+    while True:
+        for entrada in entradas:
+            funcao(*entrada)
+        operacoes += len(entradas)
+        agora = time.perf_counter()
+        if agora >= limite:
+            return operacoes / (agora - inicio)
+
+
+def preparar_entradas(semente=0):
+    """Entradas de cada classificador, montadas antes da medição."""
+    rng = random.Random(semente)
+    maos = poses_sinteticas.gerar_maos(5, semente)
+    # Frames com duas mãos (caso comum na página de música)
+    frames = []
+    for _ in range(200):
+        (p1, l1, _, _), (p2, l2, _, _) = rng.sample(maos, 2)
+        frames.append((np.stack([p1, p2]), (l1, l2)))
+    caracs = [caracteristicas_mao.extrair_caracteristicas(p, l) for p, l in frames]
+
+    historico = classificadores.novo_historico_movimento()
+    trajetorias = poses_sinteticas.gerar_trajetorias(5, semente)
+    amostras_movimento = []
+    t = 0.0
+    for trajetoria, _ in trajetorias:
+        for x, y, _ in trajetoria:
+            t += 1 / poses_sinteticas.FPS_TRAJETORIA
+            amostras_movimento.append((historico, "Right", x, y, t))
+
+    return {
+        "extrair_caracteristicas": (caracteristicas_mao.extrair_caracteristicas, frames),
+        "contar_dedos": (classificadores.contar_dedos,
+                         [(poses_sinteticas.ListaLandmarks(p).landmark, l, o) for p, l, o, _ in maos]),
+        "classificar_gesto_principal": (classificadores.classificar_gesto_principal,
+                                        [(c, i) for c in caracs for i in range(len(c))]),
+        "classificar_gesto_musica": (classificadores.classificar_gesto_musica,
+                                     [(c, i) for c in caracs for i in range(len(c))]),
+        "classificar_expressao": (classificadores.classificar_expressao,
+                                  [(poses_sinteticas.ListaLandmarks(p),) for p, _ in
+                                   poses_sinteticas.gerar_rostos(25, semente)]),
+        "detectar_movimento": (classificadores.detectar_movimento, amostras_movimento),
+        "classificar_gesto_combinado": (classificadores.classificar_gesto_combinado,
+                                        [argumentos for argumentos, _ in poses_sinteticas.COMBINACOES]),
+    }
+
+
+def carregar_base(caminho):
+    if not os.path.exists(caminho):
+        return None
+    with open(caminho, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--segundos", type=float, default=0.5, help="tempo de medição por classificador")
+    parser.add_argument("--amostras", type=int, default=20, help="poses sintéticas por combinação")
+    parser.add_argument("--corpus", default=CORPUS_PADRAO, help="corpus de landmarks reais")
+    parser.add_argument("--base", default=BASE_PADRAO, help="linha de base de vazão desta máquina")
+    parser.add_argument("--tolerancia", type=float, default=0.25,
+                        help="queda máxima de vazão aceita em relação à base (0.25 = 25%%)")
+    parser.add_argument("--salvar-base", action="store_true", help="grava a vazão medida como linha de base")
+    parser.add_argument("--gravar-corpus", nargs="+", metavar="IMAGEM",
+                        help="grava o corpus a partir de imagens (requer MediaPipe) e sai")
+    args = parser.parse_args()
+
+    if args.gravar_corpus:
+        gravar_corpus(args.gravar_corpus, args.corpus)
+        return 0
+
+    ok = True
+
+    print("🎯 Acurácia")
+    total, falhas = verificar_sinteticos(args.amostras)
+    print(f"  sintéticos: {total - len(falhas)}/{total}")
+    corpus = carregar_corpus(args.corpus)
+    falhas_corpus = verificar_corpus(corpus)
+    print(f"  corpus real: {len(corpus) - len(falhas_corpus)}/{len(corpus)}")
+    for falha in (falhas + falhas_corpus)[:20]:
+        print(f"    ❌ {falha}")
+    ok = ok and not falhas and not falhas_corpus
+
+    print("\n⏱️ Vazão (ops/s)")
+    base = carregar_base(args.base)
+    medidas = {}
+    for nome, (funcao, entradas) in preparar_entradas().items():
+        medidas[nome] = medir(funcao, entradas, args.segundos)
+        linha = f"  {nome:<28} {medidas[nome]:>12,.0f}"
+        referencia = (base or {}).get("ops_por_segundo", {}).get(nome)
+        if referencia:
+            razao = medidas[nome] / referencia
+            linha += f"  ({razao:.2f}x da base)"
+            if razao < 1.0 - args.tolerancia:
+                linha += "  ❌ regressão"
+                ok = False
+        print(linha)
+
+    if args.salvar_base:
+        os.makedirs(os.path.dirname(args.base), exist_ok=True)
+        with open(args.base, "w", encoding="utf-8") as f:
+            json.dump({"maquina": platform.node(), "python": platform.python_version(),
+                       "ops_por_segundo": medidas}, f, indent=2)
+        print(f"\n💾 Linha de base salva em {args.base}")
+    elif base is None:
+        print("\n💡 Sem linha de base nesta máquina: rode com --salvar-base para habilitar a checagem de vazão.")
+
+    print("\n✅ OK" if ok else "\n❌ Falhou")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
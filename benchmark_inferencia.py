@@ -0,0 +1,91 @@
+"""
+Benchmark da inferência de mãos + rosto: sequencial vs paralela.
+
+Roda o mesmo caminho do estágio de inferência do app_web
+(processar_maos_e_rosto) sobre imagens com mãos e rosto e compara a
+latência por frame. Em máquinas com 2+ núcleos a versão paralela deve
+ficar perto do maior dos dois modelos em vez da soma.
+
+Uso:
+    python benchmark_inferencia.py [--frames 200] [--imagens a.jpg b.jpg]
+"""
+import argparse
+import os
+import statistics
+import time
+
+import cv2
+
+import app_web
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+IMAGENS_PADRAO = [
+    os.path.join(BASE_DIR, "static", "images", "pas.jpg"),
+    os.path.join(BASE_DIR, "static", "images", "mao_aberta.jpg"),
+]
+
+
+def carregar_frames(caminhos):
+    """Carrega as imagens no formato que o estágio de inferência usa (320x240 RGB)."""
+    frames = []
+    for caminho in caminhos:
+        img = cv2.imread(caminho)
+        if img is None:
+            print(f"  ⚠️ Não foi possível ler {caminho}")
+            continue
+        img = cv2.resize(img, (320, 240))
+        frames.append(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+    return frames
+
+
+def medir(maos, rosto, frames, n_frames, paralelo):
+    """Retorna a lista de latências (ms) por frame."""
+    latencias = []
+    # Aquecimento: os primeiros frames incluem a criação do grafo
+    for frame in frames:
+        app_web.processar_maos_e_rosto(maos, rosto, frame, paralelo=paralelo)
+
+    for i in range(n_frames):
+        frame = frames[i % len(frames)]
+        inicio = time.perf_counter()
+        app_web.processar_maos_e_rosto(maos, rosto, frame, paralelo=paralelo)
+        latencias.append((time.perf_counter() - inicio) * 1000.0)
+    return latencias
+
+
+def resumo(nome, latencias):
+    ordenadas = sorted(latencias)
+    p95 = ordenadas[int(len(ordenadas) * 0.95) - 1]
+    print(f"  {nome:<11} média {statistics.mean(latencias):6.2f} ms | "
+          f"p50 {statistics.median(latencias):6.2f} ms | p95 {p95:6.2f} ms")
+    return statistics.mean(latencias)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=200, help="frames medidos por modo")
+    parser.add_argument("--imagens", nargs="+", default=IMAGENS_PADRAO, help="imagens de entrada")
+    args = parser.parse_args()
+
+    if not app_web.CV_AVAILABLE:
+        print("❌ MediaPipe indisponível (dependências ausentes).")
+        return 1
+    maos, rosto = app_web.criar_mediapipe()
+
+    frames = carregar_frames(args.imagens)
+    if not frames:
+        print("❌ Nenhuma imagem carregada.")
+        return 1
+
+    print(f"⏱️ Inferência mãos + rosto — {args.frames} frames, {os.cpu_count()} núcleo(s)\n")
+    media_seq = resumo("sequencial", medir(maos, rosto, frames, args.frames, paralelo=False))
+    media_par = resumo("paralela", medir(maos, rosto, frames, args.frames, paralelo=True))
+
+    print(f"\n  Ganho: {media_seq / media_par:.2f}x")
+    if (os.cpu_count() or 1) < 2:
+        print("  💡 Só 1 núcleo disponível: não há ganho esperado com a versão paralela.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
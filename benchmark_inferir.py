@@ -0,0 +1,128 @@
+"""
+Benchmark de /inferir: faz o papel do navegador no deploy cloud.
+
+Lê frames de uma fonte gravada (fontes_frames.py), reduz para 320x240,
+espelha como a página faz e envia lotes no formato binário de /inferir
+(JPEG ou RGB cru), mantendo até --em-voo lotes pendentes. Mede frames/s
+inferidos, latência de ida e volta por lote (p50/p95) e bytes enviados
+por frame. Sem --url roda dentro do processo pelo cliente de teste do
+Flask; com --url mede um servidor de verdade (ex.: o deploy).
+
+Uso:
+    python benchmark_inferir.py --fonte imagens:static/images --frames 300
+    python benchmark_inferir.py --formato rgb --lote 4 --em-voo 2
+    python benchmark_inferir.py --url https://meu-app.vercel.app --pipelines musica
+"""
+import argparse
+import json
+import struct
+import time
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+import fontes_frames
+
+CABECALHO = "<IdBHHI"
+
+
+def montar_lote(frames, formato, qualidade):
+    """[(seq, timestamp, frame BGR 320x240)] → corpo de /inferir."""
+    partes = []
+    for seq, timestamp, frame in frames:
+        if formato == "jpeg":
+            dados = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, qualidade])[1].tobytes()
+        else:
+            dados = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB).tobytes()
+        partes.append(struct.pack(CABECALHO, seq, timestamp, 0 if formato == "jpeg" else 1, 320, 240, len(dados)))
+        partes.append(dados)
+    return b"".join(partes)
+
+
+def percentil(valores, p):
+    return float(np.percentile(valores, p)) if valores else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fonte", default="imagens:static/images",
+                        help="fonte de frames (video:..., imagens:..., sintetica[:LxA])")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--formato", choices=("jpeg", "rgb"), default="jpeg")
+    parser.add_argument("--qualidade", type=int, default=70, help="qualidade JPEG (como o toBlob da página)")
+    parser.add_argument("--lote", type=int, default=2, help="frames por requisição")
+    parser.add_argument("--em-voo", type=int, default=2, help="requisições pendentes ao mesmo tempo")
+    parser.add_argument("--pipelines", default="principal")
+    parser.add_argument("--url", help="servidor a medir (padrão: app no próprio processo)")
+    args = parser.parse_args()
+
+    fonte = fontes_frames.criar_fonte(args.fonte, ritmo="maximo")
+    if not fonte.isOpened():
+        print(f"❌ Não foi possível abrir {args.fonte}")
+        return 1
+    frames = []
+    while len(frames) < args.frames:
+        ok, frame = fonte.read()
+        if not ok:
+            break
+        frames.append(cv2.flip(cv2.resize(frame, (320, 240)), 1))
+    fonte.release()
+    lotes = [
+        montar_lote([(i + 1, (i + 1) / 30.0, f) for i, f in enumerate(frames[a:a + args.lote], start=a)],
+                    args.formato, args.qualidade)
+        for a in range(0, len(frames), args.lote)
+    ]
+
+    consulta = f"/inferir?pipelines={args.pipelines}&sessao={uuid.uuid4().hex[:12]}"
+    if args.url:
+        def enviar(corpo):
+            pedido = urllib.request.Request(args.url.rstrip("/") + consulta, data=corpo, method="POST",
+                                            headers={"Content-Type": "application/octet-stream"})
+            with urllib.request.urlopen(pedido) as resposta:
+                return json.loads(resposta.read())
+    else:
+        import app_web
+
+        if not app_web.CV_AVAILABLE:
+            print("❌ OpenCV/MediaPipe indisponível.")
+            return 1
+
+        def enviar(corpo):
+            resposta = app_web.app.test_client().post(consulta, data=corpo,
+                                                     content_type="application/octet-stream")
+            if resposta.status_code != 200:
+                raise RuntimeError(resposta.get_json().get("mensagem"))
+            return resposta.get_json()
+
+    def medir(corpo):
+        inicio = time.perf_counter()
+        dados = enviar(corpo)
+        return time.perf_counter() - inicio, len(dados["resultados"]), len(dados["descartados"])
+
+    # Primeiro lote sozinho: cria o MediaPipe da sessão remota
+    medir(lotes[0])
+    print(f"📼 {args.fonte}: {len(frames)} frames {args.formato}, lotes de {args.lote}, "
+          f"{args.em_voo} em voo → {args.url or 'app local'}")
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.em_voo) as executor:
+        medidas = list(executor.map(medir, lotes[1:]))
+    duracao = time.perf_counter() - inicio
+    latencias = [m[0] for m in medidas]
+    inferidos = sum(m[1] for m in medidas)
+    descartados = sum(m[2] for m in medidas)
+    bytes_frame = sum(map(len, lotes[1:])) / max(inferidos + descartados, 1)
+
+    print(f"\n  {inferidos} frames em {duracao:.2f} s → {inferidos / max(duracao, 1e-9):.1f} fps inferidos"
+          f" ({descartados} descartados por chegarem fora de ordem)")
+    print(f"  Ida e volta por lote: p50 {percentil(latencias, 50) * 1000:.1f} ms, "
+          f"p95 {percentil(latencias, 95) * 1000:.1f} ms")
+    print(f"  Enviado por frame: {bytes_frame / 1024:.1f} KiB")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,84 @@
+"""
+Benchmark headless de um stream MJPEG (/video_feed e afins), sem câmera.
+
+Sobe o app com uma fonte de frames gravada (fontes_frames.py), consome o
+stream pelo cliente de teste do Flask e mede frames/s e bytes/s
+entregues, além da latência média de cada estágio registrada em /metrics.
+Com --ritmo maximo e --fps 0 mede o throughput máximo do pipeline.
+
+Uso:
+    python benchmark_stream.py --fonte imagens:static/images --segundos 10
+    python benchmark_stream.py --fonte video:clip.mp4 --stream musica --ritmo tempo_real
+    python benchmark_stream.py --parametros "w=320&q=60"
+"""
+import argparse
+import os
+import time
+
+ROTAS = {
+    "principal": "/video_feed",
+    "musica": "/video_feed_musica",
+    "pintura": "/video_feed_pintura",
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fonte", default="imagens:static/images",
+                        help="fonte de frames (camera:N, video:..., imagens:..., sintetica[:LxA])")
+    parser.add_argument("--ritmo", choices=("tempo_real", "maximo"), default="maximo")
+    parser.add_argument("--stream", choices=sorted(ROTAS), default="principal")
+    parser.add_argument("--fps", type=float, default=0, help="FPS alvo do stream (0 = sem limite)")
+    parser.add_argument("--segundos", type=float, default=10.0)
+    parser.add_argument("--parametros", default="", help="query string do cliente (ex.: w=320&q=60&fps=15, q=auto)")
+    args = parser.parse_args()
+
+    # A configuração é lida na importação do app
+    os.environ["VISION_FONTE"] = args.fonte
+    os.environ["VISION_FONTE_RITMO"] = args.ritmo
+    os.environ[f"VISION_FPS_{args.stream.upper()}"] = str(args.fps)
+    import app_web
+
+    if not app_web.CV_AVAILABLE or app_web.CLOUD_MODE:
+        print("❌ OpenCV/MediaPipe indisponível (ou modo cloud).")
+        return 1
+
+    rota = ROTAS[args.stream] + (f"?{args.parametros}" if args.parametros else "")
+    print(f"📼 {args.fonte} ({args.ritmo}) → {rota} por {args.segundos:.0f} s")
+    frames = 0
+    total_bytes = 0
+    with app_web.app.test_client() as cliente:
+        resposta = cliente.get(rota, buffered=False)
+        partes = iter(resposta.response)
+        # Primeiro frame inclui a abertura da fonte e o aquecimento do MediaPipe
+        next(partes)
+        inicio = time.perf_counter()
+        for parte in partes:
+            frames += 1
+            total_bytes += len(parte)
+            if time.perf_counter() - inicio >= args.segundos:
+                break
+        duracao = time.perf_counter() - inicio
+        resposta.close()
+
+    print(f"\n  {frames} frames em {duracao:.1f} s → {frames / duracao:.1f} fps, "
+          f"{total_bytes / duracao / 1024:.0f} KiB/s")
+
+    print("\n  Latência média por estágio:")
+    estagios = [
+        ("cap_read", app_web._m_cap_read),
+        ("resize_cvtcolor", app_web._m_preprocessamento),
+        ("maos_process", app_web._m_maos),
+        ("rosto_process", app_web._m_rosto),
+        ("caracteristicas", app_web._m_caracteristicas),
+        ("processar", app_web._pipelines[args.stream]["m_processar"]),
+        ("desenho", app_web._pipelines[args.stream]["m_desenho"]),
+    ]
+    for nome, histograma in estagios:
+        if histograma.contagem:
+            print(f"    {nome:<16} {histograma.soma / histograma.contagem * 1000:7.2f} ms ({histograma.contagem})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
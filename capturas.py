@@ -0,0 +1,104 @@
+"""
+Capturas do gesto de print fora do loop de frames.
+
+EscritorCapturas grava fotos e clipes numa thread própria, a partir de uma
+fila limitada: com a fila cheia a captura é descartada (e contada) em vez
+de segurar o stream. AnelJPEG guarda os últimos segundos de um stream como
+JPEGs já codificados (de um único stream, num perfil fixo), então o clipe
+do "replay instantâneo" não recodifica nada e guardar um frame é só um
+append.
+
+O clipe é gravado como MJPEG cru (JPEGs concatenados), que players como VLC
+e ffmpeg abrem direto; para converter:
+    ffmpeg -framerate 30 -i print_20250101_120000.mjpeg print.mp4
+"""
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+
+class AnelJPEG:
+    """Últimos `segundos` de frames codificados (seq, timestamp, bytes)."""
+
+    def __init__(self, segundos, max_frames=600, relogio=time.monotonic):
+        self.segundos = segundos
+        self.relogio = relogio
+        self._frames = deque(maxlen=max_frames)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._frames)
+
+    def guardar(self, seq, frame_bytes):
+        """Guarda o frame `seq`; um seq repetido ou mais velho que o último é ignorado."""
+        agora = self.relogio()
+        with self._lock:
+            if self._frames and self._frames[-1][0] >= seq:
+                return
+            self._frames.append((seq, agora, frame_bytes))
+            limite = agora - self.segundos
+            while self._frames[0][1] < limite:
+                self._frames.popleft()
+
+    def recentes(self):
+        """Cópia rasa dos frames guardados, do mais antigo ao mais novo."""
+        with self._lock:
+            return list(self._frames)
+
+
+class EscritorCapturas:
+    """Thread que grava as capturas enfileiradas por foto() e clipe()."""
+
+    def __init__(self, pasta, max_pendentes=8, codificar=None):
+        self.pasta = pasta
+        self.codificar = codificar  # frame BGR -> bytes JPEG (roda na thread do escritor)
+        self.gravadas = 0
+        self.descartadas = 0
+        self._fila = queue.Queue(maxsize=max_pendentes)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def foto(self, nome, frame):
+        """Enfileira um frame BGR (não pode mais ser alterado). Retorna o caminho ou None se descartada."""
+        return self._enfileirar(nome, lambda: self.codificar(frame))
+
+    def clipe(self, nome, frames_bytes):
+        """Enfileira JPEGs já codificados como um clipe MJPEG."""
+        return self._enfileirar(nome, lambda: b"".join(frames_bytes))
+
+    def _enfileirar(self, nome, gerar):
+        caminho = os.path.join(self.pasta, nome)
+        try:
+            self._fila.put_nowait((caminho, gerar))
+        except queue.Full:
+            self.descartadas += 1
+            return None
+        self._garantir_thread()
+        return caminho
+
+    def aguardar(self):
+        """Bloqueia até a fila esvaziar (usado por scripts e testes)."""
+        self._fila.join()
+
+    def _garantir_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, daemon=True)
+                self._thread.start()
+
+    def _loop(self):
+        os.makedirs(self.pasta, exist_ok=True)
+        while True:
+            caminho, gerar = self._fila.get()
+            try:
+                dados = gerar()
+                if dados:
+                    with open(caminho, "wb") as arquivo:
+                        arquivo.write(dados)
+                    self.gravadas += 1
+            except Exception as erro:
+                print(f"[ERRO] Captura {caminho} falhou: {erro}")
+            finally:
+                self._fila.task_done()
@@ -0,0 +1,114 @@
+"""
+Extração vetorizada de características das mãos.
+
+Converte as detecções do MediaPipe num array (maos, 21, 3) uma única vez
+por frame e calcula, de uma vez para todas as mãos, as características que
+os classificadores usam: orientação (produto vetorial 0-5-17), dedos
+levantados, escala da mão, distância do OK, polegar para cima e dedos
+fechados. Os pipelines (principal, música, pintura) consomem o mesmo
+registro em vez de repetir dezenas de acessos a atributos do protobuf.
+
+As contas são feitas em float64 para reproduzir exatamente as comparações
+da versão escalar (que operava em floats do Python).
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+# Pontas dos dedos (polegar, indicador, médio, anelar, mínimo)
+PONTAS = np.array([4, 8, 12, 16, 20])
+# Articulação comparada com a ponta de cada dedo (exceto polegar): ponta - 2
+ARTICULACOES = PONTAS[1:] - 2
+
+MARGEM_POLEGAR = 0.04  # margem vertical normalizada do "polegar pra cima"
+
+
+@dataclass(frozen=True)
+class CaracteristicasMaos:
+    """Características de todas as mãos de um frame (índice i = i-ésima mão)."""
+    pontos: np.ndarray            # (n, 21, 3) coordenadas normalizadas
+    lateralidades: tuple          # ("Right" | "Left", ...)
+    palma: np.ndarray             # (n,) bool — True = palma, False = costas
+    dedos: np.ndarray             # (n, 5) int8 — 1 = dedo levantado (polegar..mínimo)
+    total_dedos: np.ndarray       # (n,) int
+    escala: np.ndarray            # (n,) distância pulso (0) → base do médio (9)
+    distancia_ok: np.ndarray      # (n,) distância ponta do polegar (4) → ponta do indicador (8)
+    polegar_pra_cima: np.ndarray  # (n,) bool
+    fechados: np.ndarray          # (n, 4) bool — indicador..mínimo dobrados
+    outros_fechados: np.ndarray   # (n,) bool — os quatro dobrados
+
+    def __len__(self):
+        return len(self.lateralidades)
+
+    def orientacao(self, i):
+        return "Palma" if self.palma[i] else "Costas"
+
+    def lista_dedos(self, i):
+        return self.dedos[i].tolist()
+
+    def pulso(self, i):
+        return float(self.pontos[i, 0, 0]), float(self.pontos[i, 0, 1])
+
+    def ponta_indicador(self, i):
+        return float(self.pontos[i, 8, 0]), float(self.pontos[i, 8, 1])
+
+    def fatia(self, inicio, fim):
+        """Mãos [inicio, fim) como um registro próprio (características calculadas em lote)."""
+        return CaracteristicasMaos(**{
+            campo: valor[inicio:fim] for campo, valor in vars(self).items()
+        })
+
+
+def landmarks_para_array(lista_landmarks):
+    """Converte uma sequência de NormalizedLandmarkList em array (n, 21, 3)."""
+    if not lista_landmarks:
+        return np.zeros((0, 21, 3), dtype=np.float64)
+    return np.array(
+        [[(p.x, p.y, p.z) for p in landmarks.landmark] for landmarks in lista_landmarks],
+        dtype=np.float64
+    )
+
+
+def extrair_caracteristicas(pontos, lateralidades):
+    """Calcula todas as características para todas as mãos numa passada vetorizada."""
+    pontos = np.asarray(pontos, dtype=np.float64)
+    lateralidades = tuple(lateralidades)
+    x = pontos[:, :, 0]
+    y = pontos[:, :, 1]
+    direita = np.array([lado == "Right" for lado in lateralidades], dtype=bool)
+
+    # Orientação: produto vetorial 2D de (P5 - P0) x (P17 - P0)
+    cruz = ((x[:, 5] - x[:, 0]) * (y[:, 17] - y[:, 0])
+            - (y[:, 5] - y[:, 0]) * (x[:, 17] - x[:, 0]))
+    palma = np.where(direita, cruz > 0, cruz < 0)
+
+    # Polegar: à esquerda do IP (x menor) na palma direita / costas esquerda,
+    # à direita (x maior) nos outros dois casos
+    polegar = np.where(direita == palma, x[:, 4] < x[:, 3], x[:, 4] > x[:, 3])
+    outros = y[:, PONTAS[1:]] < y[:, ARTICULACOES]
+    dedos = np.concatenate([polegar[:, None], outros], axis=1).astype(np.int8)
+
+    escala = np.sqrt((y[:, 0] - y[:, 9]) ** 2 + (x[:, 0] - x[:, 9]) ** 2)
+    distancia_ok = np.sqrt((x[:, 4] - x[:, 8]) ** 2 + (y[:, 4] - y[:, 8]) ** 2)
+
+    polegar_pra_cima = ((y[:, 4] < y[:, 3] - MARGEM_POLEGAR)
+                        & (y[:, 4] < y[:, 2] - MARGEM_POLEGAR))
+    fechados = y[:, PONTAS[1:]] > y[:, ARTICULACOES]
+
+    return CaracteristicasMaos(
+        pontos=pontos,
+        lateralidades=lateralidades,
+        palma=palma,
+        dedos=dedos,
+        total_dedos=dedos.sum(axis=1),
+        escala=escala,
+        distancia_ok=distancia_ok,
+        polegar_pra_cima=polegar_pra_cima,
+        fechados=fechados,
+        outros_fechados=fechados.all(axis=1),
+    )
+
+
+def caracteristicas_de_landmarks(lista_landmarks, lateralidades):
+    """Atalho: detecções do MediaPipe → CaracteristicasMaos."""
+    return extrair_caracteristicas(landmarks_para_array(lista_landmarks), lateralidades)
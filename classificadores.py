@@ -0,0 +1,538 @@
+"""
+Classificadores de gestos e expressões, sem dependência de Flask, câmera
+ou MediaPipe.
+
+Recebem as características extraídas por caracteristicas_mao (mãos) e os
+landmarks do Face Mesh (rosto) e devolvem rótulos. São usados pelos
+pipelines ao vivo do app_web e pelas ferramentas offline (processamento
+em lote, benchmarks), para que todos classifiquem exatamente igual.
+"""
+import math
+
+import numpy as np
+
+# Gestos que deixam a imagem de resposta para a expressão facial
+GESTOS_FRACOS = ("Nenhuma mao", "Punho Fechado", "Mao Aberta")
+
+# Histórico de posições para detecção de movimento (últimas N posições do pulso)
+HIST_MAX = 8
+# Filtro One-Euro do pulso (coordenadas normalizadas 0-1, cortes em Hz)
+ONE_EURO_CORTE_MIN = 1.0
+ONE_EURO_BETA = 10.0
+ONE_EURO_CORTE_DERIVADA = 2.0
+
+# Landmarks do Face Mesh para os olhos (índices MediaPipe 468+)
+# Olho direito: [33, 160, 158, 133, 153, 144]
+# Olho esquerdo: [362, 385, 387, 263, 373, 380]
+OLHO_DIREITO = [33, 160, 158, 133, 153, 144]
+OLHO_ESQUERDO = [362, 385, 387, 263, 373, 380]
+EAR_LIMIAR = 0.18  # abaixo deste valor, olhos estão fechados
+# Todos os pontos do Face Mesh lidos por classificar_expressao
+PONTOS_ROSTO_EXPRESSAO = tuple(sorted({10, 152, 234, 454, 13, 14, 61, 291}
+                                      | set(OLHO_DIREITO) | set(OLHO_ESQUERDO)))
+
+
+def contar_dedos(landmarks, lateralidade="Right", orientacao="Palma"):
+    pontas_dedos = [8, 12, 16, 20]
+    dedos_levantados = []
+
+    # Polegar
+    # A lógica do polegar inverte dependendo se é Palma ou Costas
+    if lateralidade == "Right":
+        if orientacao == "Palma":
+            # Palma: Polegar à esquerda (x menor)
+            if landmarks[4].x < landmarks[3].x: 
+                dedos_levantados.append(1)
+            else:
+                dedos_levantados.append(0)
+        else: # Costas
+            # Costas: Polegar à direita (x maior)
+            if landmarks[4].x > landmarks[3].x: 
+                dedos_levantados.append(1)
+            else:
+                dedos_levantados.append(0)
+    else: # Left
+        if orientacao == "Palma":
+            # Palma: Polegar à direita (x maior)
+            if landmarks[4].x > landmarks[3].x:
+                dedos_levantados.append(1)
+            else:
+                dedos_levantados.append(0)
+        else: # Costas
+            # Costas: Polegar à esquerda (x menor)
+            if landmarks[4].x < landmarks[3].x:
+                dedos_levantados.append(1)
+            else:
+                dedos_levantados.append(0)
+
+    # Outros dedos
+    for ponta in pontas_dedos:
+        if landmarks[ponta].y < landmarks[ponta - 2].y:
+            dedos_levantados.append(1)
+        else:
+            dedos_levantados.append(0)
+
+    return sum(dedos_levantados), dedos_levantados
+
+
+def calcular_ear(p, pontos_olho):
+    """Calcula Eye Aspect Ratio (EAR) para detectar olhos fechados.
+    pontos_olho: lista de 6 índices [p1, p2, p3, p4, p5, p6]
+    p1-p4 = cantos horizontais, p2-p6 e p3-p5 = pares verticais
+    """
+    # Distâncias verticais
+    v1 = ((p[pontos_olho[1]].x - p[pontos_olho[5]].x)**2 +
+          (p[pontos_olho[1]].y - p[pontos_olho[5]].y)**2)**0.5
+    v2 = ((p[pontos_olho[2]].x - p[pontos_olho[4]].x)**2 +
+          (p[pontos_olho[2]].y - p[pontos_olho[4]].y)**2)**0.5
+    # Distância horizontal
+    h = ((p[pontos_olho[0]].x - p[pontos_olho[3]].x)**2 +
+         (p[pontos_olho[0]].y - p[pontos_olho[3]].y)**2)**0.5
+    if h == 0:
+        return 0.3  # valor neutro para evitar divisão por zero
+    return (v1 + v2) / (2.0 * h)
+
+
+def classificar_expressao(face_landmarks):
+    """Classifica a expressão do rosto. Retorna o nome (Surpresa, Olhos Fechados, Sorriso ou Neutro)."""
+    # Pontos chave do rosto (MediaPipe Face Mesh)
+    # Lábio superior: 13, Lábio inferior: 14
+    # Canto esquerdo boca: 61, Canto direito boca: 291
+    # Topo rosto: 10, Queixo: 152 (para normalização vertical)
+    # Maçã do rosto esq: 234, Maçã do rosto dir: 454 (para normalização horizontal)
+    
+    p = face_landmarks.landmark
+    
+    # Altura do rosto (Vertical)
+    altura_rosto = p[152].y - p[10].y
+    
+    # Largura do rosto (Horizontal)
+    largura_rosto = p[454].x - p[234].x
+    
+    # 1. Abertura da boca (Surpresa) - Normalizado pela altura
+    abertura_boca = (p[14].y - p[13].y) / altura_rosto
+    
+    # 2. Largura da boca (Sorriso) - Normalizado pela largura do rosto
+    largura_boca = (p[291].x - p[61].x) / largura_rosto
+    
+    # 3. Detecção de olhos fechados via EAR (Eye Aspect Ratio)
+    ear_direito = calcular_ear(p, OLHO_DIREITO)
+    ear_esquerdo = calcular_ear(p, OLHO_ESQUERDO)
+    ear_medio = (ear_direito + ear_esquerdo) / 2.0
+    
+    if abertura_boca > 0.15: 
+        return "Surpresa"
+    elif ear_medio < EAR_LIMIAR:
+        return "Olhos Fechados"
+    elif largura_boca > 0.40: # Ajustado: > 40% da largura do rosto
+        return "Sorriso"
+    
+    return "Neutro"
+
+
+def classificar_gesto_principal(carac, i):
+    """Classifica o gesto da i-ésima mão para a página principal. Retorna (gesto, prioridade)."""
+    lista_dedos = carac.dedos[i]
+    total_dedos = int(carac.total_dedos[i])
+    polegar_pra_cima = bool(carac.polegar_pra_cima[i])
+    # Indicador, médio, anelar e mínimo dobrados
+    outros_dedos_fechados = bool(carac.outros_fechados[i])
+
+    indicador_levantado = lista_dedos[1] == 1
+    medio_levantado = lista_dedos[2] == 1
+    anelar_levantado = lista_dedos[3] == 1
+    minimo_levantado = lista_dedos[4] == 1
+
+    # --- Detecção de gestos (ordem de prioridade) ---
+
+    # OK: polegar e indicador formam círculo (distância normalizada pelo tamanho da mão)
+    if carac.distancia_ok[i] < (0.18 * carac.escala[i]) and (medio_levantado or anelar_levantado):
+        return "OK", 6
+
+    # LIKE: polegar SIGNIFICATIVAMENTE acima da base, outros fechados
+    if polegar_pra_cima and outros_dedos_fechados:
+        return "LIKE", 5
+
+    # Paz e Amor: indicador + médio levantados
+    if total_dedos == 2 and indicador_levantado and medio_levantado and not anelar_levantado and not minimo_levantado:
+        return "Paz e Amor", 4
+
+    # Rock: indicador + mindinho levantados
+    if indicador_levantado and minimo_levantado and not medio_levantado and not anelar_levantado:
+        return "Rock", 4
+
+    # Apontar: só indicador levantado
+    if total_dedos == 1 and indicador_levantado:
+        return "Apontando", 2
+
+    # Mão Aberta: todos os dedos levantados
+    if total_dedos == 5:
+        return "Mao Aberta", 3
+
+    # Punho Fechado: todos os dedos fechados (sem polegar pra cima)
+    if outros_dedos_fechados and not polegar_pra_cima:
+        return "Punho Fechado", 1
+
+    return f"Dedos: {total_dedos}", 0
+
+
+def classificar_gesto_musica(carac, i):
+    """Classifica o gesto da i-ésima mão para a página de música. Retorna (gesto, prioridade, dados_extra)."""
+    orientacao = carac.orientacao(i)
+    lista_dedos = carac.lista_dedos(i)
+    total_dedos = int(carac.total_dedos[i])
+
+    escala_mao = carac.escala[i]
+    distancia_ok = carac.distancia_ok[i]
+    polegar_pra_cima = bool(carac.polegar_pra_cima[i])
+
+    indicador_fechado, medio_fechado, anelar_fechado, minimo_fechado = carac.fechados[i].tolist()
+    outros_dedos_fechados = bool(carac.outros_fechados[i])
+
+    indicador_levantado = lista_dedos[1] == 1
+    medio_levantado = lista_dedos[2] == 1
+    anelar_levantado = lista_dedos[3] == 1
+    minimo_levantado = lista_dedos[4] == 1
+    polegar_levantado = lista_dedos[0] == 1
+
+    # Dados extras (orientação, ângulo do pulso etc.)
+    dados = {"orientacao": orientacao, "dedos": total_dedos, "lista_dedos": lista_dedos}
+
+    # --- Gestos de alta prioridade (comandos) ---
+    if distancia_ok < (0.18 * escala_mao) and (lista_dedos[2] == 1 or lista_dedos[3] == 1):
+        return "OK", 7, dados
+
+    if polegar_pra_cima and outros_dedos_fechados:
+        return "LIKE", 6, dados
+
+    # --- Gesto "Hang Loose" / "Telefone" (polegar + mindinho, outros fechados) ---
+    if polegar_levantado and minimo_levantado and indicador_fechado and medio_fechado and anelar_fechado:
+        return "Hang Loose", 5, dados
+
+    # --- Rock: indicador + mindinho ---
+    if indicador_levantado and minimo_levantado and not medio_levantado and not anelar_levantado:
+        return "Rock", 5, dados
+
+    # --- Paz e Amor: indicador + médio ---
+    if total_dedos == 2 and indicador_levantado and medio_levantado and not anelar_levantado and not minimo_levantado:
+        return "Paz e Amor", 4, dados
+
+    # --- Três dedos: indicador + médio + anelar ---
+    if indicador_levantado and medio_levantado and anelar_levantado and not minimo_levantado and not polegar_levantado:
+        return "Tres Dedos", 4, dados
+
+    # --- Quatro dedos: indicador + médio + anelar + mindinho (sem polegar) ---
+    if indicador_levantado and medio_levantado and anelar_levantado and minimo_levantado and not polegar_levantado:
+        return "Quatro Dedos", 3, dados
+
+    # --- Números explícitos (1-5) baseados em contagem de dedos ---
+    if total_dedos == 1 and indicador_levantado:
+        return "Num1", 3, dados
+
+    if total_dedos == 2 and indicador_levantado and medio_levantado:
+        return "Paz e Amor", 4, dados  # já coberto acima
+
+    if total_dedos == 3:
+        return "Num3", 3, dados
+
+    if total_dedos == 4:
+        return "Num4", 3, dados
+
+    if total_dedos == 5:
+        return "Num5", 3, dados
+
+    # --- Mão aberta = 5 (coberto por Num5) ---
+
+    # --- Punho Fechado ---
+    if outros_dedos_fechados and not polegar_pra_cima:
+        return "Punho Fechado", 1, dados
+
+    return "Nenhum", 0, dados
+
+
+class RastreadorMovimento:
+    """Últimas posições de um pulso num anel NumPy pré-alocado, filtradas por One-Euro.
+
+    O filtro One-Euro (Casiez et al., 2012) suaviza a posição com um corte
+    que sobe com a velocidade (a derivada filtrada do próprio filtro): parado
+    tira o tremor, rápido segue a mão sem atraso. A janela guarda as posições
+    filtradas (x, y, t) e é analisada inteira com NumPy; a velocidade é a
+    inclinação de mínimos quadrados sobre todos os pontos, não só o primeiro
+    e o último.
+    """
+
+    def __init__(self, janela=HIST_MAX, corte_min=ONE_EURO_CORTE_MIN, beta=ONE_EURO_BETA,
+                 corte_derivada=ONE_EURO_CORTE_DERIVADA):
+        if janela < 3:
+            raise ValueError("A janela de movimento precisa de pelo menos 3 amostras.")
+        self.janela = janela
+        self.corte_min = corte_min
+        self.beta = beta
+        self.corte_derivada = corte_derivada
+        # x, y filtrados, t (relativo a _t0) e 1: anel.T @ anel dá todas as somas do ajuste
+        self._anel = np.ones((janela, 4))
+        self.limpar()
+
+    def limpar(self):
+        self._n = 0
+        self._proximo = 0
+        self._t = None
+        self._t0 = 0.0
+        self._resultado = ("Parado", 0.0)
+
+    def __len__(self):
+        return self._n
+
+    @staticmethod
+    def _alfa(te, corte):
+        return 1.0 / (1.0 + 1.0 / (2 * math.pi * corte * te))
+
+    def _filtrar(self, x, y, agora):
+        """Um passo do One-Euro; atualiza posição e derivada filtradas."""
+        if self._t is None:
+            self._t0 = agora
+            self._bruto_x, self._bruto_y = x, y  # última amostra sem filtro
+            self._x, self._y = x, y
+            self._vx = self._vy = 0.0
+            return True
+        te = agora - self._t
+        if te == 0:
+            return False
+        if te < 0:  # relógio voltou (outra gravação, outra fonte): recomeça
+            self.limpar()
+            return self._filtrar(x, y, agora)
+        vx = (x - self._bruto_x) / te
+        vy = (y - self._bruto_y) / te
+        self._bruto_x, self._bruto_y = x, y
+        if self._n == 1:
+            self._vx, self._vy = vx, vy  # sem histórico: parte da primeira diferença
+        else:
+            a = self._alfa(te, self.corte_derivada)
+            self._vx += a * (vx - self._vx)
+            self._vy += a * (vy - self._vy)
+        a = self._alfa(te, self.corte_min + self.beta * math.hypot(self._vx, self._vy))
+        self._x += a * (x - self._x)
+        self._y += a * (y - self._y)
+        return True
+
+    def atualizar(self, x, y, agora):
+        """Nova amostra do pulso. Retorna (direcao, velocidade)."""
+        if not self._filtrar(x, y, agora):
+            return self._resultado  # timestamp repetido: mesma amostra
+        self._t = agora
+        if agora - self._t0 > 600:  # tempos relativos pequenos mantêm as somas precisas
+            self._anel[:self._n, 2] -= agora - self._t0
+            self._t0 = agora
+        self._anel[self._proximo, :3] = (self._x, self._y, agora - self._t0)
+        self._proximo = (self._proximo + 1) % self.janela
+        self._n = min(self._n + 1, self.janela)
+        self._resultado = self._classificar()
+        return self._resultado
+
+    def _classificar(self):
+        if self._n < 3:
+            return "Parado", 0.0
+        # Janela em ordem cronológica (o mais antigo fica em _proximo quando o anel está cheio)
+        inicio = self._proximo if self._n == self.janela else 0
+        mais_antigo = self._anel[inicio].tolist()
+        mais_novo = self._anel[self._proximo - 1].tolist()
+        dt = mais_novo[2] - mais_antigo[2]
+        if dt < 0.05:
+            return "Parado", 0.0
+
+        # Velocidade: inclinação de mínimos quadrados de (x, y) no tempo sobre a janela toda
+        janela = self._anel[:self._n]
+        somas = (janela.T @ janela).tolist()
+        n, soma_t = somas[3][3], somas[2][3]
+        variancia_t = n * somas[2][2] - soma_t * soma_t
+        vx = (n * somas[0][2] - somas[0][3] * soma_t) / variancia_t
+        vy = (n * somas[1][2] - somas[1][3] * soma_t) / variancia_t
+        velocidade = round(math.hypot(vx, vy), 3)
+        dx = mais_novo[0] - mais_antigo[0]
+        dy = mais_novo[1] - mais_antigo[1]
+        dist = math.hypot(dx, dy)
+
+        # Limiar mínimo de movimento (normalizado 0-1)
+        if dist < 0.06:
+            return "Parado", velocidade
+
+        # Determinar direção dominante
+        if abs(dx) > abs(dy):
+            direcao = "Direita" if dx > 0 else "Esquerda"
+        else:
+            direcao = "Baixo" if dy > 0 else "Cima"
+
+        # Movimento circular: a janela varia muito nos dois eixos
+        if dist > 0.1 and abs(dx) > 0.04 and abs(dy) > 0.04:
+            var_x, var_y = np.ptp(janela[:, :2], axis=0).tolist()
+            if var_x > 0.08 and var_y > 0.08 and abs(var_x - var_y) < 0.15:
+                direcao = "Circular"
+
+        # Movimento rápido (swing/shake)
+        if velocidade > 1.5:
+            direcao = "Rapido " + direcao
+
+        return direcao, velocidade
+
+
+def detectar_movimento(historico, lateralidade, x, y, agora):
+    """Detecta direção e velocidade do movimento baseado no histórico de posições.
+
+    historico: dict lateralidade -> RastreadorMovimento, ver novo_historico_movimento().
+    agora: timestamp da amostra (captura do frame, relógio injetável).
+    """
+    rastreador = historico.get(lateralidade)
+    if rastreador is None:
+        rastreador = historico[lateralidade] = RastreadorMovimento()
+    return rastreador.atualizar(x, y, agora)
+
+
+def classificar_gesto_combinado(gesto_dir, gesto_esq, mov_dir, mov_esq, vel_dir, vel_esq, dedos_dir, dedos_esq):
+    """Detecta gestos combinados de duas mãos."""
+    # Ambas mãos com Punho Fechado = "Double Kick"
+    if gesto_dir == "Punho Fechado" and gesto_esq == "Punho Fechado":
+        return "Double Kick"
+
+    # Ambas mãos abertas (5+5) = "Palmas" (clap)
+    if gesto_dir == "Num5" and gesto_esq == "Num5":
+        return "Palmas"
+
+    # Rock em ambas = "Double Rock"
+    if gesto_dir == "Rock" and gesto_esq == "Rock":
+        return "Double Rock"
+
+    # Ambas mãos com Paz e Amor = "Double Peace"
+    if gesto_dir == "Paz e Amor" and gesto_esq == "Paz e Amor":
+        return "Double Peace"
+
+    # Uma mão Punho + outra Mão Aberta = "Punch Clap"
+    if (gesto_dir == "Punho Fechado" and gesto_esq == "Num5") or \
+       (gesto_dir == "Num5" and gesto_esq == "Punho Fechado"):
+        return "Punch Clap"
+
+    # Ambos apontando = "DJ Mode"
+    if gesto_dir == "Num1" and gesto_esq == "Num1":
+        return "DJ Mode"
+
+    # Ambas mãos se movendo rápido = "Shake"
+    if vel_dir > 1.2 and vel_esq > 1.2:
+        return "Shake"
+
+    # Mãos se movendo em direções opostas horizontalmente = "Scratch"
+    if ("Esquerda" in mov_dir and "Direita" in mov_esq) or \
+       ("Direita" in mov_dir and "Esquerda" in mov_esq):
+        if vel_dir > 0.5 and vel_esq > 0.5:
+            return "Scratch"
+
+    # Ambas para cima = "Rise"
+    if "Cima" in mov_dir and "Cima" in mov_esq and vel_dir > 0.4 and vel_esq > 0.4:
+        return "Rise"
+
+    # Ambas para baixo = "Drop"
+    if "Baixo" in mov_dir and "Baixo" in mov_esq and vel_dir > 0.4 and vel_esq > 0.4:
+        return "Drop"
+
+    # Circular em qualquer mão = "Spin"
+    if "Circular" in mov_dir or "Circular" in mov_esq:
+        return "Spin"
+
+    # Hang Loose em ambas = "Aloha"
+    if gesto_dir == "Hang Loose" and gesto_esq == "Hang Loose":
+        return "Aloha"
+
+    # Soma de dedos como controle
+    total = dedos_dir + dedos_esq
+    if total >= 8 and gesto_dir not in ("OK", "LIKE", "Rock", "Hang Loose") and \
+       gesto_esq not in ("OK", "LIKE", "Rock", "Hang Loose"):
+        return f"Total {total}"
+
+    return "Nenhum"
+
+
+def analisar_maos_principal(carac):
+    """Classifica todas as mãos para a página principal.
+
+    Retorna (gestos, gesto_detectado, gesto_principal), com gestos uma lista
+    de (lateralidade, orientacao, gesto, prioridade) na ordem das mãos.
+    """
+    gestos = []
+    gestos_lista = []
+    maior_prioridade = -1
+    gesto_principal = "Nenhuma mao"
+
+    for i, lateralidade in enumerate(carac.lateralidades):
+        orientacao = carac.orientacao(i)
+        gesto, prioridade = classificar_gesto_principal(carac, i)
+        gestos.append((lateralidade, orientacao, gesto, prioridade))
+        gestos_lista.append(f"{lateralidade} ({orientacao}): {gesto}")
+
+        if prioridade > maior_prioridade:
+            maior_prioridade = prioridade
+            gesto_principal = gesto
+
+    gesto_detectado = " | ".join(gestos_lista) if gestos_lista else "Nenhuma mao"
+    return gestos, gesto_detectado, gesto_principal
+
+
+def novo_historico_movimento(janela=HIST_MAX):
+    return {
+        "Right": RastreadorMovimento(janela),
+        "Left": RastreadorMovimento(janela)
+    }
+
+
+def analisar_musica(carac, expressao, historico, agora):
+    """Estado da página de música para um frame (mesmas chaves de estado_musica)."""
+    gesto_dir = "Nenhum"
+    gesto_esq = "Nenhum"
+    pos_dir = {"x": 0.5, "y": 0.5}
+    pos_esq = {"x": 0.5, "y": 0.5}
+    dedos_dir = 0
+    dedos_esq = 0
+    mov_dir = "Parado"
+    mov_esq = "Parado"
+    vel_dir = 0.0
+    vel_esq = 0.0
+
+    for i, lateralidade in enumerate(carac.lateralidades):
+        gesto, _, dados = classificar_gesto_musica(carac, i)
+        total = dados.get("dedos", 0)
+
+        pulso_x, pulso_y = carac.pulso(i)
+        pos = {"x": round(pulso_x, 3), "y": round(pulso_y, 3)}
+
+        # Detectar movimento
+        mov, vel = detectar_movimento(historico, lateralidade, pulso_x, pulso_y, agora)
+
+        if lateralidade == "Right":
+            gesto_dir = gesto
+            pos_dir = pos
+            dedos_dir = total
+            mov_dir = mov
+            vel_dir = vel
+        else:
+            gesto_esq = gesto
+            pos_esq = pos
+            dedos_esq = total
+            mov_esq = mov
+            vel_esq = vel
+
+    # Classificar gesto combinado de duas mãos
+    gesto_combinado = classificar_gesto_combinado(
+        gesto_dir, gesto_esq, mov_dir, mov_esq, vel_dir, vel_esq, dedos_dir, dedos_esq
+    )
+
+    return {
+        "gesto_direita": gesto_dir,
+        "gesto_esquerda": gesto_esq,
+        "pos_direita": pos_dir,
+        "pos_esquerda": pos_esq,
+        "expressao": expressao,
+        "dedos_direita": dedos_dir,
+        "dedos_esquerda": dedos_esq,
+        "gesto_combinado": gesto_combinado,
+        "movimento_direita": mov_dir,
+        "movimento_esquerda": mov_esq,
+        "velocidade_direita": vel_dir,
+        "velocidade_esquerda": vel_esq
+    }
@@ -0,0 +1,270 @@
+"""
+Fontes de frames para a thread de captura.
+
+Todas seguem a interface do cv2.VideoCapture usada pelo app (isOpened,
+read, release), então a captura não distingue uma webcam de um vídeo em
+loop, de uma pasta de imagens ou de frames sintéticos. Isso permite rodar
+e medir o pipeline completo em máquinas sem câmera (staging, CI).
+
+Uma fonte é descrita por uma string:
+    camera:0                  câmera pelo índice
+    video:/caminho/clip.mp4   vídeo em loop
+    imagens:/caminho/pasta    sequência de imagens em loop (ordem alfabética)
+    sintetica[:640x480]       frames gerados (gradiente + círculo em movimento)
+
+O ritmo das fontes gravadas é "tempo_real" (respeita o FPS do vídeo ou o
+FPS configurado) ou "maximo" (entrega o próximo frame imediatamente, para
+medir throughput).
+"""
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+try:
+    import cv2
+    import numpy as np
+except ImportError:
+    cv2 = None
+    np = None
+
+RITMOS = ("tempo_real", "maximo")
+FPS_PADRAO = 30.0
+EXTENSOES_IMAGEM = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+CACHE_IMAGENS = 64  # imagens decodificadas mantidas em memória (as mais recentes)
+
+
+class FonteFrames(ABC):
+    """Interface comum (compatível com cv2.VideoCapture)."""
+
+    tipo = "abstrata"
+
+    def __init__(self, descricao):
+        self.descricao = descricao
+        # Relógio do frame mais recente (None = usar o horário da captura)
+        self.timestamp_frame = None
+
+    @abstractmethod
+    def isOpened(self):
+        """True se a fonte pode entregar frames."""
+
+    @abstractmethod
+    def read(self):
+        """Retorna (sucesso, frame BGR)."""
+
+    def release(self):
+        pass
+
+
+class FonteCamera(FonteFrames):
+    """Câmera física pelo índice (DirectShow primeiro, depois o backend padrão)."""
+
+    tipo = "camera"
+
+    def __init__(self, indice):
+        super().__init__(f"camera:{indice}")
+        self.indice = indice
+        self._cap = cv2.VideoCapture(indice, cv2.CAP_DSHOW)
+        if not self._cap.isOpened():
+            self._cap.release()
+            self._cap = cv2.VideoCapture(indice)
+
+    def isOpened(self):
+        return self._cap.isOpened()
+
+    def read(self):
+        return self._cap.read()
+
+    def release(self):
+        self._cap.release()
+
+
+class _FonteGravada(FonteFrames):
+    """Base das fontes com ritmo próprio (vídeo, imagens, sintética)."""
+
+    def __init__(self, descricao, fps, ritmo):
+        if ritmo not in RITMOS:
+            raise ValueError(f"Ritmo inválido: {ritmo} (use {' ou '.join(RITMOS)})")
+        super().__init__(descricao)
+        self.fps = fps if fps and fps > 0 else FPS_PADRAO
+        self.ritmo = ritmo
+        self.frames_entregues = 0
+        self._inicio = time.time()
+        self._proximo = None
+
+    def _aguardar_vez(self):
+        """Deadline por frame no modo tempo real; atrasos não se acumulam."""
+        if self.ritmo != "tempo_real":
+            return
+        agora = time.monotonic()
+        if self._proximo is None or agora - self._proximo > 1.0 / self.fps:
+            self._proximo = agora
+        espera = self._proximo - agora
+        if espera > 0:
+            time.sleep(espera)
+        self._proximo += 1.0 / self.fps
+
+    def _entregue(self):
+        # Relógio da mídia: no modo máximo o tempo "passa" no FPS da fonte,
+        # então movimento e velocidade continuam coerentes.
+        self.timestamp_frame = self._inicio + self.frames_entregues / self.fps
+        self.frames_entregues += 1
+
+
+class FonteVideo(_FonteGravada):
+    """Arquivo de vídeo em loop."""
+
+    tipo = "video"
+
+    def __init__(self, caminho, ritmo="tempo_real", fps=None, loop=True):
+        self._cap = cv2.VideoCapture(caminho)
+        fps_arquivo = self._cap.get(cv2.CAP_PROP_FPS) if self._cap.isOpened() else 0
+        super().__init__(f"video:{caminho}", fps or fps_arquivo, ritmo)
+        self.caminho = caminho
+        self.loop = loop
+
+    def isOpened(self):
+        return self._cap.isOpened()
+
+    def read(self):
+        self._aguardar_vez()
+        sucesso, frame = self._cap.read()
+        if not sucesso and self.loop:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            sucesso, frame = self._cap.read()
+        if sucesso:
+            self._entregue()
+        return sucesso, frame
+
+    def release(self):
+        self._cap.release()
+
+
+class FonteImagens(_FonteGravada):
+    """Pasta de imagens em loop, decodificadas na leitura.
+
+    A abertura só lista os arquivos com extensão de imagem; read() decodifica
+    sob demanda e guarda as últimas CACHE_IMAGENS (uma pasta pequena gira
+    toda da memória). Arquivos que não decodificam são pulados.
+    """
+
+    tipo = "imagens"
+
+    def __init__(self, pasta, ritmo="tempo_real", fps=None, loop=True, cache=CACHE_IMAGENS):
+        super().__init__(f"imagens:{pasta}", fps, ritmo)
+        self.pasta = pasta
+        self.loop = loop
+        self._nomes = []
+        if os.path.isdir(pasta):
+            self._nomes = sorted(n for n in os.listdir(pasta) if n.lower().endswith(EXTENSOES_IMAGEM))
+        self._cache = OrderedDict()  # índice -> frame decodificado
+        self._cache_max = max(1, cache)
+        self._indice = 0
+
+    def isOpened(self):
+        return bool(self._nomes)
+
+    def _decodificar(self, indice):
+        frame = self._cache.get(indice)
+        if frame is not None:
+            self._cache.move_to_end(indice)
+            return frame
+        frame = cv2.imread(os.path.join(self.pasta, self._nomes[indice]))
+        if frame is not None:
+            self._cache[indice] = frame
+            if len(self._cache) > self._cache_max:
+                self._cache.popitem(last=False)
+        return frame
+
+    def read(self):
+        # Uma volta inteira sem nenhuma imagem válida encerra a fonte
+        for _ in range(len(self._nomes)):
+            if self._indice >= len(self._nomes) and not self.loop:
+                break
+            frame = self._decodificar(self._indice % len(self._nomes))
+            self._indice += 1
+            if frame is None:
+                continue
+            self._aguardar_vez()
+            # O mesmo array do cache pode voltar na próxima volta: a captura
+            # espelha o frame (cópia) antes de publicá-lo, então ele nunca é alterado.
+            self._entregue()
+            return True, frame
+        return False, None
+
+
+class FonteSintetica(_FonteGravada):
+    """Frames gerados: gradiente fixo com um círculo em movimento e o número do frame."""
+
+    tipo = "sintetica"
+
+    def __init__(self, largura=640, altura=480, ritmo="tempo_real", fps=None):
+        super().__init__(f"sintetica:{largura}x{altura}", fps, ritmo)
+        self.largura = largura
+        self.altura = altura
+        gradiente_x = np.linspace(0, 255, largura, dtype=np.uint8)
+        gradiente_y = np.linspace(0, 255, altura, dtype=np.uint8)
+        self._fundo = np.dstack([
+            np.tile(gradiente_x, (altura, 1)),
+            np.tile(gradiente_y[:, None], (1, largura)),
+            np.full((altura, largura), 96, dtype=np.uint8)
+        ])
+        self._aberta = True
+
+    def isOpened(self):
+        return self._aberta
+
+    def read(self):
+        if not self._aberta:
+            return False, None
+        self._aguardar_vez()
+        frame = self._fundo.copy()
+        n = self.frames_entregues
+        centro = (int(self.largura / 2 + self.largura / 3 * np.cos(n / 20)),
+                  int(self.altura / 2 + self.altura / 3 * np.sin(n / 20)))
+        cv2.circle(frame, centro, 40, (255, 255, 255), -1)
+        cv2.putText(frame, f"#{n}", (20, self.altura - 20), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+        self._entregue()
+        return True, frame
+
+    def release(self):
+        self._aberta = False
+
+
+def interpretar(especificacao):
+    """"tipo:argumento" → (tipo, argumento). Levanta ValueError se inválida."""
+    tipo, _, argumento = str(especificacao).partition(":")
+    tipo = tipo.strip().lower()
+    if tipo == "camera":
+        try:
+            return tipo, int(argumento or 0)
+        except ValueError:
+            raise ValueError(f"Índice de câmera inválido: {argumento}")
+    if tipo in ("video", "imagens"):
+        if not argumento:
+            raise ValueError(f"Fonte '{tipo}' precisa de um caminho (ex.: {tipo}:/caminho)")
+        return tipo, argumento
+    if tipo == "sintetica":
+        if not argumento:
+            return tipo, (640, 480)
+        largura, _, altura = argumento.lower().partition("x")
+        try:
+            return tipo, (int(largura), int(altura))
+        except ValueError:
+            raise ValueError(f"Resolução inválida: {argumento} (use LxA, ex.: 640x480)")
+    raise ValueError(f"Fonte desconhecida: {especificacao} (use camera, video, imagens ou sintetica)")
+
+
+def criar_fonte(especificacao, ritmo="tempo_real", fps=None):
+    """Cria a fonte descrita pela string. Quem chama verifica isOpened()."""
+    if cv2 is None:
+        raise RuntimeError("OpenCV indisponível")
+    tipo, argumento = interpretar(especificacao)
+    if tipo == "camera":
+        return FonteCamera(argumento)
+    if tipo == "video":
+        return FonteVideo(argumento, ritmo=ritmo, fps=fps)
+    if tipo == "imagens":
+        return FonteImagens(argumento, ritmo=ritmo, fps=fps)
+    largura, altura = argumento
+    return FonteSintetica(largura, altura, ritmo=ritmo, fps=fps)
@@ -0,0 +1,174 @@
+"""
+Gravação e leitura de sessões de landmarks num arquivo binário mapeável.
+
+Cada frame vira um registro de tamanho fixo (numpy structured dtype):
+seq, timestamp da captura, até duas mãos (21 pontos x, y, z em float32 —
+a mesma precisão que o MediaPipe entrega), lateralidade de cada mão e os
+pontos do rosto usados pela classificação de expressão. O arquivo tem um
+cabeçalho de 256 bytes seguido dos registros, então pode ser aberto com
+np.memmap sem carregar nada e cresce por append. Cada registro vai para o
+arquivo num write() sem buffer, então um processo morto no meio da
+gravação perde no máximo o último registro incompleto (a queda da máquina
+depende do cache do sistema operacional, que não é sincronizado a cada
+frame).
+
+Uma hora a 30 fps ocupa cerca de 75 MB.
+"""
+import os
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+import caracteristicas_mao
+import classificadores
+
+MAGICO = b"VSLMK001"
+TAMANHO_CABECALHO = 256
+MAX_MAOS = 2
+LATERALIDADES = ("Right", "Left")
+
+PontoGravado = namedtuple("PontoGravado", "x y z")
+PontoRosto = namedtuple("PontoRosto", "x y")  # o rosto é gravado só em 2D
+
+
+class LandmarksGravados:
+    """Imita NormalizedLandmarkList: .landmark indexável por índice do MediaPipe."""
+    __slots__ = ("landmark",)
+
+    def __init__(self, landmark):
+        self.landmark = landmark
+
+
+class MaoGravada:
+    """Mão reproduzida; .landmark só é montado se alguém desenhar a mão."""
+    __slots__ = ("pontos",)
+
+    def __init__(self, pontos):
+        self.pontos = pontos  # array (21, 3)
+
+    @property
+    def landmark(self):
+        return [PontoGravado._make(p) for p in self.pontos.tolist()]
+
+
+# Frame reproduzido: caracteristicas já calculadas para as mãos do frame
+FrameGravado = namedtuple(
+    "FrameGravado", "seq timestamp lateralidades maos rosto rosto_atualizado caracteristicas"
+)
+
+
+def dtype_frame(n_pontos_rosto):
+    return np.dtype([
+        ("seq", "<u4"),
+        ("timestamp", "<f8"),
+        ("n_maos", "u1"),
+        ("lateralidade", "u1", (MAX_MAOS,)),  # índice em LATERALIDADES
+        ("tem_rosto", "u1"),
+        ("rosto_atualizado", "u1"),
+        ("maos", "<f4", (MAX_MAOS, 21, 3)),
+        ("rosto", "<f4", (n_pontos_rosto, 2)),
+    ])
+
+
+class GravadorLandmarks:
+    """Escreve um registro por frame (usar a partir de uma única thread)."""
+
+    def __init__(self, caminho, indices_rosto=classificadores.PONTOS_ROSTO_EXPRESSAO):
+        self.caminho = caminho
+        self.indices_rosto = tuple(indices_rosto)
+        self.dtype = dtype_frame(len(self.indices_rosto))
+        self.frames = 0
+        self._registro = np.zeros(1, dtype=self.dtype)
+
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        # Sem buffer: um write() por registro (~600 bytes a 30 fps), nada fica retido no processo
+        self._arquivo = open(caminho, "wb", buffering=0)
+        cabecalho = MAGICO + struct.pack("<H", len(self.indices_rosto))
+        cabecalho += struct.pack(f"<{len(self.indices_rosto)}H", *self.indices_rosto)
+        self._arquivo.write(cabecalho.ljust(TAMANHO_CABECALHO, b"\0"))
+
+    def gravar(self, seq, timestamp, pontos_maos, lateralidades, rosto=None, rosto_atualizado=True):
+        """pontos_maos: array (n, 21, 3); rosto: landmarks do Face Mesh ou None."""
+        registro = self._registro[0]
+        n = min(len(lateralidades), MAX_MAOS)
+        registro["seq"] = seq
+        registro["timestamp"] = timestamp
+        registro["n_maos"] = n
+        registro["lateralidade"] = [LATERALIDADES.index(lado) for lado in lateralidades[:n]] + [0] * (MAX_MAOS - n)
+        registro["maos"] = 0
+        if n:
+            registro["maos"][:n] = pontos_maos[:n]
+        registro["tem_rosto"] = rosto is not None
+        registro["rosto_atualizado"] = bool(rosto_atualizado)
+        if rosto is not None:
+            pontos = rosto.landmark
+            registro["rosto"] = [(pontos[i].x, pontos[i].y) for i in self.indices_rosto]
+        else:
+            registro["rosto"] = 0
+        self._arquivo.write(self._registro.tobytes())
+        self.frames += 1
+
+    def fechar(self):
+        self._arquivo.close()
+
+
+class LeitorLandmarks:
+    """Abre uma gravação via np.memmap; iterar devolve FrameGravado em ordem."""
+
+    def __init__(self, caminho, lote=4096):
+        self.caminho = caminho
+        self.lote = lote
+        with open(caminho, "rb") as arquivo:
+            cabecalho = arquivo.read(TAMANHO_CABECALHO)
+        if len(cabecalho) < TAMANHO_CABECALHO or not cabecalho.startswith(MAGICO):
+            raise ValueError(f"{caminho} não é uma gravação de landmarks")
+        (n_rosto,) = struct.unpack_from("<H", cabecalho, len(MAGICO))
+        self.indices_rosto = struct.unpack_from(f"<{n_rosto}H", cabecalho, len(MAGICO) + 2)
+        self.dtype = dtype_frame(n_rosto)
+
+        total = (os.path.getsize(caminho) - TAMANHO_CABECALHO) // self.dtype.itemsize
+        if total > 0:
+            self.frames = np.memmap(caminho, dtype=self.dtype, mode="r",
+                                    offset=TAMANHO_CABECALHO, shape=(total,))
+        else:
+            self.frames = np.zeros(0, dtype=self.dtype)
+
+    def __len__(self):
+        return len(self.frames)
+
+    def duracao(self):
+        if len(self.frames) < 2:
+            return 0.0
+        return float(self.frames["timestamp"][-1] - self.frames["timestamp"][0])
+
+    def _rosto(self, registro):
+        if not registro["tem_rosto"]:
+            return None
+        return LandmarksGravados(dict(zip(self.indices_rosto, map(PontoRosto._make, registro["rosto"].tolist()))))
+
+    def __iter__(self):
+        """Características calculadas em lote (todas as mãos de até `lote` frames de uma vez)."""
+        for inicio in range(0, len(self.frames), self.lote):
+            bloco = np.asarray(self.frames[inicio:inicio + self.lote])
+            n_maos = bloco["n_maos"].astype(np.intp)
+            mascara = np.arange(MAX_MAOS)[None, :] < n_maos[:, None]
+            pontos = bloco["maos"][mascara].astype(np.float64)
+            lateralidades = [LATERALIDADES[i] for i in bloco["lateralidade"][mascara].tolist()]
+            carac = caracteristicas_mao.extrair_caracteristicas(pontos, lateralidades)
+
+            fim_mao = np.cumsum(n_maos)
+            for k, registro in enumerate(bloco):
+                a, b = int(fim_mao[k] - n_maos[k]), int(fim_mao[k])
+                maos = tuple(MaoGravada(pontos[j]) for j in range(a, b))
+                yield FrameGravado(
+                    seq=int(registro["seq"]),
+                    timestamp=float(registro["timestamp"]),
+                    lateralidades=tuple(lateralidades[a:b]),
+                    maos=maos,
+                    rosto=self._rosto(registro),
+                    rosto_atualizado=bool(registro["rosto_atualizado"]),
+                    caracteristicas=carac.fatia(a, b),
+                )
@@ -0,0 +1,310 @@
+"""
+Linha do tempo de gestos e expressões: log colunar, só de append, em
+segmentos mapeáveis.
+
+Cada evento é um intervalo fechado: uma trilha (categoria + lado da mão)
+ficou com um valor (ex.: "Joinha", "Sorriso", "Palmas") de `inicio` até
+`inicio + duracao`. O evento é gravado quando o valor muda, então a
+duração já vem calculada e nenhuma consulta precisa de frames.
+
+Um segmento é uma pasta com um arquivo por coluna (little-endian cru, sem
+cabeçalho): inicio f8 (epoch em segundos), duracao f4, categoria u1, lado
+u1 e valor u2 (índice no dicionário valores.json da linha do tempo). As
+colunas são abertas com np.memmap; o número de eventos de um segmento é o
+da coluna mais curta, então uma escrita interrompida perde no máximo o
+último evento. O segmento gira ao atingir `eventos_por_segmento` eventos ou
+`segundos_por_segmento` de idade, e os mais antigos além de
+`max_segmentos` são apagados.
+
+Cerca de 16 bytes por evento: um dia com uma troca de gesto por segundo
+cabe em 1,4 MB.
+
+registrar() só enfileira o evento: uma thread escritora grava os eventos
+pendentes em lote (um write e um flush por coluna por lote, valores.json
+reescrito no máximo uma vez por lote), fora do loop de frames.
+"""
+import json
+import math
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+
+COLUNAS = (
+    ("inicio", "<f8"),
+    ("duracao", "<f4"),
+    ("categoria", "u1"),
+    ("lado", "u1"),
+    ("valor", "<u2"),
+)
+CATEGORIAS = ("gesto_principal", "gesto_musica", "combo", "expressao")
+LADOS = ("", "Right", "Left")
+# Valores que encerram o intervalo anterior mas não viram evento
+VALORES_NEUTROS = frozenset({"Nenhum", "Nenhuma mao", "Neutro"})
+MAX_BALDES = 1440  # um dia em baldes de um minuto
+
+_PREFIXO_SEGMENTO = "seg_"
+
+
+class LinhaTempo:
+    """Registra transições de trilhas e responde agregações por intervalo.
+
+    observar() e fechar_trilhas() recebem o dicionário de trilhas abertas do
+    chamador (um por sessão); o log em disco é compartilhado, gravado pela
+    thread escritora e protegido por um lock.
+    """
+
+    def __init__(self, pasta, eventos_por_segmento=1 << 16, segundos_por_segmento=3600.0,
+                 max_segmentos=168, relogio=time.time):
+        self.pasta = pasta
+        self.eventos_por_segmento = eventos_por_segmento
+        self.segundos_por_segmento = segundos_por_segmento
+        self.max_segmentos = max_segmentos
+        self.relogio = relogio
+        self.eventos = 0
+        self._lock = threading.Lock()
+        self._arquivos = None  # colunas do segmento aberto
+        self._segmento = None
+        self._segmento_criado = 0.0
+        self._segmento_eventos = 0
+        self._faixas = {}  # segmento fechado -> (n, menor inicio, maior inicio)
+        self._pendentes = []  # eventos ainda não gravados (inicio, duracao, categoria, lado, valor)
+        self._gravando = False
+        self._cond = threading.Condition()
+        self._thread = None
+
+        os.makedirs(pasta, exist_ok=True)
+        self._caminho_valores = os.path.join(pasta, "valores.json")
+        try:
+            with open(self._caminho_valores, encoding="utf-8") as arquivo:
+                self._valores = json.load(arquivo)
+        except (OSError, ValueError):
+            self._valores = []
+        self._codigos = {valor: i for i, valor in enumerate(self._valores)}
+        self._valores_salvos = len(self._valores)
+
+    # --- Escrita ---
+    def observar(self, abertas, categoria, lado, valor, agora=None):
+        """Valor atual de uma trilha. Fecha o intervalo anterior se o valor mudou."""
+        chave = (categoria, lado)
+        aberta = abertas.get(chave)
+        if aberta is not None and aberta[0] == valor:
+            return
+        if agora is None:
+            agora = self.relogio()
+        if aberta is not None and aberta[0] not in VALORES_NEUTROS:
+            self.registrar(aberta[1], agora - aberta[1], categoria, lado, aberta[0])
+        abertas[chave] = (valor, agora)
+
+    def fechar_trilhas(self, abertas, agora=None, chaves=None):
+        """Fecha as trilhas abertas (todas ou só as chaves (categoria, lado) informadas)."""
+        if agora is None:
+            agora = self.relogio()
+        for chave in [c for c in abertas if chaves is None or c in chaves]:
+            valor, inicio = abertas.pop(chave)
+            if valor not in VALORES_NEUTROS:
+                self.registrar(inicio, agora - inicio, chave[0], chave[1], valor)
+
+    def registrar(self, inicio, duracao, categoria, lado, valor):
+        """Enfileira um evento para a thread escritora."""
+        linha = (inicio, duracao, CATEGORIAS.index(categoria), LADOS.index(lado), valor)
+        with self._cond:
+            self._pendentes.append(linha)
+            self._cond.notify_all()
+        self._garantir_thread()
+
+    def aguardar(self):
+        """Bloqueia até os eventos enfileirados estarem gravados (usado por scripts e testes)."""
+        with self._cond:
+            self._cond.wait_for(lambda: not self._pendentes and not self._gravando)
+
+    def _garantir_thread(self):
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, daemon=True)
+                self._thread.start()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pendentes)
+                lote, self._pendentes = self._pendentes, []
+                self._gravando = True
+            try:
+                self._gravar(lote)
+            except Exception as erro:
+                print(f"[ERRO] Linha do tempo: {len(lote)} eventos perdidos: {erro}")
+            finally:
+                with self._cond:
+                    self._gravando = False
+                    self._cond.notify_all()
+
+    def _gravar(self, lote):
+        with self._lock:
+            codigos = [self._codigo(linha[4]) for linha in lote]
+            self._salvar_valores()
+            colunas = list(zip(*lote))
+            colunas[4] = codigos
+            pos = 0
+            while pos < len(lote):
+                agora = self.relogio()
+                if (self._arquivos is None or self._segmento_eventos >= self.eventos_por_segmento
+                        or agora - self._segmento_criado >= self.segundos_por_segmento):
+                    self._girar(agora)
+                n = min(len(lote) - pos, self.eventos_por_segmento - self._segmento_eventos)
+                for arquivo, (_, tipo), coluna in zip(self._arquivos, COLUNAS, colunas):
+                    arquivo.write(np.array(coluna[pos:pos + n], tipo).tobytes())
+                for arquivo in self._arquivos:
+                    arquivo.flush()
+                self._segmento_eventos += n
+                self.eventos += n
+                pos += n
+
+    def _codigo(self, valor):
+        codigo = self._codigos.get(valor)
+        if codigo is None:
+            codigo = self._codigos[valor] = len(self._valores)
+            self._valores.append(valor)
+        return codigo
+
+    def _salvar_valores(self):
+        """Reescreve valores.json se o dicionário cresceu desde a última gravação."""
+        if len(self._valores) == self._valores_salvos:
+            return
+        temporario = self._caminho_valores + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as arquivo:
+            json.dump(self._valores, arquivo, ensure_ascii=False)
+        os.replace(temporario, self._caminho_valores)
+        self._valores_salvos = len(self._valores)
+
+    def _segmentos(self):
+        return sorted(nome for nome in os.listdir(self.pasta) if nome.startswith(_PREFIXO_SEGMENTO))
+
+    def _girar(self, agora):
+        """Fecha o segmento aberto, abre o próximo e apaga os excedentes."""
+        self._fechar_arquivos()
+        existentes = self._segmentos()
+        numero = int(existentes[-1][len(_PREFIXO_SEGMENTO):]) + 1 if existentes else 0
+        self._segmento = f"{_PREFIXO_SEGMENTO}{numero:06d}"
+        pasta = os.path.join(self.pasta, self._segmento)
+        os.makedirs(pasta)
+        self._arquivos = [open(os.path.join(pasta, nome), "ab") for nome, _ in COLUNAS]
+        self._segmento_criado = agora
+        self._segmento_eventos = 0
+        for antigo in (existentes + [self._segmento])[:-self.max_segmentos]:
+            shutil.rmtree(os.path.join(self.pasta, antigo), ignore_errors=True)
+            self._faixas.pop(antigo, None)
+
+    def _fechar_arquivos(self):
+        if self._arquivos is not None:
+            for arquivo in self._arquivos:
+                arquivo.close()
+            self._arquivos = None
+
+    def fechar(self):
+        """Grava os eventos pendentes e fecha o segmento aberto."""
+        self.aguardar()
+        with self._lock:
+            self._fechar_arquivos()
+            self._segmento = None
+
+    # --- Leitura ---
+    def _colunas(self, segmento):
+        """Colunas do segmento como memmaps do mesmo tamanho (dicionário nome -> array)."""
+        pasta = os.path.join(self.pasta, segmento)
+        tamanhos = [os.path.getsize(os.path.join(pasta, nome)) // np.dtype(tipo).itemsize
+                    for nome, tipo in COLUNAS]
+        n = min(tamanhos)
+        if n == 0:
+            return None
+        return {nome: np.memmap(os.path.join(pasta, nome), dtype=tipo, mode="r", shape=(n,))
+                for nome, tipo in COLUNAS}
+
+    def _faixa(self, segmento, colunas):
+        """(menor, maior) inicio do segmento; guardado quando o segmento já fechou."""
+        with self._lock:
+            faixa = self._faixas.get(segmento)
+        if faixa is not None and faixa[0] == len(colunas["inicio"]):
+            return faixa[1:]
+        inicio = colunas["inicio"]
+        faixa = (len(inicio), float(inicio.min()), float(inicio.max()))
+        with self._lock:
+            # O escritor pode ter girado ou apagado o segmento enquanto a faixa era calculada
+            if segmento != self._segmento and os.path.isdir(os.path.join(self.pasta, segmento)):
+                self._faixas[segmento] = faixa
+        return faixa[1:]
+
+    def consultar(self, inicio, fim, categoria=None, lado=None, duracao_min=0.0, balde=60.0):
+        """Contagem, permanência e histograma por balde dos eventos iniciados em [inicio, fim).
+
+        Retorna {"grupos": [{categoria, lado, valor, contagem, permanencia_total,
+        permanencia_media, permanencia_max, histograma}], "baldes": n, ...}.
+        O histograma conta eventos por balde de `balde` segundos a partir de inicio.
+        """
+        if not all(math.isfinite(v) for v in (inicio, fim, duracao_min, balde)) or balde <= 0:
+            raise ValueError("inicio, fim, duracao_min e balde devem ser finitos e o balde maior que zero.")
+        razao = (fim - inicio) / balde if fim > inicio else 0.0
+        # A razão é limitada antes de virar int: um intervalo enorme não aloca baldes sem fim
+        if not math.isfinite(razao) or razao > MAX_BALDES:
+            raise ValueError(f"Intervalo pede mais de {MAX_BALDES} baldes; aumente o balde.")
+        n_baldes = int(np.ceil(razao))
+        filtro_categoria = CATEGORIAS.index(categoria) if categoria is not None else None
+        filtro_lado = LADOS.index(lado) if lado is not None else None
+
+        with self._lock:
+            segmentos = self._segmentos()
+            valores = list(self._valores)
+        partes = []
+        lidos = 0
+        for segmento in segmentos:
+            colunas = self._colunas(segmento)
+            if colunas is None:
+                continue
+            menor, maior = self._faixa(segmento, colunas)
+            if maior < inicio or menor >= fim:
+                continue
+            lidos += 1
+            mascara = (colunas["inicio"] >= inicio) & (colunas["inicio"] < fim)
+            if duracao_min > 0:
+                mascara &= colunas["duracao"] >= duracao_min
+            if filtro_categoria is not None:
+                mascara &= colunas["categoria"] == filtro_categoria
+            if filtro_lado is not None:
+                mascara &= colunas["lado"] == filtro_lado
+            if mascara.any():
+                partes.append({nome: np.asarray(coluna[mascara]) for nome, coluna in colunas.items()})
+
+        resposta = {"inicio": inicio, "fim": fim, "balde": balde, "baldes": n_baldes,
+                    "segmentos_lidos": lidos, "grupos": []}
+        if not partes:
+            return resposta
+        eventos = {nome: np.concatenate([p[nome] for p in partes]) for nome, _ in COLUNAS}
+
+        # Um grupo por (categoria, lado, valor)
+        chave = ((eventos["categoria"].astype(np.int64) * len(LADOS) + eventos["lado"]) << 16) | eventos["valor"]
+        grupos, indice = np.unique(chave, return_inverse=True)
+        duracao = eventos["duracao"].astype(np.float64)
+        contagem = np.bincount(indice, minlength=len(grupos))
+        total = np.bincount(indice, weights=duracao, minlength=len(grupos))
+        maximo = np.zeros(len(grupos))
+        np.maximum.at(maximo, indice, duracao)
+        posicao = np.minimum(((eventos["inicio"] - inicio) // balde).astype(np.int64), n_baldes - 1)
+        histograma = np.bincount(indice * n_baldes + posicao,
+                                 minlength=len(grupos) * n_baldes).reshape(len(grupos), n_baldes)
+
+        for g, codigo in enumerate(grupos.tolist()):
+            categoria_lado = codigo >> 16
+            resposta["grupos"].append({
+                "categoria": CATEGORIAS[categoria_lado // len(LADOS)],
+                "lado": LADOS[categoria_lado % len(LADOS)],
+                "valor": valores[codigo & 0xFFFF],
+                "contagem": int(contagem[g]),
+                "permanencia_total": round(float(total[g]), 3),
+                "permanencia_media": round(float(total[g] / contagem[g]), 3),
+                "permanencia_max": round(float(maximo[g]), 3),
+                "histograma": histograma[g].tolist(),
+            })
+        resposta["grupos"].sort(key=lambda grupo: -grupo["contagem"])
+        return resposta
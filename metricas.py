@@ -0,0 +1,201 @@
+"""
+Métricas do processo no formato texto do Prometheus (/metrics).
+
+Contadores, medidores e histogramas com rótulos, registrados uma vez e
+atualizados no loop de frames. O custo por observação é uma busca binária
+nos baldes e um lock sem disputa, barato o suficiente para ficar sempre
+ligado. LockMedido substitui threading.Lock e mede o tempo de espera para
+adquirir.
+"""
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# Baldes (segundos) cobrindo de 0,5 ms a 2,5 s
+BALDES_PADRAO = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _numero(valor):
+    if valor == math.inf:
+        return "+Inf"
+    if float(valor).is_integer():
+        return str(int(valor))
+    return repr(float(valor))
+
+
+def _rotulos_texto(rotulos):
+    if not rotulos:
+        return ""
+    pares = ",".join(
+        '{}="{}"'.format(chave, str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for chave, valor in rotulos
+    )
+    return "{" + pares + "}"
+
+
+class Contador:
+    tipo = "counter"
+
+    def __init__(self):
+        self.valor = 0
+        self._lock = threading.Lock()
+
+    def inc(self, n=1):
+        with self._lock:
+            self.valor += n
+
+    def amostras(self, nome, rotulos):
+        yield nome, rotulos, self.valor
+
+
+class Medidor:
+    """Gauge: valor definido pelo código ou lido de uma função na exportação."""
+    tipo = "gauge"
+
+    def __init__(self, funcao=None):
+        self.valor = 0
+        self._funcao = funcao
+
+    def definir(self, valor):
+        self.valor = valor
+
+    def amostras(self, nome, rotulos):
+        yield nome, rotulos, self._funcao() if self._funcao is not None else self.valor
+
+
+class Histograma:
+    tipo = "histogram"
+
+    def __init__(self, baldes=BALDES_PADRAO):
+        self.baldes = tuple(baldes)
+        self._contagens = [0] * (len(self.baldes) + 1)
+        self._soma = 0.0
+        self._lock = threading.Lock()
+
+    def observar(self, valor):
+        indice = bisect.bisect_left(self.baldes, valor)
+        with self._lock:
+            self._contagens[indice] += 1
+            self._soma += valor
+
+    @property
+    def contagem(self):
+        return sum(self._contagens)
+
+    @property
+    def soma(self):
+        return self._soma
+
+    @contextmanager
+    def medir(self):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio)
+
+    def amostras(self, nome, rotulos):
+        with self._lock:
+            contagens = list(self._contagens)
+            soma = self._soma
+        acumulado = 0
+        for limite, contagem in zip(self.baldes + (math.inf,), contagens):
+            acumulado += contagem
+            yield nome + "_bucket", rotulos + (("le", _numero(limite)),), acumulado
+        yield nome + "_sum", rotulos, soma
+        yield nome + "_count", rotulos, acumulado
+
+
+class Registro:
+    """Conjunto de famílias de métricas (nome → tipo, ajuda, séries por rótulos)."""
+
+    def __init__(self):
+        self._familias = {}
+        self._lock = threading.Lock()
+
+    def _obter(self, classe, nome, ajuda, rotulos, **argumentos):
+        chave = tuple(sorted(rotulos.items()))
+        with self._lock:
+            tipo, _, series = self._familias.setdefault(nome, (classe.tipo, ajuda, {}))
+            if tipo != classe.tipo:
+                raise ValueError(f"Métrica {nome} já registrada como {tipo}")
+            metrica = series.get(chave)
+            if metrica is None:
+                metrica = series[chave] = classe(**argumentos)
+        return metrica
+
+    def contador(self, nome, ajuda, **rotulos):
+        return self._obter(Contador, nome, ajuda, rotulos)
+
+    def medidor(self, nome, ajuda, funcao=None, **rotulos):
+        return self._obter(Medidor, nome, ajuda, rotulos, funcao=funcao)
+
+    def histograma(self, nome, ajuda, baldes=BALDES_PADRAO, **rotulos):
+        return self._obter(Histograma, nome, ajuda, rotulos, baldes=baldes)
+
+    def exportar(self):
+        """Texto no formato de exposição do Prometheus (versão 0.0.4)."""
+        with self._lock:
+            familias = [(nome, tipo, ajuda, list(series.items()))
+                        for nome, (tipo, ajuda, series) in sorted(self._familias.items())]
+        linhas = []
+        for nome, tipo, ajuda, series in familias:
+            linhas.append(f"# HELP {nome} {ajuda}")
+            linhas.append(f"# TYPE {nome} {tipo}")
+            for rotulos, metrica in series:
+                for nome_amostra, rotulos_amostra, valor in metrica.amostras(nome, rotulos):
+                    linhas.append(f"{nome_amostra}{_rotulos_texto(rotulos_amostra)} {_numero(valor)}")
+        return "\n".join(linhas) + "\n"
+
+
+# Registro padrão do processo
+registro = Registro()
+contador = registro.contador
+medidor = registro.medidor
+histograma = registro.histograma
+exportar = registro.exportar
+
+TIPO_CONTEUDO = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class LockMedido:
+    """threading.Lock que registra o tempo de espera para adquirir.
+
+    Sem disputa, a aquisição não bloqueante já resolve e só conta uma espera
+    zero; com disputa, mede a espera e incrementa o contador de contenção.
+    """
+
+    def __init__(self, nome, registro_metricas=None):
+        registro_metricas = registro_metricas or registro
+        self._lock = threading.Lock()
+        self._espera = registro_metricas.histograma(
+            "vision_lock_espera_segundos", "Tempo de espera para adquirir o lock", lock=nome)
+        self._contencao = registro_metricas.contador(
+            "vision_lock_contencao_total", "Aquisições que encontraram o lock ocupado", lock=nome)
+
+    def acquire(self, blocking=True, timeout=-1):
+        if self._lock.acquire(False):
+            self._espera.observar(0.0)
+            return True
+        if not blocking:
+            return False
+        self._contencao.inc()
+        inicio = time.perf_counter()
+        adquirido = self._lock.acquire(True, timeout)
+        self._espera.observar(time.perf_counter() - inicio)
+        return adquirido
+
+    def release(self):
+        self._lock.release()
+
+    def locked(self):
+        return self._lock.locked()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *excecao):
+        self.release()
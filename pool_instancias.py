@@ -0,0 +1,122 @@
+"""
+Pool de instâncias caras (ex.: Hands + FaceMesh do MediaPipe) emprestadas
+por dono, com teto de instâncias e despejo por ociosidade.
+
+Um dono (uma sessão) fica com a mesma instância enquanto a usar, porque o
+MediaPipe rastreia as mãos de um frame para o outro. Com o pool cheio, a
+instância do dono parado há mais tempo passa para o novo dono, desde que
+ele esteja parado há pelo menos `ocioso_min` segundos (e passa por
+`reiniciar`, para não herdar o rastreamento do dono anterior); senão obter()
+levanta PoolEsgotado. expirar() fecha as instâncias paradas há mais de
+`ocioso_max` segundos, então a memória acompanha as sessões ativas.
+
+A fábrica roda fora do lock: obter() reserva a vaga, cria a instância e só
+então a publica, então criar um grafo não trava os outros donos.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class PoolEsgotado(RuntimeError):
+    """Todas as instâncias estão em uso por donos ativos."""
+
+
+class PoolInstancias:
+    def __init__(self, fabrica, maximo, ocioso_max=60.0, ocioso_min=5.0, fechar=None, reiniciar=None,
+                 relogio=time.monotonic):
+        self.fabrica = fabrica
+        self.maximo = max(1, int(maximo))
+        self.ocioso_max = ocioso_max
+        self.ocioso_min = ocioso_min
+        self.fechar = fechar
+        self.reiniciar = reiniciar
+        self.relogio = relogio
+        self.criadas = 0
+        self.transferidas = 0
+        self.expiradas = 0
+        # dono -> [instancia, ultimo_uso, pronta], do uso mais antigo ao mais recente;
+        # instancia é None enquanto a fábrica roda (pronta é o Event da criação)
+        self._emprestadas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._emprestadas)
+
+    def obter(self, dono):
+        """Instância do dono; cria (até o teto) ou toma a de um dono ocioso."""
+        agora = self.relogio()
+        criar = transferida = False
+        with self._lock:
+            item = self._emprestadas.get(dono)
+            if item is None:
+                if len(self._emprestadas) < self.maximo:
+                    # A vaga é reservada sob o lock: o teto vale mesmo com sessões chegando juntas
+                    item = [None, agora, threading.Event()]
+                    criar = True
+                    self.criadas += 1
+                else:
+                    antigo, item = next(((d, i) for d, i in self._emprestadas.items() if i[0] is not None),
+                                        (None, None))
+                    if item is None or agora - item[1] < self.ocioso_min:
+                        raise PoolEsgotado(f"{self.maximo} instâncias em uso")
+                    del self._emprestadas[antigo]
+                    transferida = True
+                    self.transferidas += 1
+                self._emprestadas[dono] = item
+            else:
+                self._emprestadas.move_to_end(dono)
+            item[1] = agora
+
+        if criar:
+            return self._criar(dono, item)
+        item[2].wait()  # outra chamada do mesmo dono ainda pode estar criando
+        if item[0] is None:
+            raise PoolEsgotado("a criação da instância falhou")
+        if transferida and self.reiniciar is not None:
+            self.reiniciar(item[0])
+        return item[0]
+
+    def _criar(self, dono, item):
+        try:
+            instancia = self.fabrica()
+        except BaseException:
+            with self._lock:
+                if self._emprestadas.get(dono) is item:
+                    del self._emprestadas[dono]
+                self.criadas -= 1
+            item[2].set()
+            raise
+        with self._lock:
+            publicada = self._emprestadas.get(dono) is item
+            if publicada:
+                item[0] = instancia
+        item[2].set()
+        if not publicada:
+            # Dono liberado enquanto a instância era criada
+            self._fechar(instancia)
+            raise PoolEsgotado("dono liberado durante a criação da instância")
+        return instancia
+
+    def liberar(self, dono):
+        """Fecha a instância do dono (ex.: a sessão foi encerrada)."""
+        with self._lock:
+            item = self._emprestadas.pop(dono, None)
+        if item is not None and item[0] is not None:
+            self._fechar(item[0])
+
+    def expirar(self):
+        """Fecha as instâncias paradas há mais de ocioso_max. Retorna quantas."""
+        limite = self.relogio() - self.ocioso_max
+        with self._lock:
+            vencidos = [dono for dono, (instancia, ultimo_uso, _) in self._emprestadas.items()
+                        if instancia is not None and ultimo_uso < limite]
+            instancias = [self._emprestadas.pop(dono)[0] for dono in vencidos]
+            self.expiradas += len(instancias)
+        for instancia in instancias:
+            self._fechar(instancia)
+        return len(instancias)
+
+    def _fechar(self, instancia):
+        if self.fechar is not None:
+            self.fechar(instancia)
@@ -0,0 +1,252 @@
+"""
+Gerador de poses sintéticas (mãos, rosto e trajetórias) para testar os
+classificadores sem câmera nem MediaPipe.
+
+As mãos são montadas a partir de uma mão direita canônica com a palma
+para a câmera (coordenadas de imagem, y para baixo, escala pulso → base do
+médio = 1). Cada dedo fica esticado ou dobrado conforme o gesto; depois a
+mão é espelhada (lado/orientação), girada levemente, escalada, posicionada
+e recebe ruído. Os rótulos esperados vêm da definição do gesto, não da
+saída do classificador.
+"""
+import math
+import random
+
+import numpy as np
+
+# --- Objetos no formato do MediaPipe (landmark.x / .y / .z) ---
+
+class Ponto:
+    __slots__ = ("x", "y", "z")
+
+    def __init__(self, x, y, z=0.0):
+        self.x = x
+        self.y = y
+        self.z = z
+
+
+class ListaLandmarks:
+    """Equivalente a NormalizedLandmarkList (atributo .landmark)."""
+    __slots__ = ("landmark",)
+
+    def __init__(self, pontos):
+        self.landmark = [Ponto(float(x), float(y), float(z)) for x, y, z in pontos]
+
+
+# --- Mão canônica (direita, palma para a câmera) ---
+
+PULSO = (0.0, 0.0)
+# Base (MCP) de indicador, médio, anelar e mínimo
+BASES = {5: (-0.35, -0.95), 9: (-0.10, -1.00), 13: (0.12, -0.95), 17: (0.33, -0.85)}
+# Deslocamentos (PIP, DIP, ponta) a partir da base
+DEDO_ESTICADO = ((0.0, -0.40), (0.0, -0.65), (0.0, -0.85))
+DEDO_DOBRADO = ((0.0, -0.35), (0.0, -0.20), (0.0, -0.10))
+
+# Polegar: CMC (1), MCP (2), IP (3), ponta (4)
+POLEGAR = {
+    "aberto": ((-0.25, -0.25), (-0.45, -0.45), (-0.60, -0.60), (-0.85, -0.60)),
+    "fechado": ((-0.25, -0.25), (-0.35, -0.40), (-0.50, -0.55), (-0.30, -0.55)),
+    "cima": ((-0.25, -0.25), (-0.40, -0.50), (-0.45, -0.90), (-0.45, -1.30)),
+    # OK: ponta do polegar encostando na ponta do indicador curvado
+    "ok": ((-0.25, -0.25), (-0.45, -0.45), (-0.60, -0.70), (-0.62, -0.95)),
+}
+INDICADOR_OK = ((-0.45, -1.25), (-0.60, -1.20), (-0.62, -1.00))
+
+# Gesto → (polegar, [indicador, médio, anelar, mínimo] esticados, esperado principal, esperado música)
+GESTOS_MAO = {
+    "OK": ("ok", (0, 1, 1, 1), "OK", "OK"),
+    "LIKE": ("cima", (0, 0, 0, 0), "LIKE", "LIKE"),
+    "Paz e Amor": ("fechado", (1, 1, 0, 0), "Paz e Amor", "Paz e Amor"),
+    "Rock": ("fechado", (1, 0, 0, 1), "Rock", "Rock"),
+    "Apontando": ("fechado", (1, 0, 0, 0), "Apontando", "Num1"),
+    "Mao Aberta": ("aberto", (1, 1, 1, 1), "Mao Aberta", "Num5"),
+    "Punho Fechado": ("fechado", (0, 0, 0, 0), "Punho Fechado", "Punho Fechado"),
+    "Hang Loose": ("aberto", (0, 0, 0, 1), "Dedos: 2", "Hang Loose"),
+    "Tres Dedos": ("fechado", (1, 1, 1, 0), "Dedos: 3", "Tres Dedos"),
+    "Quatro Dedos": ("fechado", (1, 1, 1, 1), "Dedos: 4", "Quatro Dedos"),
+    "Num3": ("aberto", (1, 1, 0, 0), "Dedos: 3", "Num3"),
+}
+
+
+def mao_canonica(gesto):
+    """Array (21, 3) da mão direita canônica (palma) fazendo o gesto."""
+    polegar, esticados, _, _ = GESTOS_MAO[gesto]
+    pontos = np.zeros((21, 3), dtype=np.float64)
+    pontos[0, :2] = PULSO
+    for indice, xy in enumerate(POLEGAR[polegar], start=1):
+        pontos[indice, :2] = xy
+
+    for (base, (bx, by)), esticado in zip(sorted(BASES.items()), esticados):
+        pontos[base, :2] = (bx, by)
+        if gesto == "OK" and base == 5:
+            pontos[6:9, :2] = INDICADOR_OK
+            continue
+        segmentos = DEDO_ESTICADO if esticado else DEDO_DOBRADO
+        # Dedos esticados levemente abertos em leque
+        leque = (base - 9) * 0.02 if esticado else 0.0
+        for k, (dx, dy) in enumerate(segmentos, start=1):
+            pontos[base + k, :2] = (bx + dx + leque * k, by + dy)
+    return pontos
+
+
+def gerar_mao(gesto, lateralidade="Right", orientacao="Palma", rng=None,
+              ruido=0.015, rotacao_max=10.0):
+    """Mão sintética em coordenadas normalizadas (0-1). Retorna array (21, 3)."""
+    rng = rng or random.Random()
+    pontos = mao_canonica(gesto)
+
+    # Esquerda com palma e direita de costas são o espelho da direita com palma
+    if (lateralidade == "Left") != (orientacao == "Costas"):
+        pontos[:, 0] = -pontos[:, 0]
+
+    angulo = math.radians(rng.uniform(-rotacao_max, rotacao_max))
+    c, s = math.cos(angulo), math.sin(angulo)
+    x, y = pontos[:, 0].copy(), pontos[:, 1].copy()
+    pontos[:, 0] = c * x - s * y
+    pontos[:, 1] = s * x + c * y
+
+    pontos[:, :2] += np.array([[rng.gauss(0, ruido), rng.gauss(0, ruido)] for _ in range(21)])
+
+    escala = rng.uniform(0.15, 0.30)
+    centro_x = rng.uniform(0.3, 0.7)
+    pulso_y = rng.uniform(0.75, 0.95)
+    pontos[:, 0] = centro_x + pontos[:, 0] * escala
+    pontos[:, 1] = pulso_y + pontos[:, 1] * escala
+    pontos[:, 2] = rng.uniform(-0.05, 0.0)
+    return pontos
+
+
+def gerar_maos(n_por_combinacao=20, semente=0):
+    """Lista de (pontos, lateralidade, orientacao, gesto) cobrindo todos os gestos."""
+    rng = random.Random(semente)
+    amostras = []
+    for gesto in GESTOS_MAO:
+        for lateralidade in ("Right", "Left"):
+            for orientacao in ("Palma", "Costas"):
+                for _ in range(n_por_combinacao):
+                    amostras.append((gerar_mao(gesto, lateralidade, orientacao, rng),
+                                     lateralidade, orientacao, gesto))
+    return amostras
+
+
+# --- Rosto ---
+
+N_PONTOS_ROSTO = 478  # Face Mesh com refine_landmarks
+
+# Expressão → (abertura da boca, largura da boca, abertura dos olhos), em
+# frações da altura/largura do rosto
+EXPRESSOES = {
+    "Neutro": (0.02, 0.30, 0.40),
+    "Sorriso": (0.02, 0.48, 0.40),
+    "Surpresa": (0.22, 0.30, 0.45),
+    "Olhos Fechados": (0.02, 0.30, 0.06),
+}
+
+
+def gerar_rosto(expressao, rng=None, ruido=0.002):
+    """Rosto sintético (só os pontos usados pelo classificador são significativos)."""
+    rng = rng or random.Random()
+    abertura, largura_boca, abertura_olhos = EXPRESSOES[expressao]
+    altura = rng.uniform(0.30, 0.50)
+    largura = altura * rng.uniform(0.70, 0.85)
+    cx, cy = rng.uniform(0.4, 0.6), rng.uniform(0.4, 0.6)
+
+    pontos = np.zeros((N_PONTOS_ROSTO, 3), dtype=np.float64)
+    pontos[:, 0], pontos[:, 1] = cx, cy
+
+    def por(indice, x, y):
+        pontos[indice, 0] = cx + x * largura + rng.gauss(0, ruido)
+        pontos[indice, 1] = cy + y * altura + rng.gauss(0, ruido)
+
+    por(10, 0.0, -0.5)     # topo
+    por(152, 0.0, 0.5)     # queixo
+    por(234, -0.5, 0.0)    # maçã esquerda
+    por(454, 0.5, 0.0)     # maçã direita
+    boca_y = 0.25
+    por(13, 0.0, boca_y - abertura / 2)
+    por(14, 0.0, boca_y + abertura / 2)
+    por(61, -largura_boca / 2, boca_y)
+    por(291, largura_boca / 2, boca_y)
+
+    # Olhos: cantos (p1, p4) e pares verticais (p2-p6, p3-p5); EAR ≈ abertura_olhos
+    largura_olho = 0.18
+    meia_altura = abertura_olhos * largura_olho * (largura / altura) / 2
+    for centro_x, indices in ((-0.22, (33, 160, 158, 133, 153, 144)),
+                              (0.22, (362, 385, 387, 263, 373, 380))):
+        p1, p2, p3, p4, p5, p6 = indices
+        por(p1, centro_x - largura_olho / 2, -0.1)
+        por(p4, centro_x + largura_olho / 2, -0.1)
+        por(p2, centro_x - largura_olho / 6, -0.1 - meia_altura)
+        por(p6, centro_x - largura_olho / 6, -0.1 + meia_altura)
+        por(p3, centro_x + largura_olho / 6, -0.1 - meia_altura)
+        por(p5, centro_x + largura_olho / 6, -0.1 + meia_altura)
+    return pontos
+
+
+def gerar_rostos(n_por_expressao=50, semente=0):
+    """Lista de (pontos, expressao)."""
+    rng = random.Random(semente)
+    return [(gerar_rosto(expressao, rng), expressao)
+            for expressao in EXPRESSOES for _ in range(n_por_expressao)]
+
+
+# --- Trajetórias do pulso ---
+
+FPS_TRAJETORIA = 30.0
+
+# Nome → (esperado, função t ∈ [0, 1] → deslocamento (dx, dy))
+TRAJETORIAS = {
+    "Parado": ("Parado", lambda t: (0.0, 0.0)),
+    "Direita": ("Direita", lambda t: (0.12 * t, 0.0)),
+    "Esquerda": ("Esquerda", lambda t: (-0.12 * t, 0.0)),
+    "Cima": ("Cima", lambda t: (0.0, -0.12 * t)),
+    "Baixo": ("Baixo", lambda t: (0.0, 0.12 * t)),
+    "Rapido Direita": ("Rapido Direita", lambda t: (0.45 * t, 0.0)),
+    "Rapido Cima": ("Rapido Cima", lambda t: (0.0, -0.45 * t)),
+    # 3/4 de volta, raio 0.08
+    "Circular": ("Circular", lambda t: (0.08 * math.cos(1.5 * math.pi * t),
+                                        -0.08 * math.sin(1.5 * math.pi * t))),
+}
+
+
+def gerar_trajetoria(nome, amostras=8, rng=None, ruido=0.002, inicio=0.0):
+    """Lista de (x, y, timestamp) de uma trajetória do pulso."""
+    rng = rng or random.Random()
+    _, deslocamento = TRAJETORIAS[nome]
+    x0, y0 = rng.uniform(0.3, 0.7), rng.uniform(0.3, 0.7)
+    pontos = []
+    for k in range(amostras):
+        dx, dy = deslocamento(k / (amostras - 1))
+        pontos.append((x0 + dx + rng.gauss(0, ruido), y0 + dy + rng.gauss(0, ruido),
+                       inicio + k / FPS_TRAJETORIA))
+    return pontos
+
+
+def gerar_trajetorias(n_por_tipo=20, semente=0):
+    """Lista de (pontos, esperado)."""
+    rng = random.Random(semente)
+    return [(gerar_trajetoria(nome, rng=rng), TRAJETORIAS[nome][0])
+            for nome in TRAJETORIAS for _ in range(n_por_tipo)]
+
+
+# --- Combinações de duas mãos ---
+
+# (gesto_dir, gesto_esq, mov_dir, mov_esq, vel_dir, vel_esq, dedos_dir, dedos_esq) → esperado
+COMBINACOES = [
+    (("Punho Fechado", "Punho Fechado", "Parado", "Parado", 0.0, 0.0, 0, 0), "Double Kick"),
+    (("Num5", "Num5", "Parado", "Parado", 0.0, 0.0, 5, 5), "Palmas"),
+    (("Rock", "Rock", "Parado", "Parado", 0.0, 0.0, 2, 2), "Double Rock"),
+    (("Paz e Amor", "Paz e Amor", "Parado", "Parado", 0.0, 0.0, 2, 2), "Double Peace"),
+    (("Punho Fechado", "Num5", "Parado", "Parado", 0.0, 0.0, 0, 5), "Punch Clap"),
+    (("Num5", "Punho Fechado", "Parado", "Parado", 0.0, 0.0, 5, 0), "Punch Clap"),
+    (("Num1", "Num1", "Parado", "Parado", 0.0, 0.0, 1, 1), "DJ Mode"),
+    (("Num3", "Num4", "Rapido Cima", "Rapido Baixo", 1.6, 1.4, 3, 4), "Shake"),
+    (("Num3", "Num1", "Esquerda", "Direita", 0.7, 0.8, 3, 1), "Scratch"),
+    (("Num1", "Num3", "Cima", "Cima", 0.6, 0.5, 1, 3), "Rise"),
+    (("Num1", "Num3", "Baixo", "Baixo", 0.6, 0.5, 1, 3), "Drop"),
+    (("Num1", "Nenhum", "Circular", "Parado", 0.5, 0.0, 1, 0), "Spin"),
+    (("Hang Loose", "Hang Loose", "Parado", "Parado", 0.0, 0.0, 2, 2), "Aloha"),
+    (("Num5", "Quatro Dedos", "Parado", "Parado", 0.0, 0.0, 5, 4), "Total 9"),
+    (("OK", "Num5", "Parado", "Parado", 0.0, 0.0, 3, 5), "Nenhum"),
+    (("Nenhum", "Nenhum", "Parado", "Parado", 0.0, 0.0, 0, 0), "Nenhum"),
+]
@@ -0,0 +1,197 @@
+"""
+Predição das mãos entre inferências do MediaPipe.
+
+Em CPUs lentas o MediaPipe limita o loop inteiro. Com VISION_INFERENCIA_HZ
+o app infere numa taxa fixa menor que a da câmera (CadenciaFixa) e os
+frames entre duas inferências recebem mãos previstas por PreditorMaos: os
+21 pontos de cada mão (casada pela lateralidade) são extrapolados a partir
+das duas últimas detecções, então o vídeo, o desenho das mãos e
+pos_direita/pos_esquerda andam na taxa da câmera.
+
+Modelos:
+    manter      repete a última detecção (o que se vê sem predição)
+    linear      velocidade constante entre as duas últimas detecções
+    amortecido  velocidade que decai com constante de tempo AMORTECIMENTO;
+                erra menos quando a mão para ou muda de direção
+
+A extrapolação vai no máximo até HORIZONTE_MAX segundos depois da última
+detecção (depois disso a mão fica onde a previsão chegou) e uma detecção
+mais velha que MAX_IDADE não é mais prevista.
+
+medir_erro() simula uma taxa de inferência sobre uma gravação feita em taxa
+cheia e compara a predição com os landmarks gravados (relatorio_predicao.py).
+"""
+import math
+
+import numpy as np
+
+import caracteristicas_mao
+import classificadores
+
+MODELOS = ("manter", "linear", "amortecido")
+AMORTECIMENTO = 0.1  # segundos (modelo amortecido)
+HORIZONTE_MAX = 0.25  # segundos de extrapolação, no máximo
+MAX_IDADE = 0.5  # segundos: detecção mais velha não é prevista nem vira velocidade
+
+# Chaves do estado de música comparadas por medir_erro
+CHAVES_ESTADO = ("gesto_direita", "gesto_esquerda", "movimento_direita", "movimento_esquerda",
+                 "gesto_combinado")
+
+
+def _chaves(lateralidades):
+    """(lateralidade, ordem) de cada mão: duas mãos com o mesmo lado não se confundem."""
+    vistas = {}
+    chaves = []
+    for lado in lateralidades:
+        chaves.append((lado, vistas.get(lado, 0)))
+        vistas[lado] = vistas.get(lado, 0) + 1
+    return chaves
+
+
+class CadenciaFixa:
+    """Escolhe os frames que vão para a inferência, a `hz` por segundo no relógio dos frames.
+
+    Por deadline: com câmera a 30 fps e 12 Hz, infere frames alternando
+    intervalos de 2 e 3 frames, sem arredondar para 10 ou 15 Hz.
+    """
+
+    def __init__(self, hz):
+        self.intervalo = 1.0 / hz
+        self._proximo = None
+
+    def devido(self, timestamp):
+        return (self._proximo is None or timestamp + 1e-4 >= self._proximo
+                or timestamp < self._proximo - 2 * self.intervalo)  # relógio voltou
+
+    def marcar(self, timestamp):
+        """O frame de `timestamp` foi para a inferência."""
+        if self._proximo is None or timestamp < self._proximo - 2 * self.intervalo:
+            self._proximo = timestamp
+        self._proximo = max(self._proximo + self.intervalo, timestamp)
+
+
+class PreditorMaos:
+    """Últimas detecções das mãos e a previsão dos pontos para qualquer instante."""
+
+    def __init__(self, modelo="amortecido", amortecimento=AMORTECIMENTO, horizonte_max=HORIZONTE_MAX,
+                 max_idade=MAX_IDADE):
+        if modelo not in MODELOS:
+            raise ValueError(f"Modelo de predição desconhecido: {modelo} (use {', '.join(MODELOS)})")
+        self.modelo = modelo
+        self.amortecimento = amortecimento
+        self.horizonte_max = horizonte_max
+        self.max_idade = max_idade
+        self.limpar()
+
+    def limpar(self):
+        self._t = None
+        self._chaves = []
+        self._lateralidades = ()
+        self._pontos = np.zeros((0, 21, 3))
+        self._velocidades = np.zeros((0, 21, 3))
+
+    def observar(self, timestamp, pontos, lateralidades):
+        """Nova detecção: pontos (n, 21, 3) e lateralidades. Mãos ausentes deixam de ser previstas."""
+        if self._t is not None and timestamp <= self._t:
+            if timestamp == self._t:
+                return
+            self.limpar()  # relógio voltou (outra fonte)
+        pontos = np.array(pontos, dtype=np.float64).reshape(-1, 21, 3)
+        chaves = _chaves(lateralidades)
+        velocidades = np.zeros_like(pontos)
+        if self._t is not None and timestamp - self._t <= self.max_idade:
+            anteriores = dict(zip(self._chaves, self._pontos))
+            for i, chave in enumerate(chaves):
+                anterior = anteriores.get(chave)
+                if anterior is not None:
+                    velocidades[i] = (pontos[i] - anterior) / (timestamp - self._t)
+        self._t = timestamp
+        self._chaves = chaves
+        self._lateralidades = tuple(lateralidades)
+        self._pontos = pontos
+        self._velocidades = velocidades
+
+    def prever(self, timestamp):
+        """(pontos (n, 21, 3), lateralidades) previstos para `timestamp`."""
+        if self._t is None or not len(self._pontos) or timestamp - self._t > self.max_idade:
+            return np.zeros((0, 21, 3)), ()
+        horizonte = min(max(timestamp - self._t, 0.0), self.horizonte_max)
+        if self.modelo == "manter" or horizonte == 0:
+            return self._pontos.copy(), self._lateralidades
+        if self.modelo == "amortecido":
+            horizonte = self.amortecimento * (1.0 - math.exp(-horizonte / self.amortecimento))
+        return self._pontos + self._velocidades * horizonte, self._lateralidades
+
+
+def medir_erro(frames, hz, modelo="amortecido", latencia=0.0, largura=640, altura=480):
+    """Simula inferência a `hz` sobre frames inferidos em taxa cheia e mede o erro da predição.
+
+    frames: sequência de (timestamp, CaracteristicasMaos) — a verdade de cada frame.
+    latencia: segundos entre a captura do frame inferido e o resultado ficar pronto
+    (o tempo de inferência; enquanto isso os frames seguem previstos e não sai outra).
+    Erros em pixels de um frame largura x altura; estado_igual é a fração de
+    frames em que o estado de música (gestos, movimento, combo) sai igual ao da
+    taxa cheia.
+    """
+    cadencia = CadenciaFixa(hz)
+    preditor = PreditorMaos(modelo)
+    historico_real = classificadores.novo_historico_movimento()
+    historico_previsto = classificadores.novo_historico_movimento()
+    escala = np.array([largura, altura], dtype=np.float64)
+
+    pendente = None  # (pronto_em, timestamp, caracteristicas)
+    inferencias = 0
+    erros_pulso = []
+    erros_pontos = []
+    perdidas = sobrando = 0
+    iguais = dict.fromkeys(CHAVES_ESTADO, 0)
+    n_frames = 0
+
+    for timestamp, real in frames:
+        if pendente is not None and timestamp >= pendente[0]:
+            preditor.observar(pendente[1], pendente[2].pontos, pendente[2].lateralidades)
+            pendente = None
+        if pendente is None and cadencia.devido(timestamp):
+            cadencia.marcar(timestamp)
+            inferencias += 1
+            pendente = (timestamp + latencia, timestamp, real)
+            if latencia <= 0:
+                preditor.observar(timestamp, real.pontos, real.lateralidades)
+                pendente = None
+
+        pontos, lateralidades = preditor.prever(timestamp)
+        previstas = dict(zip(_chaves(lateralidades), pontos))
+        for chave, verdade in zip(_chaves(real.lateralidades), real.pontos):
+            prevista = previstas.pop(chave, None)
+            if prevista is None:
+                perdidas += 1
+                continue
+            distancias = np.hypot(*((prevista[:, :2] - verdade[:, :2]) * escala).T)
+            erros_pulso.append(distancias[0])
+            erros_pontos.append(distancias.mean())
+        sobrando += len(previstas)
+
+        estado_real = classificadores.analisar_musica(real, "Neutro", historico_real, timestamp)
+        estado_previsto = classificadores.analisar_musica(
+            caracteristicas_mao.extrair_caracteristicas(pontos, lateralidades), "Neutro",
+            historico_previsto, timestamp)
+        for chave in CHAVES_ESTADO:
+            iguais[chave] += estado_real[chave] == estado_previsto[chave]
+        n_frames += 1
+
+    pulso = np.array(erros_pulso)
+    return {
+        "taxa": hz,
+        "modelo": modelo,
+        "latencia": latencia,
+        "frames": n_frames,
+        "inferencias": inferencias,
+        "maos": len(pulso),
+        "erro_pulso_medio": round(float(pulso.mean()), 2) if len(pulso) else 0.0,
+        "erro_pulso_p95": round(float(np.percentile(pulso, 95)), 2) if len(pulso) else 0.0,
+        "erro_pulso_max": round(float(pulso.max()), 2) if len(pulso) else 0.0,
+        "erro_pontos_medio": round(float(np.mean(erros_pontos)), 2) if erros_pontos else 0.0,
+        "maos_perdidas": perdidas,
+        "maos_sobrando": sobrando,
+        "estado_igual": {chave: round(iguais[chave] / max(n_frames, 1), 4) for chave in CHAVES_ESTADO},
+    }
@@ -0,0 +1,338 @@
+"""
+Processamento offline de vídeos e pastas de imagens.
+
+Roda os mesmos classificadores do app (classificadores.py) sobre arquivos
+em disco e grava uma linha por frame (gestos, expressão, posição e
+movimento das mãos, gesto combinado) em JSONL ou Parquet.
+
+O trabalho é dividido em segmentos (trechos de vídeo / blocos de imagens)
+distribuídos num pool de processos; cada processo cria, ao iniciar, um par
+Hands + FaceMesh por modo usado (vídeo e/ou imagens) e o reaproveita em
+todos os seus segmentos, então o ganho escala com os núcleos. Cada
+segmento começa com o rastreamento (reset dos grafos) e o histórico de
+movimento zerados.
+
+Uso:
+    python processar_lote.py video.mp4 pasta_imagens/ --saida resultado.jsonl
+    python processar_lote.py *.mp4 --saida resultado.parquet --workers 4
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+
+import cv2
+
+import caracteristicas_mao
+import classificadores
+
+try:
+    import mediapipe as mp
+    mp_maos = mp.solutions.hands
+    mp_rosto = mp.solutions.face_mesh
+except (ImportError, AttributeError):
+    mp = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+EXTENSOES_VIDEO = {".mp4", ".avi", ".mov", ".mkv", ".webm", ".m4v"}
+EXTENSOES_IMAGEM = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+
+@dataclass(frozen=True)
+class Segmento:
+    """Trecho de um arquivo processado por uma tarefa do pool."""
+    indice: int
+    caminho: str
+    tipo: str           # "video" | "imagens"
+    inicio: int         # primeiro frame (inclusivo)
+    fim: int            # último frame (exclusivo); None = até o read() falhar
+    fps: float
+    imagens: tuple = ()  # só para tipo "imagens"
+
+
+# --- Planejamento ---
+
+def _listar_imagens(pasta):
+    return sorted(
+        os.path.join(pasta, nome) for nome in os.listdir(pasta)
+        if os.path.splitext(nome)[1].lower() in EXTENSOES_IMAGEM
+    )
+
+
+def planejar_segmentos(entradas, segundos_segmento, fps_imagens):
+    """Divide as entradas em segmentos de até segundos_segmento (0 = arquivo inteiro)."""
+    segmentos = []
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            imagens = _listar_imagens(entrada)
+            tamanho = int(segundos_segmento * fps_imagens) or len(imagens)
+            for inicio in range(0, len(imagens), max(1, tamanho)):
+                bloco = tuple(imagens[inicio:inicio + tamanho])
+                segmentos.append(Segmento(len(segmentos), entrada, "imagens", inicio,
+                                          inicio + len(bloco), fps_imagens, bloco))
+        elif os.path.splitext(entrada)[1].lower() in EXTENSOES_VIDEO:
+            cap = cv2.VideoCapture(entrada)
+            if not cap.isOpened():
+                print(f"⚠️ Não foi possível abrir {entrada}", file=sys.stderr)
+                continue
+            total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+            cap.release()
+            if total <= 0:
+                # webm, alguns mkv e streams não informam a contagem: um segmento até o fim
+                print(f"⚠️ {entrada} não informa o número de frames; processado num único segmento",
+                      file=sys.stderr)
+                segmentos.append(Segmento(len(segmentos), entrada, "video", 0, None, fps))
+                continue
+            tamanho = int(segundos_segmento * fps) or total
+            inicios = range(0, total, max(1, tamanho))
+            for inicio in inicios:
+                # A contagem pode ser estimada: o último segmento lê até o read() falhar
+                fim = None if inicio == inicios[-1] else inicio + tamanho
+                segmentos.append(Segmento(len(segmentos), entrada, "video", inicio, fim, fps))
+        else:
+            print(f"⚠️ Entrada ignorada (não é vídeo nem pasta): {entrada}", file=sys.stderr)
+    return segmentos
+
+
+# --- Worker ---
+
+_config_worker = {}
+_mediapipe_worker = {}  # tipo do segmento ("video" | "imagens") -> (maos, rosto)
+
+
+def _iniciar_worker(espelhar, resolucao, janela_movimento=classificadores.HIST_MAX, tipos=("video", "imagens")):
+    """Initializer do pool: guarda a configuração e cria o MediaPipe do processo (um par por tipo)."""
+    _config_worker["espelhar"] = espelhar
+    _config_worker["resolucao"] = resolucao
+    _config_worker["janela_movimento"] = janela_movimento
+    # Um processo por núcleo: evita que o OpenCV crie threads extras em cada um
+    cv2.setNumThreads(1)
+    for tipo in tipos:
+        _mediapipe_worker[tipo] = _criar_mediapipe(imagens_estaticas=tipo == "imagens")
+
+
+def _criar_mediapipe(imagens_estaticas):
+    """Mesmos parâmetros do app_web.criar_mediapipe.
+
+    Vídeo usa rastreamento entre frames; imagens soltas são detectadas uma a uma.
+    """
+    maos = mp_maos.Hands(
+        static_image_mode=imagens_estaticas,
+        max_num_hands=2,
+        model_complexity=0,
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.5
+    )
+    rosto = mp_rosto.FaceMesh(
+        static_image_mode=imagens_estaticas,
+        max_num_faces=1,
+        refine_landmarks=True,
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.5
+    )
+    return maos, rosto
+
+
+def _frames_do_segmento(segmento):
+    """Gera (numero_frame, frame BGR) do segmento."""
+    if segmento.tipo == "imagens":
+        for deslocamento, caminho in enumerate(segmento.imagens):
+            frame = cv2.imread(caminho)
+            if frame is not None:
+                yield segmento.inicio + deslocamento, frame
+        return
+
+    cap = cv2.VideoCapture(segmento.caminho)
+    try:
+        if segmento.inicio:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, segmento.inicio)
+        numero = segmento.inicio
+        while segmento.fim is None or numero < segmento.fim:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield numero, frame
+            numero += 1
+    finally:
+        cap.release()
+
+
+def _registro_frame(segmento, numero, caracteristicas, expressao, historico):
+    """Uma linha plana do resultado (mesmas regras das páginas principal e de música)."""
+    tempo = numero / segmento.fps
+    _, gesto_detectado, gesto_principal = classificadores.analisar_maos_principal(caracteristicas)
+    musica = classificadores.analisar_musica(caracteristicas, expressao, historico, tempo)
+
+    registro = {
+        "arquivo": segmento.caminho,
+        "frame": numero,
+        "tempo": round(tempo, 4),
+        "maos": len(caracteristicas),
+        "gesto_detectado": gesto_detectado,
+        "gesto_principal": gesto_principal,
+    }
+    for chave, valor in musica.items():
+        if isinstance(valor, dict):
+            registro[f"{chave}_x"] = valor["x"]
+            registro[f"{chave}_y"] = valor["y"]
+        else:
+            registro[chave] = valor
+    # Coluna sempre presente (o schema do Parquet sai da primeira linha)
+    registro["imagem"] = None
+    if segmento.tipo == "imagens":
+        registro["imagem"] = os.path.basename(segmento.imagens[numero - segmento.inicio])
+    return registro
+
+
+def processar_segmento(segmento, pasta_partes):
+    """Processa um segmento e grava suas linhas num arquivo parcial JSONL.
+
+    Retorna (indice, caminho_parte, frames, segundos, pid).
+    """
+    inicio = time.perf_counter()
+    largura, altura = _config_worker.get("resolucao", (320, 240))
+    espelhar = _config_worker.get("espelhar", True)
+
+    if segmento.tipo not in _mediapipe_worker:
+        _mediapipe_worker[segmento.tipo] = _criar_mediapipe(imagens_estaticas=segmento.tipo == "imagens")
+    maos, rosto = _mediapipe_worker[segmento.tipo]
+    # O segmento não continua o anterior deste processo: rastreamento do zero
+    maos.reset()
+    rosto.reset()
+    historico = classificadores.novo_historico_movimento(
+        _config_worker.get("janela_movimento", classificadores.HIST_MAX))
+    caminho_parte = os.path.join(pasta_partes, f"parte_{segmento.indice:06d}.jsonl")
+    frames = 0
+
+    with open(caminho_parte, "w", encoding="utf-8") as saida:
+        for numero, frame in _frames_do_segmento(segmento):
+            # Igual ao app: espelhado (câmera frontal) e reduzido para a inferência
+            if espelhar:
+                frame = cv2.flip(frame, 1)
+            frame_rgb = cv2.cvtColor(cv2.resize(frame, (largura, altura)), cv2.COLOR_BGR2RGB)
+
+            res_maos = maos.process(frame_rgb)
+            res_rosto = rosto.process(frame_rgb)
+
+            landmarks = res_maos.multi_hand_landmarks or []
+            lateralidades = [
+                res_maos.multi_handedness[idx].classification[0].label
+                if res_maos.multi_handedness and idx < len(res_maos.multi_handedness) else "Right"
+                for idx in range(len(landmarks))
+            ]
+            caracteristicas = caracteristicas_mao.caracteristicas_de_landmarks(landmarks, lateralidades)
+
+            expressao = "Neutro"
+            if res_rosto.multi_face_landmarks:
+                expressao = classificadores.classificar_expressao(res_rosto.multi_face_landmarks[0])
+
+            registro = _registro_frame(segmento, numero, caracteristicas, expressao, historico)
+            saida.write(json.dumps(registro, ensure_ascii=False) + "\n")
+            frames += 1
+
+    return segmento.indice, caminho_parte, frames, time.perf_counter() - inicio, os.getpid()
+
+
+# --- Saída ---
+
+def _ler_parte(caminho):
+    with open(caminho, encoding="utf-8") as f:
+        for linha in f:
+            yield json.loads(linha)
+
+
+def juntar_partes(partes, destino):
+    """Junta os arquivos parciais, na ordem dos segmentos, em JSONL ou Parquet."""
+    if destino.lower().endswith(".parquet"):
+        registros = [registro for parte in partes for registro in _ler_parte(parte)]
+        pq.write_table(pa.Table.from_pylist(registros), destino)
+        return len(registros)
+
+    total = 0
+    with open(destino, "w", encoding="utf-8") as saida:
+        for parte in partes:
+            with open(parte, encoding="utf-8") as f:
+                for linha in f:
+                    saida.write(linha)
+                    total += 1
+    return total
+
+
+def _resolucao(texto):
+    largura, _, altura = texto.lower().partition("x")
+    return int(largura), int(altura)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("entradas", nargs="+", help="vídeos e/ou pastas de imagens")
+    parser.add_argument("--saida", default="gestos.jsonl", help="arquivo .jsonl ou .parquet")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processos no pool")
+    parser.add_argument("--segmento", type=float, default=30.0,
+                        help="segundos por tarefa (0 = arquivo inteiro numa tarefa)")
+    parser.add_argument("--fps-imagens", type=float, default=30.0,
+                        help="taxa assumida para sequências de imagens (tempo e movimento)")
+    parser.add_argument("--resolucao", type=_resolucao, default=(320, 240),
+                        help="resolução de inferência LxA (o app usa 320x240)")
+    parser.add_argument("--sem-espelho", action="store_true",
+                        help="não espelhar os frames (o app espelha a câmera)")
+    parser.add_argument("--janela-movimento", type=int, default=classificadores.HIST_MAX,
+                        help="amostras do pulso analisadas na detecção de movimento (mín. 3)")
+    args = parser.parse_args()
+
+    if mp is None:
+        print("❌ MediaPipe indisponível.")
+        return 1
+    if args.saida.lower().endswith(".parquet") and pq is None:
+        print("❌ Saída Parquet requer pyarrow (pip install pyarrow).")
+        return 1
+
+    segmentos = planejar_segmentos(args.entradas, args.segmento, args.fps_imagens)
+    if not segmentos:
+        print("❌ Nenhuma entrada válida.")
+        return 1
+
+    print(f"🎬 {len(segmentos)} segmento(s) em {args.workers} processo(s)")
+    pasta_partes = tempfile.mkdtemp(prefix="lote_gestos_")
+    partes = {}
+    por_worker = {}
+    inicio = time.perf_counter()
+
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_iniciar_worker,
+                                 initargs=(not args.sem_espelho, args.resolucao, args.janela_movimento,
+                                           tuple(sorted({segmento.tipo for segmento in segmentos})))) as pool:
+            futuros = [pool.submit(processar_segmento, segmento, pasta_partes) for segmento in segmentos]
+            for futuro in as_completed(futuros):
+                indice, parte, frames, segundos, pid = futuro.result()
+                partes[indice] = parte
+                frames_pid, segundos_pid = por_worker.get(pid, (0, 0.0))
+                por_worker[pid] = (frames_pid + frames, segundos_pid + segundos)
+                segmento = segmentos[indice]
+                print(f"  ✅ {segmento.caminho} [{segmento.inicio}:{'' if segmento.fim is None else segmento.fim}] "
+                      f"— {frames} frames, {frames / segundos if segundos else 0:.1f} fps (pid {pid})")
+
+        total = juntar_partes([partes[i] for i in sorted(partes)], args.saida)
+    finally:
+        shutil.rmtree(pasta_partes, ignore_errors=True)
+
+    duracao = time.perf_counter() - inicio
+    print(f"\n📄 {total} frames → {args.saida} em {duracao:.1f} s ({total / duracao:.1f} fps no total)")
+    for pid, (frames, segundos) in sorted(por_worker.items()):
+        print(f"  pid {pid}: {frames} frames, {frames / segundos if segundos else 0:.1f} fps")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,72 @@
+"""
+Relatório de erro da predição de mãos entre inferências (predicao_maos.py).
+
+Parte de uma gravação de landmarks feita em taxa cheia (o MediaPipe em todo
+frame), simula o app inferindo só a cada 1/taxa segundos e compara, frame a
+frame, as mãos previstas com as gravadas: erro do pulso (o que vira
+pos_direita/pos_esquerda) e de todos os pontos em pixels de um frame 640x480,
+mãos perdidas/sobrando e a fração de frames em que o estado de música
+(gestos, movimento e combo) sai igual ao da taxa cheia. O modelo "manter" é
+a referência sem predição.
+
+Gravar em taxa cheia (VISION_INFERENCIA_HZ=0, o padrão):
+    VISION_GRAVAR_LANDMARKS=gravacoes/sessao.lmk python app_web.py
+
+Medir:
+    python relatorio_predicao.py gravacoes/sessao.lmk
+    python relatorio_predicao.py gravacoes/sessao.lmk --taxas 10 12 15 --latencia 0.04 --saida erro.json
+
+--latencia é o tempo de uma inferência (vision_estagio_segundos do
+inferencia_total em /metrics): nesse intervalo o app segue prevendo a
+partir da inferência anterior.
+"""
+import argparse
+import json
+import time
+
+import gravacao_landmarks
+import predicao_maos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("gravacao", help="arquivo de landmarks gravado pelo app em taxa cheia")
+    parser.add_argument("--taxas", nargs="+", type=float, default=[6.0, 8.0, 10.0, 12.0, 15.0, 20.0],
+                        help="taxas de inferência simuladas (Hz)")
+    parser.add_argument("--modelos", nargs="+", choices=predicao_maos.MODELOS, default=list(predicao_maos.MODELOS))
+    parser.add_argument("--latencia", type=float, default=0.0, help="segundos por inferência")
+    parser.add_argument("--saida", help="JSON com todas as medidas")
+    args = parser.parse_args()
+
+    leitor = gravacao_landmarks.LeitorLandmarks(args.gravacao)
+    duracao = leitor.duracao()
+    frames = [(gravado.timestamp, gravado.caracteristicas) for gravado in leitor]
+    print(f"📼 {args.gravacao}: {len(frames)} frames, {duracao:.1f} s gravados "
+          f"({len(frames) / max(duracao, 1e-9):.1f} fps), latência simulada {args.latencia * 1000:.0f} ms")
+
+    inicio = time.perf_counter()
+    medidas = []
+    print(f"\n  {'taxa':>5} {'modelo':<11} {'inferências':>11} {'pulso médio':>11} {'p95':>7} {'máx':>7} "
+          f"{'pontos':>7} {'perdidas':>8} {'sobrando':>8} {'movimento':>9} {'combo':>7}")
+    for taxa in args.taxas:
+        for modelo in args.modelos:
+            medida = predicao_maos.medir_erro(frames, taxa, modelo, args.latencia)
+            medidas.append(medida)
+            iguais = medida["estado_igual"]
+            movimento = (iguais["movimento_direita"] + iguais["movimento_esquerda"]) / 2
+            print(f"  {taxa:>5g} {modelo:<11} {medida['inferencias']:>11} {medida['erro_pulso_medio']:>9.1f}px "
+                  f"{medida['erro_pulso_p95']:>7.1f} {medida['erro_pulso_max']:>7.1f} "
+                  f"{medida['erro_pontos_medio']:>7.1f} {medida['maos_perdidas']:>8} {medida['maos_sobrando']:>8} "
+                  f"{movimento:>9.1%} {iguais['gesto_combinado']:>7.1%}")
+    print(f"\n  {len(medidas)} simulações em {time.perf_counter() - inicio:.1f} s")
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump({"gravacao": args.gravacao, "frames": len(frames), "duracao": duracao,
+                       "medidas": medidas}, arquivo, ensure_ascii=False, indent=2)
+        print(f"  Medidas em {args.saida}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,77 @@
+"""
+Reproduz uma gravação de landmarks (gravacao_landmarks.py) pelos
+classificadores do app, sem câmera e sem MediaPipe.
+
+Os pipelines recebem os resultados gravados com o timestamp da captura
+como relógio, então uma sessão longa roda em segundos e sempre produz a
+mesma sequência de estados. Com --saida, grava em JSONL cada mudança de
+estado (seq, timestamp e os estados dos pipelines), para comparar duas
+versões dos classificadores com um diff.
+
+Gravar (com o app rodando):
+    VISION_GRAVAR_LANDMARKS=gravacoes/sessao.lmk python app_web.py
+    curl -X POST localhost:5000/gravacao -H 'Content-Type: application/json' -d '{"ativa": true}'
+
+Reproduzir:
+    python reproduzir_landmarks.py gravacoes/sessao.lmk
+    python reproduzir_landmarks.py gravacoes/sessao.lmk --saida estados.jsonl
+"""
+import argparse
+import json
+import time
+from collections import Counter
+
+import app_web
+import gravacao_landmarks
+
+ESTADOS = {
+    "principal": app_web.estado_atual,
+    "musica": app_web.estado_musica,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("gravacao", help="arquivo de landmarks gravado pelo app")
+    parser.add_argument("--pipelines", nargs="+", choices=sorted(ESTADOS), default=sorted(ESTADOS))
+    parser.add_argument("--saida", help="JSONL com cada mudança de estado")
+    args = parser.parse_args()
+
+    leitor = gravacao_landmarks.LeitorLandmarks(args.gravacao)
+    print(f"📼 {args.gravacao}: {len(leitor)} frames, {leitor.duracao():.1f} s gravados")
+
+    saida = open(args.saida, "w", encoding="utf-8") if args.saida else None
+    contagem = Counter()
+    ultimo = [None]
+
+    def ao_frame(resultado):
+        estados = {nome: dict(ESTADOS[nome]) for nome in args.pipelines}
+        if "principal" in estados:
+            contagem[estados["principal"]["gesto_principal"]] += 1
+        if estados != ultimo[0]:
+            ultimo[0] = estados
+            if saida is not None:
+                registro = {"seq": resultado.seq, "timestamp": resultado.timestamp, **estados}
+                saida.write(json.dumps(registro, ensure_ascii=False, sort_keys=True) + "\n")
+
+    inicio = time.perf_counter()
+    try:
+        frames = app_web.reproduzir_landmarks(args.gravacao, args.pipelines, ao_frame)
+    finally:
+        if saida is not None:
+            saida.close()
+    duracao = time.perf_counter() - inicio
+
+    print(f"\n  {frames} frames em {duracao:.2f} s → {frames / max(duracao, 1e-9):.0f} frames/s "
+          f"({leitor.duracao() / max(duracao, 1e-9):.0f}x o tempo real)")
+    if contagem:
+        print("\n  Gesto principal (frames):")
+        for gesto, n in contagem.most_common():
+            print(f"    {gesto:<16} {n}")
+    if args.saida:
+        print(f"\n  Mudanças de estado em {args.saida}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,128 @@
+/**
+ * CapturaNavegador — Captura a webcam no navegador (getUserMedia) e envia
+ * lotes de frames JPEG reduzidos para /inferir, que responde landmarks e
+ * estado (deploy cloud, onde o servidor não tem câmera). Formato do lote em
+ * app_web.py (ler_lote_frames). Até `emVoo` lotes ficam pendentes ao mesmo
+ * tempo: enquanto um é inferido o próximo já está subindo. Com a janela
+ * cheia, só os frames mais recentes esperam a vez.
+ */
+const TAMANHO_CABECALHO_FRAME = 21;
+
+class CapturaNavegador {
+    /**
+     * @param {HTMLVideoElement} video elemento que mostra a câmera
+     * @param {object} opcoes { sessao, pipelines, largura, altura, qualidade, fps, framesPorLote, emVoo, aoResultado }
+     */
+    constructor(video, opcoes = {}) {
+        this.video = video;
+        this.pipelines = opcoes.pipelines || ['principal'];
+        this.largura = opcoes.largura || 320;
+        this.altura = opcoes.altura || 240;
+        this.qualidade = opcoes.qualidade || 0.7;
+        this.fps = opcoes.fps || 15;
+        this.framesPorLote = opcoes.framesPorLote || 2;
+        this.maxEmVoo = opcoes.emVoo || 2;
+        this.aoResultado = opcoes.aoResultado || (() => {});
+        // Estado no servidor por sessão (a página recebe o id para /status_stream)
+        this.sessao = opcoes.sessao || Math.random().toString(36).slice(2);
+        this.seq = 0;
+        this.lote = [];
+        this.emVoo = 0;
+        this._capturando = false;
+
+        this.canvas = document.createElement('canvas');
+        this.canvas.width = this.largura;
+        this.canvas.height = this.altura;
+        this.ctx = this.canvas.getContext('2d');
+    }
+
+    /** Converte um resultado de /inferir para OverlayLandmarks.mostrar(). */
+    static paraOverlay(resultado) {
+        return {
+            seq: resultado.seq,
+            maos: resultado.maos.map(mao => ({
+                lateralidade: mao.lateralidade,
+                dedos: mao.dedos,
+                pontos: Float32Array.from(mao.pontos.flat())
+            }))
+        };
+    }
+
+    async iniciar() {
+        const midia = await navigator.mediaDevices.getUserMedia({ video: { width: 640, height: 480 }, audio: false });
+        this.video.srcObject = midia;
+        await this.video.play();
+        setInterval(() => this._capturar(), 1000 / this.fps);
+    }
+
+    async _capturar() {
+        if (this._capturando || !this.video.videoWidth) return;
+        this._capturando = true;
+        try {
+            // Espelhado, como a câmera local do servidor (a lateralidade depende disso)
+            this.ctx.setTransform(-1, 0, 0, 1, this.largura, 0);
+            this.ctx.drawImage(this.video, 0, 0, this.largura, this.altura);
+            const blob = await new Promise(resolver => this.canvas.toBlob(resolver, 'image/jpeg', this.qualidade));
+            if (!blob) return;
+            this.lote.push({
+                seq: ++this.seq,
+                timestamp: performance.now() / 1000,
+                dados: new Uint8Array(await blob.arrayBuffer())
+            });
+        } finally {
+            this._capturando = false;
+        }
+
+        // Janela cheia: o lote pendente guarda só os frames mais novos
+        if (this.lote.length > this.framesPorLote) {
+            this.lote.splice(0, this.lote.length - this.framesPorLote);
+        }
+        if (this.lote.length >= this.framesPorLote && this.emVoo < this.maxEmVoo) {
+            this._enviar();
+        }
+    }
+
+    _montarCorpo(lote) {
+        const total = lote.reduce((soma, frame) => soma + TAMANHO_CABECALHO_FRAME + frame.dados.length, 0);
+        const corpo = new Uint8Array(total);
+        const dados = new DataView(corpo.buffer);
+        let pos = 0;
+        for (const frame of lote) {
+            dados.setUint32(pos, frame.seq, true);
+            dados.setFloat64(pos + 4, frame.timestamp, true);
+            dados.setUint8(pos + 12, 0); // JPEG
+            dados.setUint16(pos + 13, this.largura, true);
+            dados.setUint16(pos + 15, this.altura, true);
+            dados.setUint32(pos + 17, frame.dados.length, true);
+            corpo.set(frame.dados, pos + TAMANHO_CABECALHO_FRAME);
+            pos += TAMANHO_CABECALHO_FRAME + frame.dados.length;
+        }
+        return corpo;
+    }
+
+    async _enviar() {
+        const lote = this.lote;
+        this.lote = [];
+        this.emVoo += 1;
+        try {
+            const resposta = await fetch(`/inferir?pipelines=${this.pipelines.join(',')}&sessao=${this.sessao}`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/octet-stream' },
+                body: this._montarCorpo(lote)
+            });
+            const dados = await resposta.json();
+            if (dados.ok) {
+                this.aoResultado(dados);
+            } else {
+                console.warn('Captura: /inferir recusou o lote', dados.mensagem);
+            }
+        } catch (erro) {
+            console.warn('Captura: falha ao enviar lote', erro);
+        } finally {
+            this.emVoo -= 1;
+        }
+        if (this.lote.length >= this.framesPorLote && this.emVoo < this.maxEmVoo) {
+            this._enviar();
+        }
+    }
+}
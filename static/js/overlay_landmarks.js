@@ -0,0 +1,174 @@
+/**
+ * OverlayLandmarks — Esqueleto das mãos e HUD desenhados no navegador
+ * (modo ?overlay=cliente). Lê /landmarks_stream, um stream binário com uma
+ * mensagem por frame inferido (formato em app_web.py, codificar_landmarks),
+ * e desenha num canvas sobre o vídeo. O overlay é atualizado na taxa da
+ * inferência, independente do FPS do vídeo.
+ */
+const ESCALA_LANDMARKS = 10000;
+const CONEXOES_MAO = [
+    [0, 1], [1, 2], [2, 3], [3, 4],
+    [0, 5], [5, 6], [6, 7], [7, 8],
+    [5, 9], [9, 10], [10, 11], [11, 12],
+    [9, 13], [13, 14], [14, 15], [15, 16],
+    [13, 17], [0, 17], [17, 18], [18, 19], [19, 20]
+];
+
+class OverlayLandmarks {
+    /**
+     * @param {HTMLElement} container elemento que envolve o vídeo (recebe o canvas)
+     * @param {string} stream principal | musica | pintura
+     * @param {object} opcoes { video: <img> ou null, aspecto: 4/3, hud: (ctx, area, frame) => {} }
+     */
+    constructor(container, stream, opcoes = {}) {
+        this.container = container;
+        this.stream = stream;
+        this.video = opcoes.video || null;
+        this.aspecto = opcoes.aspecto || 4 / 3;
+        this.hud = opcoes.hud || null;
+        this.frame = { seq: 0, maos: [] };
+        this._sujo = true;
+
+        this.canvas = document.createElement('canvas');
+        Object.assign(this.canvas.style, {
+            position: 'absolute', left: 0, top: 0, width: '100%', height: '100%', pointerEvents: 'none'
+        });
+        if (getComputedStyle(container).position === 'static') {
+            container.style.position = 'relative';
+        }
+        container.appendChild(this.canvas);
+        this.ctx = this.canvas.getContext('2d');
+        window.addEventListener('resize', () => { this._sujo = true; });
+    }
+
+    /** conectar = false: os frames chegam por mostrar() (captura no navegador). */
+    iniciar(conectar = true) {
+        if (conectar) this._conectar();
+        const laco = () => {
+            if (this._sujo) {
+                this._sujo = false;
+                this._desenhar();
+            }
+            requestAnimationFrame(laco);
+        };
+        requestAnimationFrame(laco);
+    }
+
+    /** Mostra um frame { seq, maos: [{ lateralidade, dedos, pontos }] } recebido por outro meio. */
+    mostrar(frame) {
+        this.frame = frame;
+        this._sujo = true;
+    }
+
+    /** Força um redesenho (ex.: o estado do HUD mudou). */
+    invalidar() {
+        this._sujo = true;
+    }
+
+    async _conectar() {
+        try {
+            const resposta = await fetch(`/landmarks_stream?stream=${this.stream}`);
+            if (!resposta.ok || !resposta.body) throw new Error(`HTTP ${resposta.status}`);
+            const leitor = resposta.body.getReader();
+            let pendente = new Uint8Array(0);
+
+            while (true) {
+                const { value, done } = await leitor.read();
+                if (done) break;
+                // Os pedaços da rede não respeitam as mensagens: acumular e cortar pelo tamanho
+                const junto = new Uint8Array(pendente.length + value.length);
+                junto.set(pendente);
+                junto.set(value, pendente.length);
+                pendente = this._consumir(junto);
+            }
+        } catch (erro) {
+            console.warn('Overlay: conexão de landmarks perdida', erro);
+        }
+        this.frame = { seq: 0, maos: [] };
+        this._sujo = true;
+        setTimeout(() => this._conectar(), 1000);
+    }
+
+    _consumir(bytes) {
+        const dados = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+        let pos = 0;
+        while (pos + 2 <= bytes.length) {
+            const tamanho = dados.getUint16(pos, true);
+            if (pos + 2 + tamanho > bytes.length) break;
+            this.frame = this._decodificar(dados, pos + 2);
+            this._sujo = true;
+            pos += 2 + tamanho;
+        }
+        return bytes.slice(pos);
+    }
+
+    _decodificar(dados, pos) {
+        const nMaos = dados.getUint8(pos + 1);
+        const seq = dados.getUint32(pos + 2, true);
+        pos += 6;
+        const maos = [];
+        for (let m = 0; m < nMaos; m++) {
+            const lateralidade = dados.getUint8(pos) === 0 ? 'Right' : 'Left';
+            const bitsDedos = dados.getUint8(pos + 1);
+            const dedos = [0, 1, 2, 3, 4].map(i => (bitsDedos >> i) & 1);
+            const pontos = new Float32Array(42);
+            for (let i = 0; i < 42; i++) {
+                pontos[i] = dados.getInt16(pos + 2 + i * 2, true) / ESCALA_LANDMARKS;
+            }
+            maos.push({ lateralidade, dedos, pontos });
+            pos += 86;
+        }
+        return { seq, maos };
+    }
+
+    /** Retângulo do vídeo dentro do container (object-fit: contain). */
+    _area() {
+        const largura = this.canvas.width;
+        const altura = this.canvas.height;
+        let aspecto = this.aspecto;
+        // <img> (MJPEG) ou <video> (captura no navegador)
+        const larguraVideo = this.video && (this.video.naturalWidth || this.video.videoWidth);
+        const alturaVideo = this.video && (this.video.naturalHeight || this.video.videoHeight);
+        if (larguraVideo && alturaVideo) {
+            aspecto = larguraVideo / alturaVideo;
+        }
+        const w = Math.min(largura, altura * aspecto);
+        const h = w / aspecto;
+        return { x: (largura - w) / 2, y: (altura - h) / 2, w, h };
+    }
+
+    _desenhar() {
+        const ctx = this.ctx;
+        const largura = this.container.clientWidth;
+        const altura = this.container.clientHeight;
+        if (this.canvas.width !== largura || this.canvas.height !== altura) {
+            this.canvas.width = largura;
+            this.canvas.height = altura;
+        }
+        ctx.clearRect(0, 0, largura, altura);
+        const area = this._area();
+
+        for (const mao of this.frame.maos) {
+            const px = i => area.x + mao.pontos[i * 2] * area.w;
+            const py = i => area.y + mao.pontos[i * 2 + 1] * area.h;
+
+            ctx.strokeStyle = '#e0e0e0';
+            ctx.lineWidth = 2;
+            ctx.beginPath();
+            for (const [a, b] of CONEXOES_MAO) {
+                ctx.moveTo(px(a), py(a));
+                ctx.lineTo(px(b), py(b));
+            }
+            ctx.stroke();
+
+            ctx.fillStyle = '#ff0000';
+            for (let i = 0; i < 21; i++) {
+                ctx.beginPath();
+                ctx.arc(px(i), py(i), 3, 0, Math.PI * 2);
+                ctx.fill();
+            }
+        }
+
+        if (this.hud) this.hud(ctx, area, this.frame);
+    }
+}
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Os módulos do app ficam na raiz do repositório
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("VISION_LINHA_TEMPO", "")
+os.environ.setdefault("VISION_AQUECER", "0")
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+import fontes_frames
+
+cv2 = pytest.importorskip("cv2")
+
+
+@pytest.fixture
+def pasta(tmp_path):
+    for i in range(3):
+        cv2.imwrite(str(tmp_path / f"{i:03d}.png"), np.full((8, 8, 3), i, dtype=np.uint8))
+    (tmp_path / "001b.jpg").write_bytes(b"nao e imagem")
+    (tmp_path / "leia.txt").write_text("ignorado")
+    return tmp_path
+
+
+def test_interface_abstrata():
+    with pytest.raises(TypeError):
+        fontes_frames.FonteFrames("x")
+
+
+def test_imagens_abrem_sem_decodificar(pasta, monkeypatch):
+    lidas = []
+    imread = cv2.imread
+    monkeypatch.setattr(cv2, "imread", lambda caminho: lidas.append(caminho) or imread(caminho))
+    fonte = fontes_frames.FonteImagens(str(pasta), ritmo="maximo")
+    assert fonte.isOpened()
+    assert lidas == []
+    valores = [int(fonte.read()[1][0, 0, 0]) for _ in range(6)]
+    # A imagem inválida é pulada e a pasta gira em loop
+    assert valores == [0, 1, 2, 0, 1, 2]
+
+
+def test_imagens_cache_limitado(pasta):
+    fonte = fontes_frames.FonteImagens(str(pasta), ritmo="maximo", cache=2)
+    for _ in range(7):
+        assert fonte.read()[0]
+    assert len(fonte._cache) == 2
+
+
+def test_imagens_sem_loop_e_pasta_vazia(pasta, tmp_path):
+    fonte = fontes_frames.FonteImagens(str(pasta), ritmo="maximo", loop=False)
+    assert [fonte.read()[0] for _ in range(4)] == [True, True, True, False]
+    vazia = fontes_frames.FonteImagens(str(tmp_path / "nao_existe"))
+    assert not vazia.isOpened()
+    assert vazia.read() == (False, None)
@@ -0,0 +1,30 @@
+import numpy as np
+
+import gravacao_landmarks
+
+
+def test_registros_legiveis_sem_fechar(tmp_path):
+    caminho = str(tmp_path / "sessao.lmk")
+    gravador = gravacao_landmarks.GravadorLandmarks(caminho)
+    pontos = np.random.default_rng(0).random((2, 21, 3), dtype=np.float32)
+    for seq in range(1, 6):
+        gravador.gravar(seq, 100.0 + seq / 30, pontos, ["Right", "Left"])
+
+    # Sem fechar(): o que já foi gravado está no arquivo (como se o processo tivesse morrido)
+    leitor = gravacao_landmarks.LeitorLandmarks(caminho)
+    assert len(leitor) == 5
+    frames = list(leitor)
+    assert [frame.seq for frame in frames] == [1, 2, 3, 4, 5]
+    assert frames[-1].lateralidades == ("Right", "Left")
+    np.testing.assert_array_equal(frames[-1].caracteristicas.pontos, pontos)
+    gravador.fechar()
+
+
+def test_registro_incompleto_e_ignorado(tmp_path):
+    caminho = str(tmp_path / "sessao.lmk")
+    gravador = gravacao_landmarks.GravadorLandmarks(caminho)
+    gravador.gravar(1, 0.0, np.zeros((0, 21, 3)), [])
+    gravador.fechar()
+    with open(caminho, "ab") as arquivo:
+        arquivo.write(b"\0" * 10)  # pedaço de um registro interrompido
+    assert len(gravacao_landmarks.LeitorLandmarks(caminho)) == 1
@@ -0,0 +1,69 @@
+import pytest
+
+import linha_tempo
+
+
+@pytest.fixture
+def linha(tmp_path):
+    linha = linha_tempo.LinhaTempo(str(tmp_path / "linha_tempo"))
+    yield linha
+    linha.fechar()
+
+
+@pytest.fixture
+def cliente(linha, monkeypatch):
+    import app_web
+    monkeypatch.setattr(app_web, "_linha_tempo", linha)
+    return app_web.app.test_client()
+
+
+def test_registra_e_agrega(linha):
+    abertas = {}
+    linha.observar(abertas, "combo", "", "Palmas", agora=100.0)
+    linha.observar(abertas, "combo", "", "Nenhum", agora=102.5)
+    linha.aguardar()
+    resposta = linha.consultar(0, 200, balde=100)
+    assert resposta["baldes"] == 2
+    [grupo] = resposta["grupos"]
+    assert (grupo["valor"], grupo["contagem"], grupo["permanencia_total"]) == ("Palmas", 1, 2.5)
+    assert grupo["histograma"] == [0, 1]
+
+
+@pytest.mark.parametrize("inicio, fim, balde", [
+    (0, float("inf"), 1),
+    (float("-inf"), 5, 60),
+    (float("nan"), 5, 60),
+    (0, 5, float("nan")),
+])
+def test_consultar_recusa_valores_nao_finitos(linha, inicio, fim, balde):
+    with pytest.raises(ValueError):
+        linha.consultar(inicio, fim, balde=balde)
+
+
+def test_consultar_recusa_baldes_demais(linha):
+    with pytest.raises(ValueError):
+        linha.consultar(0, 1e300, balde=1e-300)
+    with pytest.raises(ValueError):
+        linha.consultar(0, (linha_tempo.MAX_BALDES + 1) * 60, balde=60)
+    assert linha.consultar(0, linha_tempo.MAX_BALDES * 60, balde=60)["baldes"] == linha_tempo.MAX_BALDES
+
+
+@pytest.mark.parametrize("consulta", [
+    "inicio=0&fim=inf&balde=1",
+    "inicio=-inf&fim=5",
+    "inicio=nan&fim=5",
+    "ultimos=nan",
+    "inicio=0&fim=5&duracao_min=inf",
+    "inicio=0&fim=1e300&balde=1e-300",
+    "ultimos=100000&balde=1",
+])
+def test_rota_responde_400(cliente, consulta):
+    resposta = cliente.get(f"/linha_tempo?{consulta}")
+    assert resposta.status_code == 400
+    assert resposta.get_json()["ok"] is False
+
+
+def test_rota_responde_json_valido(cliente):
+    resposta = cliente.get("/linha_tempo?inicio=0&fim=120&balde=60")
+    assert resposta.status_code == 200
+    assert resposta.get_json()["baldes"] == 2
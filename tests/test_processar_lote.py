@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+processar_lote = pytest.importorskip("processar_lote")
+
+N_FRAMES = 10
+
+
+@pytest.fixture
+def video(tmp_path):
+    caminho = str(tmp_path / "clip.avi")
+    escritor = cv2.VideoWriter(caminho, cv2.VideoWriter_fourcc(*"MJPG"), 10, (32, 24))
+    for i in range(N_FRAMES):
+        escritor.write(np.full((24, 32, 3), i * 20, dtype=np.uint8))
+    escritor.release()
+    return caminho
+
+
+def _contagem_informada(monkeypatch, contagem):
+    """Faz o contêiner informar `contagem` frames (0 = desconhecido, como webm)."""
+    captura_real = cv2.VideoCapture
+
+    class Captura:
+        def __init__(self, *args):
+            self._cap = captura_real(*args)
+
+        def get(self, propriedade):
+            if propriedade == cv2.CAP_PROP_FRAME_COUNT:
+                return contagem
+            return self._cap.get(propriedade)
+
+        def __getattr__(self, nome):
+            return getattr(self._cap, nome)
+
+    monkeypatch.setattr(processar_lote.cv2, "VideoCapture", Captura)
+
+
+def _frames(segmentos):
+    return [numero for segmento in segmentos for numero, _ in processar_lote._frames_do_segmento(segmento)]
+
+
+def test_contagem_desconhecida_vira_um_segmento_ate_o_fim(video, monkeypatch, capsys):
+    _contagem_informada(monkeypatch, 0)
+    segmentos = processar_lote.planejar_segmentos([video], 0.3, 30)
+    assert [(s.inicio, s.fim) for s in segmentos] == [(0, None)]
+    assert "não informa o número de frames" in capsys.readouterr().err
+    assert _frames(segmentos) == list(range(N_FRAMES))
+
+
+def test_contagem_subestimada_le_ate_o_fim(video, monkeypatch):
+    _contagem_informada(monkeypatch, 6)
+    segmentos = processar_lote.planejar_segmentos([video], 0.3, 30)  # 3 frames por segmento a 10 fps
+    assert [(s.inicio, s.fim) for s in segmentos] == [(0, 3), (3, None)]
+    assert _frames(segmentos) == list(range(N_FRAMES))
+
+
+def test_contagem_exata(video):
+    segmentos = processar_lote.planejar_segmentos([video], 0.3, 30)
+    assert [(s.inicio, s.fim) for s in segmentos] == [(0, 3), (3, 6), (6, 9), (9, None)]
+    assert _frames(segmentos) == list(range(N_FRAMES))
@@ -0,0 +1,271 @@
+"""
+Modelo vetorial da Pintura Virtual: traços como arrays de pontos.
+
+Cada traço guarda cor, largura, se é borracha e os pontos em coordenadas
+normalizadas (0–1) num array float32 que cresce por dobra, então a memória
+acompanha o número de pontos e nada depende da resolução. Os pontos são
+suavizados na captura (média exponencial, que tira o tremor da ponta do
+dedo) e pontos quase iguais ao anterior são descartados.
+
+DesenhoVetorial mantém os traços visíveis, o histórico de desfazer/refazer
+(incluindo limpar, que também pode ser desfeito) e um canvas BGRA
+rasterizado de forma incremental: cada ponto novo desenha só o seu
+segmento. Desfazer, refazer e limpar rasterizam de novo os traços
+visíveis, a partir dos pontos. Exportar gera PNG (qualquer resolução, curvas
+Catmull-Rom) ou SVG (paths; a borracha vira máscara).
+
+O OpenCV é importado no uso: no deploy cloud o app só o carrega no primeiro
+/inferir.
+"""
+import numpy as np
+
+SUAVIZACAO = 0.5  # peso do ponto novo na média exponencial
+DISTANCIA_MIN = 0.002  # fração da largura abaixo da qual o ponto é descartado
+MAX_HISTORICO = 200  # ações guardadas para desfazer
+
+
+class Traco:
+    __slots__ = ("cor", "largura", "borracha", "_pontos", "n")
+
+    def __init__(self, cor, largura, borracha=False):
+        self.cor = tuple(cor)  # BGR
+        self.largura = largura  # em pixels para a largura de referência do desenho
+        self.borracha = borracha
+        self._pontos = np.empty((16, 2), dtype=np.float32)
+        self.n = 0
+
+    @property
+    def pontos(self):
+        return self._pontos[:self.n]
+
+    def copia(self):
+        """Cópia com os pontos atuais, que não muda se o traço continuar crescendo."""
+        copia = Traco(self.cor, self.largura, self.borracha)
+        copia._pontos = self.pontos.copy()
+        copia.n = len(copia._pontos)
+        return copia
+
+    def adicionar(self, x, y):
+        """Suaviza e guarda (x, y) normalizados. Retorna o ponto guardado ou None se descartado."""
+        if self.n:
+            ux, uy = self._pontos[self.n - 1]
+            x = ux + SUAVIZACAO * (x - ux)
+            y = uy + SUAVIZACAO * (y - uy)
+            if abs(x - ux) < DISTANCIA_MIN and abs(y - uy) < DISTANCIA_MIN:
+                return None
+        if self.n == len(self._pontos):
+            self._pontos = np.concatenate([self._pontos, np.empty_like(self._pontos)])
+        self._pontos[self.n] = (x, y)
+        self.n += 1
+        return x, y
+
+
+def _catmull_rom(pontos, subdivisoes):
+    """Curva Catmull-Rom passando pelos pontos (subdivisoes pontos por segmento)."""
+    if len(pontos) < 3 or subdivisoes <= 1:
+        return pontos
+    p = np.concatenate([pontos[:1], pontos, pontos[-1:]]).astype(np.float64)
+    t = np.linspace(0, 1, subdivisoes, endpoint=False)[:, None, None]
+    p0, p1, p2, p3 = p[:-3], p[1:-2], p[2:-1], p[3:]
+    curva = 0.5 * (2 * p1 + (p2 - p0) * t + (2 * p0 - 5 * p1 + 4 * p2 - p3) * t ** 2
+                   + (3 * p1 - p0 - 3 * p2 + p3) * t ** 3)
+    return np.concatenate([curva.transpose(1, 0, 2).reshape(-1, 2), pontos[-1:]])
+
+
+def _pixels(pontos, largura, altura):
+    """Pontos normalizados -> pixels inteiros (o mesmo arredondamento no incremental e no redesenho)."""
+    return np.rint(np.asarray(pontos, dtype=np.float32) * (largura, altura)).astype(np.int32)
+
+
+def _rasterizar(canvas, traco, largura, altura, escala, curvas=False):
+    import cv2
+
+    pontos = traco.pontos
+    if curvas:
+        pontos = _catmull_rom(pontos, max(2, int(escala * 2)))
+    pixels = _pixels(pontos, largura, altura)
+    cor = (0, 0, 0, 0) if traco.borracha else traco.cor + (255,)
+    espessura = max(1, round(traco.largura * escala))
+    if len(pixels) == 1:
+        cv2.line(canvas, tuple(pixels[0]), tuple(pixels[0]), cor, espessura)
+    else:
+        cv2.polylines(canvas, [pixels], False, cor, espessura)
+
+
+class DesenhoVetorial:
+    """Traços de uma sessão + canvas BGRA (largura x altura) sempre em dia."""
+
+    def __init__(self, largura=640, altura=480):
+        self.largura = largura
+        self.altura = altura
+        self.tracos = []  # visíveis, na ordem em que foram feitos
+        self.canvas = None  # criado no primeiro traço
+        self.retangulo = None  # (x0, y0, x1, y1) que contém toda a tinta, ou None
+        self._atual = None
+        self._desfazer = []  # ("traco", traco) | ("limpar", tracos)
+        self._refazer = []
+
+    @property
+    def pode_desfazer(self):
+        return bool(self._desfazer)
+
+    @property
+    def pode_refazer(self):
+        return bool(self._refazer)
+
+    def n_pontos(self):
+        return sum(traco.n for traco in self.tracos)
+
+    # --- Captura ---
+    def adicionar_ponto(self, x, y, cor, largura, borracha=False):
+        """Ponto (normalizado) do traço em curso; começa um traço se não houver."""
+        if self._atual is None or self._atual.cor != tuple(cor) or self._atual.borracha != borracha:
+            self.terminar_traco()
+            self._atual = Traco(cor, largura, borracha)
+            self.tracos.append(self._atual)
+            self._registrar(("traco", self._atual))
+        anterior = self._atual.pontos[-1].copy() if self._atual.n else None
+        ponto = self._atual.adicionar(x, y)
+        if ponto is None:
+            return
+        import cv2
+
+        self._garantir_canvas()
+        a, b = (tuple(p) for p in _pixels([anterior if anterior is not None else ponto, ponto],
+                                          self.largura, self.altura).tolist())
+        cor_canvas = (0, 0, 0, 0) if borracha else tuple(cor) + (255,)
+        cv2.line(self.canvas, a, b, cor_canvas, largura)
+        if not borracha:
+            self._marcar(a, b, largura)
+
+    def terminar_traco(self):
+        self._atual = None
+
+    def limpar(self):
+        """Apaga todos os traços (pode ser desfeito). Retorna False se já estava vazio."""
+        self.terminar_traco()
+        if not self.tracos:
+            return False
+        self._registrar(("limpar", self.tracos))
+        self.tracos = []
+        self._redesenhar()
+        return True
+
+    # --- Histórico ---
+    def _registrar(self, acao):
+        self._desfazer.append(acao)
+        del self._desfazer[:-MAX_HISTORICO]
+        self._refazer.clear()
+
+    def desfazer(self):
+        self.terminar_traco()
+        if not self._desfazer:
+            return False
+        tipo, dados = acao = self._desfazer.pop()
+        if tipo == "traco":
+            self.tracos.remove(dados)
+        else:
+            self.tracos = dados + self.tracos
+        self._refazer.append(acao)
+        self._redesenhar()
+        return True
+
+    def refazer(self):
+        self.terminar_traco()
+        if not self._refazer:
+            return False
+        tipo, dados = acao = self._refazer.pop()
+        if tipo == "traco":
+            self.tracos.append(dados)
+        else:
+            self.tracos = [traco for traco in self.tracos if traco not in dados]
+        self._desfazer.append(acao)
+        self._redesenhar()
+        return True
+
+    # --- Canvas ---
+    def _garantir_canvas(self):
+        if self.canvas is None:
+            self.canvas = np.zeros((self.altura, self.largura, 4), dtype=np.uint8)
+
+    def _marcar(self, a, b, espessura):
+        margem = espessura // 2 + 1
+        x0 = max(0, min(a[0], b[0]) - margem)
+        y0 = max(0, min(a[1], b[1]) - margem)
+        x1 = min(self.largura, max(a[0], b[0]) + margem + 1)
+        y1 = min(self.altura, max(a[1], b[1]) + margem + 1)
+        if x0 >= x1 or y0 >= y1:
+            return
+        if self.retangulo is not None:
+            c0, d0, c1, d1 = self.retangulo
+            x0, y0, x1, y1 = min(x0, c0), min(y0, d0), max(x1, c1), max(y1, d1)
+        self.retangulo = (x0, y0, x1, y1)
+
+    def _redesenhar(self):
+        """Rasteriza de novo os traços visíveis (zera só a área que tinha tinta)."""
+        if self.canvas is None:
+            return
+        if self.retangulo is not None:
+            x0, y0, x1, y1 = self.retangulo
+            self.canvas[y0:y1, x0:x1] = 0
+        self.retangulo = None
+        for traco in self.tracos:
+            if not traco.n:
+                continue
+            _rasterizar(self.canvas, traco, self.largura, self.altura, 1.0)
+            if not traco.borracha:
+                pixels = _pixels(traco.pontos, self.largura, self.altura)
+                self._marcar(pixels.min(axis=0).tolist(), pixels.max(axis=0).tolist(), traco.largura)
+
+    # --- Exportação ---
+    def copia_tracos(self):
+        """Desenho só com cópias dos traços visíveis (sem canvas nem histórico).
+
+        Tirada sob o lock de quem desenha, pode ser exportada fora dele.
+        """
+        copia = DesenhoVetorial(self.largura, self.altura)
+        copia.tracos = [traco.copia() for traco in self.tracos]
+        return copia
+
+    def exportar_png(self, largura=None):
+        """PNG com fundo transparente; largura em pixels (padrão: a do desenho)."""
+        import cv2
+
+        largura = int(largura or self.largura)
+        altura = max(1, round(largura * self.altura / self.largura))
+        escala = largura / self.largura
+        canvas = np.zeros((altura, largura, 4), dtype=np.uint8)
+        for traco in self.tracos:
+            if traco.n:
+                _rasterizar(canvas, traco, largura, altura, escala, curvas=True)
+        ok, buffer = cv2.imencode(".png", canvas)
+        return buffer.tobytes() if ok else None
+
+    def exportar_svg(self, largura=None):
+        """SVG com um path por traço; cada borracha mascara o que veio antes dela."""
+        largura = float(largura or self.largura)
+        altura = largura * self.altura / self.largura
+        escala = largura / self.largura
+        definicoes = []
+        corpo = ""
+        for i, traco in enumerate(self.tracos):
+            if not traco.n:
+                continue
+            pontos = traco.pontos * (largura, altura)
+            caminho = "M" + " L".join(f"{x:.1f} {y:.1f}" for x, y in pontos.tolist())
+            if traco.n == 1:
+                caminho += " l0 0"
+            espessura = f"{traco.largura * escala:.1f}"
+            if traco.borracha:
+                definicoes.append(
+                    f'<mask id="b{i}" maskUnits="userSpaceOnUse"><rect width="100%" height="100%" fill="white"/>'
+                    f'<path d="{caminho}" stroke="black" stroke-width="{espessura}" fill="none" '
+                    f'stroke-linecap="round" stroke-linejoin="round"/></mask>'
+                )
+                corpo = f'<g mask="url(#b{i})">{corpo}</g>'
+            else:
+                azul, verde, vermelho = traco.cor
+                corpo += (f'<path d="{caminho}" stroke="#{vermelho:02x}{verde:02x}{azul:02x}" '
+                          f'stroke-width="{espessura}" fill="none" stroke-linecap="round" stroke-linejoin="round"/>')
+        return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{largura:g}" height="{altura:g}" '
+                f'viewBox="0 0 {largura:g} {altura:g}"><defs>{"".join(definicoes)}</defs>{corpo}</svg>')